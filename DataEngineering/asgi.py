@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "DataEngineering.settings")
+# Serve the tutorial pages from their async views (see TUTORIALS_ASYNC_VIEWS).
+os.environ.setdefault("TUTORIALS_ASYNC_VIEWS", "1")
 
 application = get_asgi_application()
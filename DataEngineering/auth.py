@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.contrib.auth import user_logged_out
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+
+# Seconds a loaded user stays cached. Saves and deletes evict it at once in
+# this process (and in every process when the cache is shared, e.g. Redis).
+USER_CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60)
+
+
+def _key(user_id):
+    return f'auth:user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend that serves get_user() from the cache.
+
+    AuthenticationMiddleware calls get_user() on every authenticated
+    request; with this backend that costs a cache lookup instead of a query.
+    """
+
+    def get_user(self, user_id):
+        user = cache.get(_key(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(_key(user_id), user, USER_CACHE_TIMEOUT)
+        return user
+
+
+def forget_user(user_id):
+    cache.delete(_key(user_id))
+
+
+def _user_changed(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+def _logged_out(sender, request, user, **kwargs):
+    if user is not None:
+        forget_user(user.pk)
+
+
+post_save.connect(_user_changed, sender=settings.AUTH_USER_MODEL, dispatch_uid='auth-user-cache-save')
+post_delete.connect(_user_changed, sender=settings.AUTH_USER_MODEL, dispatch_uid='auth-user-cache-delete')
+user_logged_out.connect(_logged_out, dispatch_uid='auth-user-cache-logout')
@@ -1,6 +1,7 @@
 import os
 from .settings import *
 from .settings import BASE_DIR
+from .database import postgres_database
 
 # Allow all hosts: WEBSITE_HOSTNAME is set in Azure App Service
 ALLOWED_HOSTS = [os.environ['WEBSITE_HOSTNAME']]
@@ -31,6 +32,7 @@ DEBUG = False
 # HTML (e.g., via <link> or <script> tags), and whitenoise optimizes delivery with compression and caching. 
 # Subsequent requests may use cached files in the browser, reducing server load.
 MIDDLEWARE = [
+    'pages.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,6 +46,11 @@ MIDDLEWARE = [
 #whitenoise.storage.CompressedManifestStaticFilesStorage ?
 
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# Files with a 12-hex-digit content hash in their name never change: the image
+# derivatives written by `manage.py build_image_derivatives` and the copies
+# ManifestStaticFilesStorage makes. Serve them with a one-year immutable Cache-Control.
+WHITENOISE_IMMUTABLE_FILE_TEST = r'^.+\.[0-9a-f]{12}\..+$'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 # Why is this connection string used?
@@ -53,16 +60,10 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # The connection string is typically set as an environment variable in Azure App Service for security reasons.
 # The connection string is expected to be in the format:
 # "dbname=your_db_name user=your_user password=your_password host=your_host port=your_port"
-connection_string = os.environ.get('AZURE_POSTGRESSQL_CONNECTIONSTRING', None)
-parameters = {param.split('=')[0]: param.split('=')[1] for param in connection_string.split(" ")}
+# (quoted values and the postgresql:// URI form work too). Connections are
+# pooled when psycopg 3 is installed, and persistent otherwise.
+connection_string = os.environ['AZURE_POSTGRESSQL_CONNECTIONSTRING']
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': parameters['dbname'],
-        'USER': parameters['user'],
-        'PASSWORD': parameters['password'],
-        'HOST': parameters['host'],
-        'PORT': parameters['port'],
-    }
+    'default': postgres_database(connection_string),
 }
@@ -0,0 +1,248 @@
+import os
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, and no forked workers sharing the file either.
+    fcntl = None
+
+
+# Attributes every LogRecord has; anything else was passed through `extra=`.
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+class SharedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that several processes can write and rotate.
+
+    With gunicorn's preload_app every worker inherits the same handler. Each
+    write takes an flock on <filename>.lock; under it the handler reopens
+    the file if another process rotated it away, and decides on a rollover
+    from the size of the file on disk rather than from its own stream.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_file = None
+        self._lock_pid = None
+
+    def _acquire_file_lock(self):
+        if fcntl is None:
+            return
+        if self._lock_pid != os.getpid():
+            # flock is per open file, and a forked child shares its parent's.
+            self._lock_file = open(self.baseFilename + '.lock', 'a')
+            self._lock_pid = os.getpid()
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+
+    def _release_file_lock(self):
+        if fcntl is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _reopen_if_rotated(self):
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            current = None
+        opened = os.fstat(self.stream.fileno())
+        if current is None or (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+            self.stream.close()
+            self.stream = None
+
+    def shouldRollover(self, record):
+        if self.maxBytes <= 0:
+            return False
+        try:
+            status = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return False
+        if not os.path.isfile(self.baseFilename):
+            # As in RotatingFileHandler: never roll over /dev/null and the like.
+            return False
+        return status.st_size + len(self.format(record)) + 1 >= self.maxBytes
+
+    def emit(self, record):
+        try:
+            self._acquire_file_lock()
+            try:
+                self._reopen_if_rotated()
+                if self.shouldRollover(record):
+                    self.doRollover()
+                logging.FileHandler.emit(self, record)
+            finally:
+                self._release_file_lock()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        super().close()
+        if self._lock_file is not None and self._lock_pid == os.getpid():
+            self._lock_file.close()
+        self._lock_file = None
+
+
+class _Listener(logging.handlers.QueueListener):
+
+    def enqueue_sentinel(self):
+        # Block rather than put_nowait(): on shutdown the queue may still be
+        # full of records to write, and stop() must not fail on it.
+        self.queue.put(self._sentinel)
+
+
+class QueueFileHandler(logging.handlers.QueueHandler):
+    """Hand records to a background thread that writes a size-rotated log file.
+
+    The request thread only does a non-blocking put on a bounded queue. When
+    the queue is full the record is dropped and counted instead of waiting
+    on the disk; the count is written with the next record that gets through.
+    """
+
+    def __init__(self, filename, maxBytes=10 * 1024 * 1024, backupCount=5, encoding='utf-8', queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.file_handler = SharedRotatingFileHandler(
+            filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding, delay=True,
+        )
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.listener = _Listener(self.queue, self.file_handler, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.close)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The listener thread does not survive a fork (gunicorn preload_app),
+        # so each worker starts its own. They all write the same file, which
+        # SharedRotatingFileHandler serialises and rotates across processes.
+        if self.listener is not None:
+            self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self.listener = _Listener(self.queue, self.file_handler, respect_handler_level=True)
+            self.listener.start()
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread, in the file handler.
+        self.file_handler.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Resolve the message and exception text now, while the arguments
+        # still hold their request-time values, and leave the formatting to
+        # the listener thread. Other handlers still get the original record.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if self.dropped:
+            with self._dropped_lock:
+                record.dropped_records, self.dropped = self.dropped, 0
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            self.file_handler.close()
+        super().close()
+
+
+class JsonFormatter(logging.Formatter):
+    """Format each record as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of the records below WARNING from chatty loggers.
+
+    `rates` maps a logger name to the fraction of its records to keep; it
+    also applies to that logger's children. Warnings and errors always pass.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = _lookup(self.rates, record.name)
+        return rate is None or random.random() < rate
+
+
+class RateLimitFilter(logging.Filter):
+    """Token-bucket rate limit per logger for records below WARNING.
+
+    Each logger may emit `rate` records per second with bursts of up to
+    `burst`; the rest are suppressed and their number is attached to the
+    next record that passes as `suppressed_records`.
+    """
+
+    def __init__(self, rate=50.0, burst=100, overrides=None):
+        super().__init__()
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.overrides = dict(overrides or {})
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = _lookup(self.overrides, record.name)
+        rate = self.rate if rate is None else float(rate)
+        burst = max(self.burst, rate)
+        with self._lock:
+            tokens, last, suppressed = self._buckets.get(record.name, (burst, record.created, 0))
+            tokens = min(burst, tokens + (record.created - last) * rate)
+            if tokens < 1:
+                self._buckets[record.name] = (tokens, record.created, suppressed + 1)
+                return False
+            self._buckets[record.name] = (tokens - 1, record.created, 0)
+        if suppressed:
+            record.suppressed_records = suppressed
+        return True
+
+
+def _lookup(table, logger_name):
+    """Return the value for logger_name or its nearest configured ancestor."""
+    name = logger_name
+    while name:
+        if name in table:
+            return table[name]
+        name = name.rpartition('.')[0]
+    return table.get('root')
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 import os
 
+from .database import sqlite_database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "pages.metrics.MetricsMiddleware",  # Removes itself unless METRICS_ENABLED is set
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -78,11 +81,13 @@ WSGI_APPLICATION = "DataEngineering.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# SQLite in WAL mode with persistent connections (see DataEngineering/database.py).
+# SQLITE_TUNING=0 falls back to Django's defaults.
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": sqlite_database(
+        os.environ.get('SQLITE_PATH', BASE_DIR / "db.sqlite3"),
+        tuned=os.environ.get('SQLITE_TUNING', '1') == '1',
+    ),
 }
 
 
@@ -104,13 +109,43 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Application logs go to app.log through DataEngineering.log_pipeline: the
+# request thread only enqueues the record, and a background thread writes
+# rotated JSON lines. Chatty loggers are sampled and rate limited.
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'DataEngineering.log_pipeline.JsonFormatter',
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'DataEngineering.log_pipeline.SamplingFilter',
+            # Fraction of DEBUG/INFO records kept per logger (and its children).
+            'rates': {'pages.content_index': 0.1},
+        },
+        'rate_limit': {
+            '()': 'DataEngineering.log_pipeline.RateLimitFilter',
+            'rate': 50,  # Records per second per logger, below WARNING
+            'burst': 100,
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
         },
+        'app_file': {
+            # '()' rather than 'class', so dictConfig does not treat it as a
+            # plain QueueHandler and replace its listener.
+            '()': 'DataEngineering.log_pipeline.QueueFileHandler',
+            'filename': os.path.join(BASE_DIR, 'app.log'),
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'json',
+            'filters': ['sampling', 'rate_limit'],
+        },
     },
     'loggers': {
         'django': {
@@ -118,9 +153,19 @@ LOGGING = {
             'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'), # Use INFO or DEBUG
             'propagate': True,
         },
+        'pages': {
+            'handlers': ['app_file'],
+            'level': os.getenv('APP_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'DataEngineering': {
+            'handlers': ['app_file'],
+            'level': os.getenv('APP_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
     },
     'root': {
-        'handlers': ['console'],
+        'handlers': ['console', 'app_file'],
         'level': 'WARNING', # Or 'INFO', 'DEBUG'
     },
 }
@@ -151,3 +196,78 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 LOGIN_REDIRECT_URL = 'http://127.0.0.1:8080'
+
+# Shared cache: Redis when REDIS_URL is set, otherwise per-process memory.
+SHARED_CACHE = bool(os.environ.get('REDIS_URL'))
+if SHARED_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'dataengineering',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+    }
+
+# SESSION_BACKEND picks where sessions live:
+#   cached_db      - write-through: reads come from the cache, writes also go to the DB
+#                    (default with a shared cache)
+#   signed_cookies - the session is a signed cookie; no session table at all
+#   cache          - cache only; needs a shared cache (REDIS_URL) with several workers
+#   db             - Django's default, one query per request (default otherwise)
+# Without REDIS_URL each gunicorn worker has its own LocMem cache, so a
+# session flushed by one worker (e.g. on logout) would live on in the
+# others' caches; that is why cached_db is only the default with Redis.
+SESSION_ENGINES = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'db': 'django.contrib.sessions.backends.db',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('SESSION_BACKEND', 'cached_db' if SHARED_CACHE else 'db')]
+
+# With a shared cache, users are loaded through it instead of one query per
+# request. A session stores the path of the backend that logged it in, so
+# both backends stay listed: the first one is used for new logins, and
+# sessions made under the other keep resolving.
+AUTHENTICATION_BACKENDS = ['DataEngineering.auth.CachedModelBackend', 'django.contrib.auth.backends.ModelBackend']
+if not SHARED_CACHE:
+    AUTHENTICATION_BACKENDS.reverse()
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Per-request phase timings exposed at /metrics (Prometheus text format).
+# Off by default; when off the middleware and the phase timers cost nothing.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '0') == '1'
+
+# Tutorial content roots served by pages.views.book_view.
+# name: the URL topic, path: the HTML directory, prefix (optional): topics
+# starting with it also map to this root (otherwise only the name matches),
+# warmup: build the root's index when the app starts.
+TUTORIALS_CONTENT_ROOTS = [
+    {'name': 'data_engineering', 'path': BASE_DIR / 'Topics' / 'data_engineering'},
+    {'name': 'agenticai', 'path': BASE_DIR / 'Topics' / 'agenticai'},
+    {'name': 'system_programming', 'path': BASE_DIR / 'Topics' / 'system_programming'},
+    {'name': 'rust_programming', 'path': BASE_DIR / 'Topics' / 'rust_programming'},
+    {'name': 'thought_for_the_day', 'path': BASE_DIR / 'Topics' / 'thought_for_the_day'},
+    {'name': 'courses', 'path': BASE_DIR / 'Topics' / 'courses', 'prefix': 'course'},
+]
+# Root used for topics that match none of the above.
+TUTORIALS_DEFAULT_CONTENT_ROOT = 'data_engineering'
+# Part of every page ETag and cache key, e.g. the deployed commit SHA; when
+# unset the templates and static files are hashed at startup instead.
+TUTORIALS_DEPLOY_VERSION = os.environ.get('TUTORIALS_DEPLOY_VERSION', '')
+# Warm every content root in a thread pool when the server starts; set
+# TUTORIALS_WARMUP_ON_STARTUP=0 to start without it (pages are then indexed
+# and digested on their first request).
+TUTORIALS_WARMUP_ON_STARTUP = os.environ.get('TUTORIALS_WARMUP_ON_STARTUP', '1') == '1'
+# Seconds warmup may spend priming page digests before it gives up (0: no bound).
+TUTORIALS_WARMUP_BUDGET = float(os.environ.get('TUTORIALS_WARMUP_BUDGET', '10'))
+# Route the tutorial pages to their async views (abook_view, adisplay_page, ...),
+# which keep file I/O off the event loop. DataEngineering/asgi.py turns this on.
+TUTORIALS_ASYNC_VIEWS = os.environ.get('TUTORIALS_ASYNC_VIEWS', '0') == '1'
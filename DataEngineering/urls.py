@@ -27,6 +27,7 @@ from django.contrib.auth.views import LogoutView
 from .views import login_view, register_view
 from django.contrib.auth.decorators import login_required
 import book
+from pages.views import metrics_view
 
 def home_page(request):
     return render(request, "home/home.html")  # ✅ matches your template path
@@ -46,4 +47,5 @@ urlpatterns = [
     path('logout/', LogoutView.as_view(), name='logout'),
     path('course_rpi_python/', course_rpi_python, name='course_rpi_python'),
     path('book_view', include('book.urls')),  # Include the URLs from the book app
+    path('metrics', metrics_view, name='metrics'),  # Prometheus scrape endpoint
 ]
\ No newline at end of file
@@ -4,6 +4,11 @@ from django.http import HttpResponse
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 
+from pages import metrics
+
+# Connects the user-cache invalidation signals; see AUTHENTICATION_BACKENDS.
+from . import auth  # noqa: F401
+
 def login_view(request):
     if request.method == 'POST':
         form = AuthenticationForm(data=request.POST)
@@ -13,7 +18,8 @@ def login_view(request):
             return redirect('/')
     else:
         form = AuthenticationForm()
-    return render(request, 'login.html', {'form': form})
+    with metrics.phase('template_render'):
+        return render(request, 'login.html', {'form': form})
 
 def register_view(request):
     if request.method == 'POST':
@@ -24,4 +30,5 @@ def register_view(request):
             return redirect('/dashboard/')
     else:
         form = UserCreationForm()
-    return render(request, 'register.html', {'form': form})
\ No newline at end of file
+    with metrics.phase('template_render'):
+        return render(request, 'register.html', {'form': form})
\ No newline at end of file
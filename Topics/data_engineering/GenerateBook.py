@@ -1,3 +1,179 @@
 # Collect all the HTML files in the directory and generate a final book from them no pdf
-
+#
 # Create chapters and add the file name as header
+#
+# The book is one HTML file: a table of contents, then one section per
+# content root, chapter (subdirectory) and page, in the same numeric order
+# as the website. It is written chapter by chapter and each page body is
+# copied across in chunks, so memory stays flat however large the corpus.
+#
+# What we need to know about a page (its title and where its <body> starts
+# and ends) is kept in .book_cache.json, so pages that did not change since
+# the last build are not parsed again.
+#
+# The output file is never read back as a page, and neither is any other
+# book this script wrote (they carry GENERATOR_META), so re-running in the
+# same directory does not nest the previous book inside the new one.
+#
+#   python GenerateBook.py [root ...] [-o book.html] [--cache .book_cache.json]
+import os
+import re
+import html
+import json
+import time
+import argparse
+
+from book_common import GENERATOR_META, collect_pages
+
+CACHE_NAME = '.book_cache.json'
+# Bump when parse_page changes, to invalidate the cache.
+PARSER_VERSION = 2
+CHUNK_SIZE = 64 * 1024
+
+TITLE_RE = re.compile(rb'<title[^>]*>(.*?)</title\s*>', re.IGNORECASE | re.DOTALL)
+H1_RE = re.compile(rb'<h1[^>]*>(.*?)</h1\s*>', re.IGNORECASE | re.DOTALL)
+BODY_OPEN_RE = re.compile(rb'<body[^>]*>', re.IGNORECASE)
+BODY_CLOSE_RE = re.compile(rb'</body\s*>', re.IGNORECASE)
+TAG_RE = re.compile(r'<[^>]+>')
+
+STYLE = """
+body { font-family: Arial, sans-serif; max-width: 60rem; margin: 0 auto; padding: 0 1rem; }
+nav#toc ol { line-height: 1.5; }
+section.chapter > h2, section.part > h1 { border-bottom: 1px solid #ccc; }
+article.page { border-top: 1px dashed #ddd; margin-top: 2rem; }
+"""
+
+
+def parse_page(path):
+    """Return the title of a page and the byte range of its <body> content."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    match = TITLE_RE.search(raw) or H1_RE.search(raw)
+    title = TAG_RE.sub('', match.group(1).decode('utf-8', 'replace')).strip() if match else ''
+    body_open = BODY_OPEN_RE.search(raw)
+    start = body_open.end() if body_open else 0
+    body_close = BODY_CLOSE_RE.search(raw, start)
+    end = body_close.start() if body_close else len(raw)
+    return {
+        'title': html.unescape(' '.join(title.split())) or os.path.splitext(os.path.basename(path))[0],
+        'body': [start, end],
+        'generated': GENERATOR_META in raw[:start],
+    }
+
+
+class ParseCache:
+    """Parse results of earlier builds, reused while a file's mtime and size are unchanged."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.hits = self.misses = 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == PARSER_VERSION:
+                self.entries = data['pages']
+        except (OSError, ValueError, KeyError):
+            pass
+        self.used = {}
+
+    def get(self, path):
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        entry = self.entries.get(key)
+        if entry is None or (entry['mtime_ns'], entry['size']) != (stat.st_mtime_ns, stat.st_size):
+            entry = dict(parse_page(path), mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            self.misses += 1
+        else:
+            self.hits += 1
+        self.used[key] = entry
+        return entry
+
+    def save(self):
+        # Only pages of this build are kept, so removed pages drop out.
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': PARSER_VERSION, 'pages': self.used}, f)
+        os.replace(tmp_path, self.path)
+
+
+def copy_range(source, target, start, end):
+    """Copy bytes [start, end) of the file at source into target, one chunk at a time."""
+    with open(source, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            target.write(chunk)
+            remaining -= len(chunk)
+
+
+def generate_book(roots, output_html, cache_path=None, title="Data Engineering Concepts"):
+    print(f"Building {output_html} from {', '.join(roots)}...")
+    started = time.perf_counter()
+    cache = ParseCache(cache_path or os.path.join(os.path.dirname(os.path.abspath(output_html)), CACHE_NAME))
+
+    # Only the outline is held in memory: (root, [(chapter, [(path, entry)])]).
+    parts = []
+    skipped = 0
+    for root in roots:
+        chapters = []
+        for chapter, paths in collect_pages(root, exclude=[output_html, output_html + '.tmp']):
+            pages = [(path, cache.get(path)) for path in paths]
+            kept = [(path, entry) for path, entry in pages if not entry['generated']]
+            skipped += len(pages) - len(kept)
+            if kept:
+                chapters.append((chapter, kept))
+        parts.append((os.path.basename(os.path.abspath(root)), chapters))
+    if skipped:
+        print(f"Skipped {skipped} book(s) written by an earlier run")
+
+    def esc(text):
+        return html.escape(text).encode('utf-8')
+
+    tmp_path = output_html + '.tmp'
+    with open(tmp_path, 'wb') as out:
+        out.write(b'<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="UTF-8">\n' + GENERATOR_META + b'\n')
+        out.write(b'<title>' + esc(title) + b'</title>\n<style>' + STYLE.encode() + b'</style>\n</head>\n<body>\n')
+        out.write(b'<h1>' + esc(title) + b'</h1>\n<nav id="toc">\n<h2>Table of Contents</h2>\n<ol>\n')
+        for p, (part, chapters) in enumerate(parts, 1):
+            out.write(b'<li><a href="#part-%d">' % p + esc(part) + b'</a>\n<ol>\n')
+            for c, (chapter, pages) in enumerate(chapters, 1):
+                out.write(b'<li><a href="#chapter-%d-%d">' % (p, c) + esc(chapter) + b'</a>\n<ol>\n')
+                for n, (path, entry) in enumerate(pages, 1):
+                    out.write(b'<li><a href="#page-%d-%d-%d">' % (p, c, n) + esc(entry['title']) + b'</a></li>\n')
+                out.write(b'</ol>\n</li>\n')
+            out.write(b'</ol>\n</li>\n')
+        out.write(b'</ol>\n</nav>\n')
+
+        pages_written = 0
+        for p, (part, chapters) in enumerate(parts, 1):
+            out.write(b'<section class="part" id="part-%d">\n<h1>' % p + esc(part) + b'</h1>\n')
+            for c, (chapter, pages) in enumerate(chapters, 1):
+                out.write(b'<section class="chapter" id="chapter-%d-%d">\n<h2>' % (p, c) + esc(chapter) + b'</h2>\n')
+                for n, (path, entry) in enumerate(pages, 1):
+                    out.write(b'<article class="page" id="page-%d-%d-%d">\n<h3>' % (p, c, n) + esc(entry['title']) + b'</h3>\n')
+                    copy_range(path, out, *entry['body'])
+                    out.write(b'\n</article>\n')
+                    pages_written += 1
+                out.write(b'</section>\n')
+            out.write(b'</section>\n')
+        out.write(b'</body>\n</html>\n')
+    os.replace(tmp_path, output_html)
+    cache.save()
+    print(f"Wrote {pages_written} pages in {time.perf_counter() - started:.2f}s "
+          f"({cache.hits} parsed before, {cache.misses} parsed now)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Assemble the HTML pages below one or more content roots into one HTML book.")
+    parser.add_argument('roots', nargs='*', default=[os.getcwd()], help="Content roots, in book order (default: current directory)")
+    parser.add_argument('-o', '--output', default='book.html', help="Output HTML file (default: %(default)s)")
+    parser.add_argument('--cache', help=f"Parse cache file (default: {CACHE_NAME} next to the output)")
+    parser.add_argument('--title', default="Data Engineering Concepts", help="Book title (default: %(default)s)")
+    args = parser.parse_args()
+
+    generate_book(args.roots, args.output, args.cache, args.title)
+    print(f"Book generated successfully: {args.output}")
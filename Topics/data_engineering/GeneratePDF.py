@@ -1,77 +1,157 @@
 # from current directory go through all subdirectories and find all .html files
 # To PDF file, add each subdirectory as new chapter and convert all html files and add them to the chapter
+#
+# Every page is converted to its own PDF in a process pool and cached under
+# .pdf_cache/ by the hash of its source, so a re-run only converts the pages
+# that changed and then merges. The source HTML files are never modified:
+# the page title header is added to an in-memory copy.
+#
+# The merge streams pages into the output one input at a time (pdf_stream.py)
+# and builds the bookmarks from the chapter list, so memory does not grow
+# with the size of the book.
+#
+#   python GeneratePDF.py [input_dir] [-o output.pdf] [--jobs N] [--force]
 import os
-import pdfkit
+import re
+import html
+import time
+import hashlib
+import argparse
 from pathlib import Path
-from PyPDF2 import PdfMerger
-from PyPDF2 import PdfReader
-from PyPDF2 import PdfWriter
+from concurrent.futures import ProcessPoolExecutor
+
+import pdfkit
+
+from book_common import GENERATOR_META, collect_pages
+from pdf_stream import StreamingPdfWriter
+
+CACHE_DIR_NAME = '.pdf_cache'
+
+# Passed to wkhtmltopdf. The pages are rendered from a string, so local
+# images and stylesheets are resolved through the <base> tag we inject.
+PDFKIT_OPTIONS = {
+    'encoding': 'UTF-8',
+    'enable-local-file-access': None,
+    'quiet': '',
+}
+
+# Bump when the way a page is turned into a PDF changes, to invalidate the cache.
+BUILDER_VERSION = '1'
+
+BODY_RE = re.compile(r'<body[^>]*>', re.IGNORECASE)
+HEAD_RE = re.compile(r'<head[^>]*>', re.IGNORECASE)
+
+
+def with_header(content, title, base_dir):
+    """Return the page with its title as a <h1> and a <base> for relative links, leaving the file alone."""
+    header = f"<h1>{html.escape(title)}</h1>"
+    base = f'<base href="{Path(base_dir).resolve().as_uri()}/">'
+    match = BODY_RE.search(content)
+    if match:
+        content = content[:match.end()] + header + content[match.end():]
+    else:
+        content = header + content
+    match = HEAD_RE.search(content)
+    if match:
+        return content[:match.end()] + base + content[match.end():]
+    return base + content
+
+
+def page_digest(content):
+    """Cache key of a page: its final HTML plus everything that affects the conversion."""
+    digest = hashlib.sha256()
+    digest.update(BUILDER_VERSION.encode())
+    digest.update(repr(sorted(PDFKIT_OPTIONS.items())).encode())
+    digest.update(content.encode('utf-8'))
+    return digest.hexdigest()[:32]
 
-def convert_html_to_pdf(input_dir, output_pdf):
+
+def render_pdf(content, pdf_path):
+    """Convert one HTML string to pdf_path. Runs in a worker process."""
+    tmp_path = f"{pdf_path}.{os.getpid()}.tmp"
+    pdfkit.from_string(content, tmp_path, options=PDFKIT_OPTIONS)
+    os.replace(tmp_path, pdf_path)
+    return pdf_path
+
+
+def prepare_page(html_file):
+    """Return the HTML to convert for html_file, or None for a book GenerateBook.py wrote."""
+    with open(html_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+    body = BODY_RE.search(content)
+    if body and GENERATOR_META.decode() in content[:body.start()]:
+        return None
+    return with_header(content, os.path.basename(html_file), os.path.dirname(html_file))
+
+
+def merge_pdfs(chapters, output_pdf):
+    """Write the book from [(chapter, [(title, pdf path)])], with one bookmark per chapter and page."""
+    tmp_output = output_pdf + '.tmp'
+    with open(tmp_output, 'wb') as f:
+        writer = StreamingPdfWriter(f)
+        for chapter, pages in chapters:
+            chapter_item = None
+            for title, pdf_file in pages:
+                first_page = writer.add_pdf(pdf_file)
+                if chapter_item is None:
+                    chapter_item = writer.add_outline(chapter, first_page)
+                writer.add_outline(title, first_page, parent=chapter_item)
+        writer.close()
+    os.replace(tmp_output, output_pdf)
+
+
+def convert_html_to_pdf(input_dir, output_pdf, jobs=None, cache_dir=None, force=False):
     print(f"Converting HTML files in {input_dir} to PDF...")
+    started = time.perf_counter()
+    cache_dir = cache_dir or os.path.join(input_dir, CACHE_DIR_NAME)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # The chapter manifest: [(chapter, [(page title, cached pdf path)])] in book order.
+    manifest = []
+    pending = {}
+    for chapter, pages in collect_pages(input_dir):
+        entries = []
+        for page in pages:
+            content = prepare_page(page)
+            if content is None:
+                continue
+            pdf_file = os.path.join(cache_dir, page_digest(content) + '.pdf')
+            if force or not os.path.exists(pdf_file):
+                pending[pdf_file] = content
+            entries.append((Path(page).stem, pdf_file))
+        if entries:
+            manifest.append((chapter, entries))
+    pdf_files = [pdf_file for chapter, entries in manifest for title, pdf_file in entries]
+
+    print(f"{len(pdf_files)} pages, {len(pdf_files) - len(pending)} cached, {len(pending)} to convert")
+    if pending:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(render_pdf, content, pdf_file) for pdf_file, content in pending.items()]
+            for done, future in enumerate(futures, 1):
+                future.result()
+                print(f"  converted {done}/{len(futures)}")
+
+    merge_pdfs(manifest, output_pdf)
+
+    # PDFs of pages that were edited or removed are no longer referenced.
+    keep = {os.path.basename(pdf_file) for pdf_file in pdf_files}
+    for name in os.listdir(cache_dir):
+        if name.endswith('.pdf') and name not in keep:
+            os.remove(os.path.join(cache_dir, name))
+    print(f"Built {output_pdf} in {time.perf_counter() - started:.1f}s")
 
-    # Create a list to store the paths of the HTML files
-    html_files = []
-
-    toc = []
-
-    # Walk through the directory and find all HTML files
-    for root, dirs, files in os.walk(input_dir):
-        Chapter = root.split("/")[-1]
-        toc.append(Chapter)
-        # Check if the directory is not empty
-        for file in files:
-            if file.endswith('.html'):
-                file_path = os.path.join(root, file)
-                html_files.append(os.path.join(root, file))
-                toc.append(file)
-                # open same html file and add File name as header
-                with open(file_path, 'r') as f:
-                    content = f.read()
-                # Add the file name as a header in the HTML content
-                content = f"<h1>{file}</h1>" + content
-                # Write the modified content back to the HTML file
-                with open(file_path, 'w') as f:
-                    f.write(content)
-
-
-    html_files.sort()
-    # Create a PDF merger object
-    merger = PdfMerger()
-
-    # Create a temporary HTML file for the table of contents
-    toc_html = "<html><body><h1>Table of Contents</h1><ul>"
-    for item in toc:
-        toc_html += f"<li><a href='{item}.html'>{item}</a></li>"
-
-    toc_html += "</ul></body></html>"
-
-    toc_file = os.path.join(input_dir, 'toc.html')
-    with open(toc_file, 'w') as f:
-        f.write(toc_html)
-
-    # Convert the table of contents HTML file to PDF and add it to the merger
-    toc_pdf = toc_file.replace('.html', '.pdf')
-    pdfkit.from_file(toc_file, toc_pdf)
-    merger.append(toc_pdf)
-    # remove the temporary TOC PDF file
-    os.remove(toc_pdf)
-
-    # Convert each HTML file to PDF and add it to the merger
-    for html_file in html_files:
-        pdf_file = html_file.replace('.html', '.pdf')
-        pdfkit.from_file(html_file, pdf_file)
-        merger.append(pdf_file)
-        # remove the temporary PDF file
-        os.remove(pdf_file)
-
-    # Write out the merged PDF
-    merger.write(output_pdf)
-    merger.close()
 
 if __name__ == "__main__":
-    input_directory = os.getcwd()
-    output_pdf_file = os.path.join(os.getcwd(), 'output.pdf')
+    parser = argparse.ArgumentParser(description="Build one PDF book from the HTML pages below a directory.")
+    parser.add_argument('input_dir', nargs='?', default=os.getcwd())
+    parser.add_argument('-o', '--output', help="Output PDF (default: <input_dir>/output.pdf)")
+    parser.add_argument('--jobs', type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--cache-dir', help=f"Per-page PDF cache (default: <input_dir>/{CACHE_DIR_NAME})")
+    parser.add_argument('--force', action='store_true', help="Convert every page even if it is cached")
+    args = parser.parse_args()
+
+    input_directory = args.input_dir
+    output_pdf_file = args.output or os.path.join(input_directory, 'output.pdf')
 
-    convert_html_to_pdf(input_directory, output_pdf_file)
+    convert_html_to_pdf(input_directory, output_pdf_file, args.jobs, args.cache_dir, args.force)
     print(f"PDF generated successfully: {output_pdf_file}")
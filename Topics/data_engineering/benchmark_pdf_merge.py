@@ -0,0 +1,141 @@
+# Compare the streaming merge of GeneratePDF.py (pdf_stream.py) with
+# PyPDF2's PdfMerger on a synthetic book, recording wall time and peak RSS.
+#
+#   python benchmark_pdf_merge.py [--pages 1000,5000] [--pages-per-chapter 10]
+#
+# Each (merger, size) runs in its own process so peak RSS is measured cleanly.
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import resource
+import argparse
+import tempfile
+import subprocess
+
+from PyPDF2 import PageObject, PdfMerger, PdfReader, PdfWriter, __version__ as pypdf2_version
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from pdf_stream import StreamingPdfWriter
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'benchmarks', 'baselines', 'pdf_merge.json')
+
+TEXT = "Synthetic benchmark page %d of chapter %d. Python data engineering with pandas, SQL and REST APIs."
+
+
+def generate_chapters(directory, pages, pages_per_chapter):
+    """Write the book as one PDF per chapter, each page with a text stream and a shared font."""
+    chapters = []
+    for chapter in range(1, (pages + pages_per_chapter - 1) // pages_per_chapter + 1):
+        writer = PdfWriter()
+        font = writer._add_object(DictionaryObject({
+            NameObject('/Type'): NameObject('/Font'),
+            NameObject('/Subtype'): NameObject('/Type1'),
+            NameObject('/BaseFont'): NameObject('/Helvetica'),
+        }))
+        for index in range(min(pages_per_chapter, pages - (chapter - 1) * pages_per_chapter)):
+            page = PageObject.create_blank_page(None, 612, 792)
+            lines = [f"BT /F1 11 Tf 72 {720 - 14 * line} Td ({TEXT % (index + 1, chapter)}) Tj ET"
+                     for line in range(40)]
+            content = DecodedStreamObject()
+            content.set_data('\n'.join(lines).encode('latin-1'))
+            page[NameObject('/Contents')] = writer._add_object(content)
+            page[NameObject('/Resources')] = DictionaryObject({
+                NameObject('/Font'): DictionaryObject({NameObject('/F1'): font}),
+            })
+            writer.add_page(page)
+        path = os.path.join(directory, f'{chapter:05d}.pdf')
+        with open(path, 'wb') as f:
+            writer.write(f)
+        chapters.append(path)
+    return chapters
+
+
+def merge_streaming(chapters, output):
+    with open(output, 'wb') as f:
+        writer = StreamingPdfWriter(f)
+        for number, path in enumerate(chapters, 1):
+            writer.add_outline(f"Chapter {number}", writer.add_pdf(path))
+        writer.close()
+
+
+def merge_pdfmerger(chapters, output):
+    merger = PdfMerger()
+    for number, path in enumerate(chapters, 1):
+        merger.append(path, outline_item=f"Chapter {number}")
+    merger.write(output)
+    merger.close()
+
+
+MERGERS = {'streaming': merge_streaming, 'pdfmerger': merge_pdfmerger}
+
+
+def run_worker(merger, directory, output):
+    chapters = sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.pdf'))
+    started = time.perf_counter()
+    MERGERS[merger](chapters, output)
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is in kilobytes on Linux. Taken before reading the output back.
+    peak_rss_mb = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    pages = len(PdfReader(output).pages)
+    print(json.dumps({
+        'seconds': round(elapsed, 2),
+        'peak_rss_mb': peak_rss_mb,
+        'pages': pages,
+        'output_mb': round(os.path.getsize(output) / 1024 / 1024, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming PDF merge against PdfMerger.")
+    parser.add_argument('--pages', default='1000,5000', help="Comma-separated book sizes in pages (default: %(default)s)")
+    parser.add_argument('--pages-per-chapter', type=int, default=10, help="(default: %(default)s)")
+    parser.add_argument('--mergers', default=','.join(MERGERS), help="(default: %(default)s)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Where to write the results (default: %(default)s)")
+    parser.add_argument('--worker', nargs=3, metavar=('MERGER', 'DIR', 'OUTPUT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    results = {}
+    for pages in [int(size) for size in args.pages.split(',') if size.strip()]:
+        scratch = tempfile.mkdtemp(prefix='pdf-merge-bench-')
+        try:
+            print(f"Generating a synthetic {pages}-page book...")
+            chapters_dir = os.path.join(scratch, 'chapters')
+            os.makedirs(chapters_dir)
+            generate_chapters(chapters_dir, pages, args.pages_per_chapter)
+            results[str(pages)] = {}
+            for merger in args.mergers.split(','):
+                completed = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--worker', merger, chapters_dir,
+                     os.path.join(scratch, f'{merger}.pdf')],
+                    check=True, capture_output=True, text=True,
+                )
+                result = json.loads(completed.stdout.strip().splitlines()[-1])
+                results[str(pages)][merger] = result
+                print(f"  {merger}: {result['seconds']}s, peak RSS {result['peak_rss_mb']}MB, {result['pages']} pages")
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'suite': 'pdf_merge',
+            'environment': {
+                'python': platform.python_version(),
+                'PyPDF2': pypdf2_version,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+            },
+            'results': results,
+        }, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"Wrote {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+# Shared by GeneratePDF.py and GenerateBook.py: find the pages of a content
+# root in the same reading order the website uses.
+import os
+import re
+
+# Written into the <head> of every book GenerateBook.py builds, so that
+# neither script reads a generated book back as a page.
+GENERATOR_META = b'<meta name="generator" content="GenerateBook.py">'
+
+
+def numeric_key(name):
+    """Sort '1.2 Variables.html' before '1.10 Sets.html' (same order as the website)."""
+    match = re.match(r'^(\d+)\.(\d*)\.?', name)
+    if match:
+        return (int(match.group(1)), int(match.group(2) or 0), name)
+    return (float('inf'), 0, name)
+
+
+def collect_pages(input_dir, exclude=()):
+    """Return [(chapter, [html paths])] in reading order, leaving out the paths in exclude."""
+    exclude = {os.path.abspath(path) for path in exclude}
+    chapters = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs[:] = sorted((d for d in dirs if not d.startswith('.')), key=numeric_key)
+        pages = sorted((f for f in files if f.endswith('.html')
+                        and os.path.abspath(os.path.join(root, f)) not in exclude), key=numeric_key)
+        if pages:
+            chapter = os.path.basename(root) if root != input_dir else os.path.basename(os.path.abspath(input_dir))
+            chapters.append((chapter, [os.path.join(root, page) for page in pages]))
+    return chapters
@@ -0,0 +1,157 @@
+# Incremental PDF merging for GeneratePDF.py.
+#
+# PdfMerger keeps every page of every input in memory until write(). The
+# StreamingPdfWriter below copies the pages of one input PDF at a time
+# straight to the output stream and only remembers where each object
+# starts (for the xref table), so memory stays flat however long the book.
+from PyPDF2 import PdfReader
+from PyPDF2.generic import (
+    ArrayObject, DictionaryObject, FloatObject, IndirectObject, NameObject, NullObject,
+    NumberObject, StreamObject, create_string_object,
+)
+
+
+class StreamingPdfWriter:
+    """Write a PDF to a binary stream page by page.
+
+    Usage: add_pdf() every input in order, add_outline() the bookmarks,
+    then close(). Object numbers are handed out as objects are written;
+    the page tree, outline and catalog are written last.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.offsets = []
+        self.page_numbers = []
+        self.outline = []
+        self.stream.write(b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n')
+        self.pages_number = self._reserve()
+
+    def _reserve(self):
+        self.offsets.append(None)
+        return len(self.offsets)
+
+    def _write(self, number, obj):
+        self.offsets[number - 1] = self.stream.tell()
+        self.stream.write(b'%d 0 obj\n' % number)
+        obj.write_to_stream(self.stream, None)
+        self.stream.write(b'\nendobj\n')
+
+    def _ref(self, number):
+        return IndirectObject(number, 0, self)
+
+    def add_pdf(self, path):
+        """Append every page of the PDF at path; return the index of its first page."""
+        first_page = len(self.page_numbers)
+        reader = PdfReader(path)
+        # Object numbers of this file -> ours. Shared resources (fonts,
+        # images) are copied once per file; the map is dropped afterwards.
+        numbers = {}
+        pending = []
+        for page in reader.pages:
+            number = self._reserve()
+            numbers[page.indirect_reference.idnum, page.indirect_reference.generation] = number
+            self.page_numbers.append(number)
+
+        def copy(obj):
+            if isinstance(obj, IndirectObject):
+                key = obj.idnum, obj.generation
+                if key not in numbers:
+                    target = obj.get_object()
+                    if isinstance(target, DictionaryObject) and target.get('/Type') in ('/Page', '/Pages'):
+                        # A link to a page outside this file's pages, or to its page tree.
+                        return NullObject()
+                    numbers[key] = self._reserve()
+                    pending.append((numbers[key], target))
+                return self._ref(numbers[key])
+            if isinstance(obj, StreamObject):
+                new = obj.__class__()
+                for key, value in obj.items():
+                    if key != '/Length':
+                        new[NameObject(key)] = copy(value)
+                new._data = obj._data
+                return new
+            if isinstance(obj, DictionaryObject):
+                new = DictionaryObject()
+                for key, value in obj.items():
+                    new[NameObject(key)] = copy(value)
+                return new
+            if isinstance(obj, ArrayObject):
+                return ArrayObject(copy(value) for value in obj)
+            return obj
+
+        for page in reader.pages:
+            new_page = DictionaryObject()
+            for key, value in page.items():
+                if key != '/Parent':
+                    new_page[NameObject(key)] = copy(value)
+            new_page[NameObject('/Parent')] = self._ref(self.pages_number)
+            self._write(numbers[page.indirect_reference.idnum, page.indirect_reference.generation], new_page)
+            while pending:
+                number, obj = pending.pop()
+                self._write(number, copy(obj))
+        return first_page
+
+    def add_outline(self, title, page_index, parent=None):
+        """Add a bookmark to page_index (0-based) and return it, to nest others under it."""
+        item = {'title': title, 'page': page_index, 'children': []}
+        (parent['children'] if parent else self.outline).append(item)
+        return item
+
+    def _write_outline(self, items, parent_number):
+        numbers = [self._reserve() for item in items]
+        total = 0
+        for i, (item, number) in enumerate(zip(items, numbers)):
+            node = DictionaryObject({
+                NameObject('/Title'): create_string_object(item['title']),
+                NameObject('/Parent'): self._ref(parent_number),
+                NameObject('/Dest'): ArrayObject([
+                    self._ref(self.page_numbers[item['page']]), NameObject('/XYZ'),
+                    NullObject(), NullObject(), FloatObject(0),
+                ]),
+            })
+            if i:
+                node[NameObject('/Prev')] = self._ref(numbers[i - 1])
+            if i + 1 < len(numbers):
+                node[NameObject('/Next')] = self._ref(numbers[i + 1])
+            if item['children']:
+                first, last, count = self._write_outline(item['children'], number)
+                node[NameObject('/First')] = self._ref(first)
+                node[NameObject('/Last')] = self._ref(last)
+                # Negative: chapters start collapsed.
+                node[NameObject('/Count')] = NumberObject(-count)
+            self._write(number, node)
+            total += 1
+        return numbers[0], numbers[-1], total
+
+    def close(self):
+        """Write the page tree, outline, catalog, xref table and trailer."""
+        self._write(self.pages_number, DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): ArrayObject(self._ref(number) for number in self.page_numbers),
+            NameObject('/Count'): NumberObject(len(self.page_numbers)),
+        }))
+        catalog = DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): self._ref(self.pages_number),
+        })
+        if self.outline:
+            outlines_number = self._reserve()
+            first, last, count = self._write_outline(self.outline, outlines_number)
+            self._write(outlines_number, DictionaryObject({
+                NameObject('/Type'): NameObject('/Outlines'),
+                NameObject('/First'): self._ref(first),
+                NameObject('/Last'): self._ref(last),
+                NameObject('/Count'): NumberObject(count),
+            }))
+            catalog[NameObject('/Outlines')] = self._ref(outlines_number)
+            catalog[NameObject('/PageMode')] = NameObject('/UseOutlines')
+        catalog_number = self._reserve()
+        self._write(catalog_number, catalog)
+
+        xref_offset = self.stream.tell()
+        self.stream.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(self.offsets) + 1))
+        for offset in self.offsets:
+            self.stream.write(b'%010d 00000 n \n' % offset)
+        self.stream.write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                          % (len(self.offsets) + 1, catalog_number, xref_offset))
@@ -1,6 +1,10 @@
+from django.conf import settings
 from .views import book_view
 from django.urls import path
 
+if settings.TUTORIALS_ASYNC_VIEWS:
+    from .views import abook_view as book_view
+
 # URL patterns for the book app
 # This will handle URLs like /book/<str:topic>/
 # where <str:topic> is a placeholder for the topic name.
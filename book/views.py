@@ -1,18 +1,44 @@
+import os
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
 
+from pages import metrics
+
+
+logger = logging.getLogger(__name__)
+
 # Create your views here.
 def book_view(request, topic=None, subtopic=None):
     """
     View to render the book page with the selected topic and subtopic.
     If no topic or subtopic is provided, it defaults to the first available topic and subtopic.
     """
+    context = book_context(topic, subtopic)
+    with metrics.phase('template_render'):
+        return render(request, 'book/book.html', context)
+
+async def abook_view(request, topic=None, subtopic=None):
+    """
+    Async version of book_view for ASGI: the directory listing and file read
+    run in a worker thread, so the event loop keeps serving other clients.
+    """
+    context = await asyncio.to_thread(book_context, topic, subtopic)
+    with metrics.phase('template_render'):
+        return await sync_to_async(render)(request, 'book/book.html', context)
+
+def book_context(topic, subtopic):
+    """Return the template context of the book page for topic and subtopic."""
     # Define the directory where HTML pages are stored
     HTML_TOPICS_PAGES_DIR = 'Topics/course'
     
     # Get the directory structure for the topics
     structure = {}
     if topic:
-        structure[topic] = [f for f in os.listdir(os.path.join(HTML_TOPICS_PAGES_DIR, topic)) if f.endswith('.html')]
+        with metrics.phase('fs_scan'):
+            structure[topic] = [f for f in os.listdir(os.path.join(HTML_TOPICS_PAGES_DIR, topic)) if f.endswith('.html')]
     
     # If no topic is selected, use the first topic and its first subtopic
     if not subtopic and structure:
@@ -23,18 +49,16 @@ def book_view(request, topic=None, subtopic=None):
     content = ""
     if topic and subtopic:
         file_path = os.path.join(HTML_TOPICS_PAGES_DIR, topic, subtopic)
-        print(f"File path: {file_path}")
+        logger.debug("File path: %s", file_path)
         if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with metrics.phase('file_read'), open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
         else:
             content = "<p>File not found.</p>"
     
-    context = {
+    return {
         'structure': structure,
         'selected_topic': topic,
         'selected_subtopic': subtopic,
         'content': content,
     }
-    
-    return render(request, 'book/book.html', context)
\ No newline at end of file
@@ -0,0 +1,17 @@
+# gunicorn -c gunicorn.conf.py
+#
+# The app is loaded once in the master before forking, so the content roots
+# are warmed (pages.apps) and the topics snapshot published by
+# `manage.py build_topics_manifest` is mapped before any worker exists.
+# Workers share those pages instead of each building their own copy.
+#
+# To serve the async views instead, run the ASGI app with an ASGI worker, e.g.
+#   gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker DataEngineering.asgi:application
+# (`manage.py benchmark_asgi` compares the two on the same content tree).
+import multiprocessing
+import os
+
+wsgi_app = 'DataEngineering.wsgi:application'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
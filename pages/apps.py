@@ -1,6 +1,19 @@
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PagesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "pages"
+
+    def ready(self):
+        # Warm the tutorial content roots so the first request to any track is
+        # already hot. Management commands other than runserver skip this.
+        if not getattr(settings, 'TUTORIALS_WARMUP_ON_STARTUP', False):
+            return
+        if sys.argv[0].endswith('manage.py') and sys.argv[1:2] != ['runserver']:
+            return
+        from .content_roots import get_registry
+        get_registry().warmup()
@@ -0,0 +1,214 @@
+import os
+import json
+import math
+import time
+import sys
+import shutil
+import platform
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.test import Client
+
+
+# Median milliseconds a fresh `import DataEngineering.wsgi` may take; checked by
+# pages.tests.ColdStartTests and by `profile_startup --budget` in CI.
+COLD_START_BUDGET_MS = 3000
+# Imported on first use only; none of them may load during a cold start.
+DEFERRED_IMPORTS = ('pandas', 'matplotlib', 'boto3', 'PIL')
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="UTF-8"><title>{title}</title></head>
+<body>
+<h1>{title}</h1>
+<p>Synthetic benchmark page {index} of chapter {chapter}. Python data engineering
+with pandas, SQL, REST APIs and cloud storage; lists, dictionaries, generators
+and classes. {filler}</p>
+</body>
+</html>
+"""
+
+
+def generate_topics_tree(base_dir, root_name, pages, pages_per_chapter=100):
+    """Write `pages` synthetic HTML pages under base_dir/root_name, named like the real tree.
+
+    Returns the list of page paths relative to base_dir.
+    """
+    root_dir = os.path.join(base_dir, root_name)
+    written = []
+    for index in range(pages):
+        chapter = index // pages_per_chapter + 1
+        page = index % pages_per_chapter + 1
+        chapter_dir = os.path.join(root_dir, f"{chapter}. Chapter {chapter}")
+        if page == 1:
+            os.makedirs(chapter_dir, exist_ok=True)
+        title = f"{chapter}.{page} Page {page}"
+        file_path = os.path.join(chapter_dir, f"{title}.html")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(PAGE_TEMPLATE.format(title=title, index=page, chapter=chapter, filler='lorem ipsum ' * 20))
+        written.append(os.path.relpath(file_path, base_dir).replace(os.sep, '/'))
+    return written
+
+
+class SyntheticTopics:
+    """Context manager owning a temporary Topics directory."""
+
+    def __init__(self, prefix='topics-bench-'):
+        self.prefix = prefix
+        self.path = None
+
+    def __enter__(self):
+        self.path = tempfile.mkdtemp(prefix=self.prefix)
+        return self
+
+    def __exit__(self, *exc):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def percentile(sorted_values, fraction):
+    """Return the nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies, wall_seconds, errors=0):
+    """Return throughput and latency percentiles (milliseconds) for one run."""
+    values = sorted(latencies)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'throughput_rps': round(len(values) / wall_seconds, 1) if wall_seconds else 0.0,
+        'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+        'max_ms': round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def drain(response):
+    """Consume a (possibly streaming) response body, as a real client would."""
+    if response.streaming:
+        for chunk in response.streaming_content:
+            pass
+    return response
+
+
+def run_load(make_request, total_requests, concurrency):
+    """Call make_request(client, i) total_requests times from `concurrency` threads.
+
+    Every worker thread gets its own test client. A response with a status
+    of 400 or more counts as an error.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    local = threading.local()
+    counter = iter(range(total_requests))
+
+    def worker():
+        local.client = Client()
+        mine = []
+        failed = 0
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            started = time.perf_counter()
+            response = drain(make_request(local.client, i))
+            mine.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                failed += 1
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return summarize(latencies, time.perf_counter() - started, errors[0])
+
+
+def run_worker_process(command, options, env):
+    """Run `manage.py <command> --worker-output FILE` in a fresh process and return its JSON.
+
+    Settings such as DATABASES and SESSION_ENGINE are fixed when Django
+    starts, so each configuration under test gets its own process, with
+    its own scratch SQLite database.
+    """
+    with tempfile.TemporaryDirectory(prefix=f'{command}-') as scratch:
+        output = os.path.join(scratch, 'result.json')
+        arguments = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), command]
+        for name, value in options.items():
+            arguments += [f'--{name}', str(value)]
+        env = dict(os.environ, TUTORIALS_WARMUP_ON_STARTUP='0', SQLITE_PATH=os.path.join(scratch, 'db.sqlite3'), **env)
+        subprocess.run(arguments + ['--worker-output', output], env=env, check=True, stdout=subprocess.DEVNULL)
+        with open(output, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def parse_importtime(stderr):
+    """Parse `python -X importtime` output into (module, self_us, cumulative_us, depth) tuples."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def environment():
+    """Describe the machine a baseline was recorded on."""
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def write_results(path, suite, results):
+    """Write a JSON baseline for `suite`."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'suite': suite, 'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(baseline_path, results, tolerance):
+    """Return human-readable regressions of results against a stored baseline.
+
+    A case regresses when its p95 latency grows, or its throughput drops, by
+    more than `tolerance` (a fraction, e.g. 0.2 for 20%).
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    regressions = []
+    for case, metrics in _flatten(results):
+        old = dict(_flatten(baseline)).get(case)
+        if old is None:
+            continue
+        if old['p95_ms'] and metrics['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{case}: p95 {old['p95_ms']}ms -> {metrics['p95_ms']}ms")
+        if old['throughput_rps'] and metrics['throughput_rps'] < old['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{case}: throughput {old['throughput_rps']} -> {metrics['throughput_rps']} req/s")
+    return regressions
+
+
+def _flatten(results, prefix=''):
+    for key, value in sorted(results.items()):
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and 'p95_ms' in value:
+            yield name, value
+        elif isinstance(value, dict):
+            yield from _flatten(value, name + '/')
@@ -0,0 +1,122 @@
+import os
+import gzip
+import logging
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available.
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+# Sibling suffix for each content coding, best first.
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')] if brotli else [('gzip', '.gz')]
+
+# Like whitenoise, only keep a compressed copy that saves at least 5%.
+MIN_RATIO = 0.95
+
+# Offline (compress_topics, the static export) the best ratio is worth its
+# time. Inside a request it is not: brotli 11 costs far more CPU than 4-5
+# for a few percent, so responses compressed on the fly use these levels.
+BROTLI_QUALITY = 11
+GZIP_LEVEL = 9
+RESPONSE_BROTLI_QUALITY = getattr(settings, 'TUTORIALS_RESPONSE_BROTLI_QUALITY', 5)
+RESPONSE_GZIP_LEVEL = getattr(settings, 'TUTORIALS_RESPONSE_GZIP_LEVEL', 6)
+
+
+def compress_bytes(data, brotli_quality=BROTLI_QUALITY, gzip_level=GZIP_LEVEL):
+    """Return {encoding: compressed bytes} for every coding worth using on data."""
+    variants = {}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=brotli_quality)
+    variants['gzip'] = gzip.compress(data, compresslevel=gzip_level, mtime=0)
+    return {
+        encoding: compressed for encoding, compressed in variants.items()
+        if len(compressed) < len(data) * MIN_RATIO
+    }
+
+
+def compress_file(file_path):
+    """Write .br/.gz siblings of file_path; return the encodings written.
+
+    Siblings that are already newer than the source are left alone.
+    """
+    written = []
+    source_mtime = os.stat(file_path).st_mtime_ns
+    pending = [
+        (encoding, suffix) for encoding, suffix in ENCODINGS
+        if not _is_fresh(file_path + suffix, source_mtime)
+    ]
+    if not pending:
+        return written
+    with open(file_path, 'rb') as f:
+        variants = compress_bytes(f.read())
+    for encoding, suffix in pending:
+        target = file_path + suffix
+        if encoding not in variants:
+            # Not worth compressing; drop any stale copy so it is never served.
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+        tmp_path = target + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(variants[encoding])
+        os.replace(tmp_path, target)
+        written.append(encoding)
+    return written
+
+
+def accepted_encodings(request):
+    """Return the content codings the client accepts (q > 0), from Accept-Encoding."""
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def choose_encoding(request, available):
+    """Return the best coding in `available` that the client accepts, or None."""
+    accepted = accepted_encodings(request)
+    for encoding, suffix in ENCODINGS:
+        if encoding in available and (encoding in accepted or '*' in accepted):
+            return encoding
+    return None
+
+
+def precompressed_variant(request, file_path):
+    """Return (encoding, sibling path) of the best fresh precompressed copy, or (None, file_path)."""
+    accepted = accepted_encodings(request)
+    if not accepted:
+        return None, file_path
+    source_mtime = None
+    for encoding, suffix in ENCODINGS:
+        if encoding not in accepted and '*' not in accepted:
+            continue
+        if source_mtime is None:
+            source_mtime = os.stat(file_path).st_mtime_ns
+        if _is_fresh(file_path + suffix, source_mtime):
+            return encoding, file_path + suffix
+    return None, file_path
+
+
+def _is_fresh(path, source_mtime):
+    try:
+        return os.stat(path).st_mtime_ns >= source_mtime
+    except OSError:
+        return False
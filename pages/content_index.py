@@ -0,0 +1,262 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+from . import manifest
+from . import metrics
+from . import shared_index
+
+
+logger = logging.getLogger(__name__)
+
+# How often (in seconds) a cached index re-checks its directory mtimes.
+# Between checks the cached structure is served without touching the disk.
+CHECK_INTERVAL = getattr(settings, 'TOPICS_INDEX_CHECK_INTERVAL', 2.0)
+
+# _lock guards the dicts and counters and is only held for a moment; a
+# build holds the lock of its own root, so only callers of that root wait.
+_lock = threading.Lock()
+_root_locks = {}
+_indexes = {}
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+class _Entry:
+    """A built structure plus the directory signature it was built from.
+
+    Entries loaded from the topics manifest carry the signature recorded
+    when the manifest was built and are checked against the disk like any
+    other; an entry without one (an older manifest) is rebuilt at its first
+    check. Every entry is dropped when a new shared snapshot is published.
+    """
+
+    __slots__ = ('signature', 'structure', 'checked_at', 'version', 'last_modified', 'generation')
+
+    def __init__(self, signature, structure, checked_at, version=None, last_modified=None):
+        self.signature = signature
+        self.structure = structure
+        self.checked_at = checked_at
+        self.generation = shared_index.generation()
+        if version is None:
+            version = hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()[:16]
+            last_modified = max((mtime for path, mtime in signature), default=0) / 1e9
+        self.version = version
+        self.last_modified = last_modified
+
+
+def build_structure(file_list):
+    structure = defaultdict(lambda: defaultdict(list))
+
+    for filepath in file_list:
+        parts = filepath.split('/')
+        if len(parts) == 2:
+            topic, file = parts
+            structure[topic]['_files'].append(file)
+        elif len(parts) == 3:
+            topic, subfolder, file = parts
+            structure[topic][subfolder].append(file)
+
+    # Plain dicts, so lookups on the cached structure never insert keys.
+    return {topic: dict(items) for topic, items in structure.items()}
+
+def numeric_key(name):
+    """Extract numeric prefix for sorting (e.g., '1.10 Sets.html' -> (1, 10), '1.2 Variables.html' -> (1, 2))."""
+    match = re.match(r'^(\d+)\.(\d*)\.?', name)
+    if match:
+        major = int(match.group(1))  # First part (e.g., '1' in '1.10')
+        minor = int(match.group(2) or 0)  # Second part (e.g., '10' in '1.10', or 0 if no minor part)
+        return (major, minor)
+    return (float('inf'), 0)  # Non-numeric names go to the end
+
+
+def scan_directory_structure(pages_dir):
+    """Scan the html_pages directory and return a dictionary of topics and subtopics in numeric order."""
+    structure = {}
+    # Check if pages_dir exists
+    logger.debug("Scanning directory: %s", pages_dir)
+    if not os.path.exists(pages_dir):
+        logger.error("Directory %s does not exist.", pages_dir)
+        return structure
+
+    # Walk through all subdirectories and collect HTML files
+    for root, dirs, files in os.walk(pages_dir):
+        # Get the relative path from pages_dir to current root
+        rel_path = os.path.relpath(root, pages_dir)
+        if rel_path == ".":
+            topic = os.path.basename(pages_dir)
+        else:
+            topic = rel_path.split(os.sep)[0]
+        if topic not in structure:
+            structure[topic] = []
+        # Only add HTML files that are directly under this root
+        html_files = [f for f in files if f.endswith('.html')]
+        html_files.sort(key=numeric_key)
+        if rel_path == "." and html_files and os.path.isdir(os.path.join(pages_dir, topic)):
+            logger.warning("Pages directly inside %s are listed with its %s folder; "
+                           "the folder's own pages take precedence", pages_dir, topic)
+            continue
+        # Store files with their relative path from the topic folder
+        for f in html_files:
+            # Get the path relative to the topic folder; pages directly inside
+            # the root are the root topic's own pages (see topic_dir).
+            file_rel_path = f if rel_path == "." else os.path.relpath(os.path.join(root, f), os.path.join(pages_dir, topic))
+            structure[topic].append(file_rel_path)
+    # Sort topics
+    structure = dict(sorted(structure.items(), key=lambda x: numeric_key(x[0])))
+    # Sort subtopics for each topic
+    for topic in structure:
+        structure[topic].sort(key=numeric_key)
+
+    logger.debug("Directory structure of %s: %s", pages_dir, structure)
+
+    final_list = []
+    for topic, subtopics in structure.items():
+        # Create a list of tuples (topic, subtopic)
+        for subtopic in subtopics:
+            final_list.append(os.path.join(topic, subtopic))
+
+    final_list = build_structure(final_list)
+
+    return final_list
+
+
+def topic_dir(pages_dir, topic):
+    """Return the directory holding a topic's pages.
+
+    Pages directly inside a content root form a topic named after the root,
+    so for that topic (unless a folder of the same name exists) this is the
+    root itself.
+    """
+    path = os.path.join(pages_dir, topic)
+    if topic == os.path.basename(os.path.normpath(pages_dir)) and not os.path.isdir(path):
+        return pages_dir
+    return path
+
+
+def directory_signature(pages_dir):
+    """Return the (path, mtime_ns) of every directory below pages_dir.
+
+    A directory's mtime changes whenever an entry is added, removed or
+    renamed inside it, which is exactly what changes the table of contents.
+    """
+    signature = []
+    for root, dirs, files in os.walk(pages_dir):
+        dirs.sort()
+        try:
+            signature.append((root, os.stat(root).st_mtime_ns))
+        except OSError:
+            continue
+    return tuple(signature)
+
+
+def get_index(pages_dir, build=scan_directory_structure):
+    """Return the cached structure for pages_dir, calling build(pages_dir) on a miss.
+
+    The returned structure is shared between requests and must not be mutated.
+    """
+    return _get_entry(pages_dir, build).structure
+
+
+def get_version(pages_dir, build=scan_directory_structure):
+    """Return (version, last_modified) of the cached index for pages_dir.
+
+    The version is a short hash of the directory signature, so it changes
+    whenever the table of contents changes.
+    """
+    entry = _get_entry(pages_dir, build, count=False)
+    return entry.version, entry.last_modified
+
+
+def _published_signature(pages_dir, published):
+    """The directory signature stored in a manifest entry, with paths under pages_dir."""
+    signature = published.get('signature')
+    if signature is None:
+        return None
+    return tuple((pages_dir if path == '.' else os.path.join(pages_dir, *path.split('/')), mtime_ns)
+                 for path, mtime_ns in signature)
+
+
+def _get_entry(pages_dir, build, count=True):
+    now = time.monotonic()
+    entry = _indexes.get(pages_dir)
+    if entry is not None and entry.generation != shared_index.generation():
+        # A new snapshot was published; load this root from it.
+        entry = None
+    if entry is not None and now - entry.checked_at < CHECK_INTERVAL:
+        if count:
+            _count('hits')
+        return entry
+
+    if entry is None:
+        published = manifest.root_entry(pages_dir)
+        if published is not None:
+            # Served as is until the next check compares its signature with the disk.
+            entry = _Entry(_published_signature(pages_dir, published), published['structure'], now,
+                           'm' + published['version'], published['last_modified'])
+            with _lock:
+                _stats['misses'] += 1
+                _indexes[pages_dir] = entry
+            return entry
+
+    with metrics.phase('fs_scan'):
+        signature = directory_signature(pages_dir)
+    if entry is not None and entry.signature == signature:
+        entry.checked_at = now
+        if count:
+            _count('hits')
+        return entry
+
+    with _root_lock(pages_dir):
+        # Another thread may have rebuilt the index while we were waiting.
+        current = _indexes.get(pages_dir)
+        if current is not None and current is not entry and current.signature == signature:
+            if count:
+                _count('hits')
+            return current
+        if entry is not None:
+            _count('invalidations')
+            logger.info("Content root %s changed, rebuilding index", pages_dir)
+        _count('misses')
+        with metrics.phase('fs_scan'):
+            structure = build(pages_dir)
+        entry = _Entry(signature, structure, time.monotonic())
+        with _lock:
+            _indexes[pages_dir] = entry
+        return entry
+
+
+def _root_lock(pages_dir):
+    with _lock:
+        lock = _root_locks.get(pages_dir)
+        if lock is None:
+            lock = _root_locks[pages_dir] = threading.Lock()
+        return lock
+
+
+def invalidate(pages_dir=None):
+    """Drop the cached index for pages_dir, or for every root when None."""
+    manifest.reset()
+    with _lock:
+        if pages_dir is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(pages_dir, None)
+
+
+def cache_stats():
+    """Return a snapshot of the hit/miss counters and the cached roots."""
+    with _lock:
+        stats = dict(_stats)
+        stats['roots'] = sorted(_indexes)
+    return stats
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
@@ -0,0 +1,150 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import content_index
+from . import page_cache
+from . import reading_index
+
+
+logger = logging.getLogger(__name__)
+
+
+class ContentRoot:
+    """One tutorial track: a directory of HTML pages served under a route prefix.
+
+    A root serves the topic equal to its name and, only when a prefix is
+    given, every topic starting with that prefix. Each root owns a lazily
+    built, cached table-of-contents index (see pages.content_index) and can
+    be warmed before the first request.
+    """
+
+    def __init__(self, name, path, prefix=None, warmup=True):
+        self.name = name
+        self.path = os.path.abspath(str(path))
+        self.prefix = prefix
+        self.warmup_enabled = warmup
+
+    def __repr__(self):
+        return f"<ContentRoot {self.name} {self.path}>"
+
+    def matches(self, topic):
+        """Return True when the URL topic belongs to this root."""
+        return topic == self.name or (self.prefix is not None and topic.startswith(self.prefix))
+
+    def structure(self):
+        """Return the cached table-of-contents structure of this root."""
+        return content_index.get_index(self.path)
+
+    def version(self):
+        """Return (version, last_modified) of this root's index."""
+        return content_index.get_version(self.path)
+
+    def warmup(self, deadline=None):
+        """Build the index and reading order and prime the page digests so the first request is hot.
+
+        Priming stops at deadline (a time.perf_counter() value); the pages
+        left are digested by their first request instead.
+        """
+        started = time.perf_counter()
+        self.structure()
+        reading_index.get_order(self.path)
+        pages = 0
+        for root, dirs, files in os.walk(self.path):
+            for name in files:
+                if not name.endswith('.html'):
+                    continue
+                if deadline is not None and time.perf_counter() > deadline:
+                    logger.warning("Warming content root %s stopped after %d pages: out of time",
+                                   self.name, pages)
+                    return pages
+                page_cache.file_digest(os.path.join(root, name))
+                pages += 1
+        elapsed = (time.perf_counter() - started) * 1000
+        logger.info("Warmed content root %s (%d pages) in %.1fms", self.name, pages, elapsed)
+        return pages
+
+
+class ContentRootRegistry:
+    """The content roots declared in settings.TUTORIALS_CONTENT_ROOTS."""
+
+    def __init__(self, roots, default=None):
+        self.roots = list(roots)
+        self.by_name = {root.name: root for root in self.roots}
+        self.default = self.by_name[default] if default else self.roots[0]
+
+    @classmethod
+    def from_settings(cls):
+        roots = [ContentRoot(**options) for options in settings.TUTORIALS_CONTENT_ROOTS]
+        return cls(roots, getattr(settings, 'TUTORIALS_DEFAULT_CONTENT_ROOT', None))
+
+    def __iter__(self):
+        return iter(self.roots)
+
+    def for_topic(self, topic):
+        """Return the root serving the URL topic, or the default root."""
+        if topic:
+            root = self.by_name.get(topic)
+            if root is not None:
+                return root
+            for root in self.roots:
+                if root.matches(topic):
+                    return root
+        return self.default
+
+    def for_path(self, file_path):
+        """Return the root whose directory contains file_path, or None."""
+        file_path = os.path.realpath(file_path)
+        matches = [root for root in self.roots
+                   if file_path.startswith(os.path.join(os.path.realpath(root.path), ''))]
+        return max(matches, key=lambda root: len(root.path), default=None)
+
+    def paths(self):
+        """Return the directory of every root, in declaration order."""
+        return [root.path for root in self.roots]
+
+    def warmup(self, max_workers=None, budget=None):
+        """Warm every root that opted in, concurrently, and wait for all of them.
+
+        budget bounds the time spent priming page digests, in seconds
+        (default settings.TUTORIALS_WARMUP_BUDGET; 0 means no bound).
+        """
+        roots = [root for root in self.roots if root.warmup_enabled]
+        if not roots:
+            return
+        if budget is None:
+            budget = getattr(settings, 'TUTORIALS_WARMUP_BUDGET', 0)
+        started = time.perf_counter()
+        deadline = started + budget if budget else None
+        with ThreadPoolExecutor(max_workers=max_workers or len(roots), thread_name_prefix='warmup') as pool:
+            for root, future in [(root, pool.submit(root.warmup, deadline)) for root in roots]:
+                try:
+                    future.result()
+                except Exception:
+                    logger.exception("Warming content root %s failed", root.name)
+        logger.info("Warmed %d content roots in %.1fms", len(roots), (time.perf_counter() - started) * 1000)
+
+
+_lock = threading.Lock()
+_registry = None
+
+
+def get_registry():
+    """Return the process-wide registry, building it from settings on first use."""
+    global _registry
+    if _registry is None:
+        with _lock:
+            if _registry is None:
+                _registry = ContentRootRegistry.from_settings()
+    return _registry
+
+
+def reset_registry():
+    """Forget the registry so the next lookup re-reads settings."""
+    global _registry
+    with _lock:
+        _registry = None
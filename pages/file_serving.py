@@ -0,0 +1,143 @@
+import os
+import re
+import asyncio
+import logging
+
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def safe_path(base_dir, rel_path):
+    """Join rel_path onto base_dir, raising Http404 if the result escapes base_dir.
+
+    Symlinks are resolved first, so a link inside base_dir that points
+    outside of it is rejected too.
+    """
+    base_dir = os.path.realpath(base_dir)
+    full_path = os.path.realpath(os.path.join(base_dir, rel_path))
+    if os.path.commonpath([base_dir, full_path]) != base_dir:
+        logger.warning("Rejected path outside %s: %r", base_dir, rel_path)
+        raise Http404("File not found.")
+    return full_path
+
+
+def parse_range(header, size):
+    """Parse a single-range `Range` header against a file of `size` bytes.
+
+    Returns (start, end) with an inclusive end, None when the header should be
+    ignored (missing, malformed or multi-range), or False when the range
+    cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.replace(' ', '')) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    """Return True when the request's If-Range (if any) still names this representation."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    date = parse_http_date_safe(if_range)
+    return date is not None and last_modified is not None and int(last_modified) <= date
+
+
+def iter_file_range(file_path, start, length, chunk_size=CHUNK_SIZE):
+    """Yield `length` bytes of file_path starting at `start`, one chunk at a time."""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+async def aiter_file_range(file_path, start, length, chunk_size=CHUNK_SIZE):
+    """Async iter_file_range: opening and reading the file run in a worker thread."""
+    f = await asyncio.to_thread(_open_at, file_path, start)
+    try:
+        while length > 0:
+            chunk = await asyncio.to_thread(f.read, min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def _open_at(file_path, start):
+    f = open(file_path, 'rb')
+    if start:
+        f.seek(start)
+    return f
+
+
+def serve_file(request, file_path, etag, last_modified, content_type, size=None, asynchronous=False):
+    """Stream file_path with conditional GET and single-range support.
+
+    Full responses go through FileResponse, so the WSGI server can use
+    sendfile; byte ranges are streamed in fixed-size chunks. Either way the
+    file is never loaded into memory as a whole. With asynchronous=True
+    (async views under ASGI) both are streamed from aiter_file_range, so
+    the event loop never waits on the disk; pass `size` in that case.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if size is None:
+            size = os.path.getsize(file_path)
+        byte_range = None
+        if request.method in ('GET', 'HEAD') and if_range_matches(request, etag, last_modified):
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+        elif byte_range:
+            start, end = byte_range
+            iterate = aiter_file_range if asynchronous else iter_file_range
+            response = StreamingHttpResponse(
+                iterate(file_path, start, end - start + 1), status=206, content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+        elif asynchronous:
+            response = StreamingHttpResponse(aiter_file_range(file_path, 0, size), content_type=content_type)
+            response['Content-Length'] = str(size)
+        else:
+            response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+            response['Content-Length'] = str(size)
+            # The tutorial pages are shown inline; FileResponse would otherwise
+            # advertise them as a named download.
+            response.headers.pop('Content-Disposition', None)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
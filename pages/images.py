@@ -0,0 +1,176 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Originals under SOURCE_DIR are resized into OUTPUT_DIR, which sits inside a
+# STATICFILES_DIRS entry so collectstatic and whitenoise pick it up.
+SOURCE_DIR = getattr(settings, 'STATIC_IMAGES_DIR', os.path.join(settings.BASE_DIR, 'static', 'images'))
+OUTPUT_DIR = getattr(settings, 'STATIC_IMAGE_DERIVATIVES_DIR', os.path.join(settings.BASE_DIR, 'static', 'derived'))
+# Static URL prefix of OUTPUT_DIR (relative to STATIC_URL).
+OUTPUT_PREFIX = 'derived/'
+MANIFEST_NAME = 'images.json'
+
+# Widths (pixels) of the derivatives; widths larger than the original are skipped.
+WIDTHS = getattr(settings, 'STATIC_IMAGE_WIDTHS', (64, 128, 256, 512, 1024))
+QUALITY = {'avif': 50, 'webp': 80}
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+SOURCE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+_lock = threading.Lock()
+_manifest = None
+_manifest_mtime = None
+
+
+def _pillow():
+    # Imported on first use: the template tag loads this module at startup,
+    # but only the build step needs Pillow.
+    try:
+        from PIL import Image, features
+    except ImportError:
+        return None, None
+    return Image, features
+
+
+def formats():
+    """Return the derivative formats this Pillow build can write, best first."""
+    Image, features = _pillow()
+    if Image is None:
+        return []
+    available = []
+    for name in ('avif', 'webp'):
+        try:
+            if features.check(name):
+                available.append(name)
+        except ValueError:  # Pillow versions that do not know the feature at all
+            continue
+    return available
+
+
+def source_digest(path):
+    """Return the short content hash that goes into every derivative name."""
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()[:12]
+
+
+def derive(source_path, output_dir, image_formats, widths=WIDTHS):
+    """Write the resized derivatives of one image and return its manifest record.
+
+    Names look like python-256w.<hash>.webp, so a changed original gets new
+    URLs and every derivative can be cached forever. Runs in a worker process.
+    """
+    Image, features = _pillow()
+    digest = source_digest(source_path)
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    with Image.open(source_path) as original:
+        original.load()
+        width, height = original.size
+        image = original.convert('RGBA' if original.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    targets = [w for w in widths if w < width] + [width]
+
+    variants = []
+    for image_format in image_formats:
+        for target_width in targets:
+            name = f"{stem}-{target_width}w.{digest}.{image_format}"
+            path = os.path.join(output_dir, name)
+            if not os.path.exists(path):
+                resized = image if target_width == width else image.resize(
+                    (target_width, max(1, round(height * target_width / width))), Image.LANCZOS)
+                tmp_path = path + '.tmp'
+                resized.save(tmp_path, format=image_format.upper(), quality=QUALITY[image_format])
+                os.replace(tmp_path, path)
+            variants.append({'format': image_format, 'width': target_width, 'name': name})
+    return {'digest': digest, 'width': width, 'height': height, 'variants': variants}
+
+
+def build(source_dir=SOURCE_DIR, output_dir=OUTPUT_DIR, workers=None, force=False):
+    """Bring output_dir up to date with source_dir; return (built, unchanged) counts.
+
+    Only originals whose content hash changed are processed, in a process
+    pool across cores. Derivatives of removed or changed originals are deleted.
+    """
+    image_formats = formats()
+    if not image_formats:
+        raise RuntimeError("Pillow with WebP or AVIF support is required to build image derivatives")
+    os.makedirs(output_dir, exist_ok=True)
+    previous = {} if force else _read(os.path.join(output_dir, MANIFEST_NAME)) or {}
+
+    sources = sorted(
+        name for name in os.listdir(source_dir)
+        if name.lower().endswith(SOURCE_EXTENSIONS) and os.path.isfile(os.path.join(source_dir, name))
+    )
+    images = {}
+    pending = []
+    for name in sources:
+        record = previous.get(name)
+        if (record and record['digest'] == source_digest(os.path.join(source_dir, name))
+                and {v['format'] for v in record['variants']} == set(image_formats)
+                and all(os.path.exists(os.path.join(output_dir, v['name'])) for v in record['variants'])):
+            images[name] = record
+        else:
+            pending.append(name)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                name: pool.submit(derive, os.path.join(source_dir, name), output_dir, image_formats)
+                for name in pending
+            }
+            for name, future in futures.items():
+                images[name] = future.result()
+
+    # Anything no record points at any more is a stale derivative.
+    keep = {v['name'] for record in images.values() for v in record['variants']} | {MANIFEST_NAME}
+    for name in os.listdir(output_dir):
+        if name not in keep:
+            os.remove(os.path.join(output_dir, name))
+
+    tmp_path = os.path.join(output_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(images, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(output_dir, MANIFEST_NAME))
+    return len(pending), len(sources) - len(pending)
+
+
+def lookup(static_path):
+    """Return the manifest record for a static path like 'images/python.png', or None."""
+    prefix = os.path.relpath(SOURCE_DIR, os.path.dirname(OUTPUT_DIR)).replace(os.sep, '/') + '/'
+    if not static_path.startswith(prefix):
+        return None
+    return load().get(static_path[len(prefix):])
+
+
+def load():
+    """Return the derivatives manifest, re-reading it when the file changes."""
+    global _manifest, _manifest_mtime
+    path = os.path.join(OUTPUT_DIR, MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    if mtime != _manifest_mtime:
+        with _lock:
+            if mtime != _manifest_mtime:
+                _manifest = _read(path) or {}
+                _manifest_mtime = mtime
+    return _manifest
+
+
+def _read(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        logger.error("Could not read image manifest %s: %s", path, exc)
+        return None
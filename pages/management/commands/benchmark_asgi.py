@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+from unittest import mock
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from pages import benchmarks
+from pages import content_index
+from pages import content_roots
+from pages import views
+
+
+DEFAULT_OUTPUT = os.path.join(settings.BASE_DIR, 'benchmarks', 'baselines', 'asgi.json')
+
+MODES = ['wsgi', 'asgi']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync views behind a threaded WSGI worker with the async views behind "
+        "one ASGI event loop, for many concurrent slow clients on the same synthetic content tree."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=1000,
+                            help="Pages in the synthetic tree (default: %(default)s).")
+        parser.add_argument('--requests', type=int, default=2000,
+                            help="Requests per case (default: %(default)s).")
+        parser.add_argument('--concurrency', default='100,1000',
+                            help="Comma-separated numbers of concurrent clients (default: %(default)s).")
+        parser.add_argument('--threads', type=int, default=32,
+                            help="Threads of the WSGI worker, like gunicorn --threads (default: %(default)s).")
+        parser.add_argument('--client-delay', type=float, default=200.0,
+                            help="Milliseconds a slow client takes to read each response chunk (default: %(default)s).")
+        parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                            help="Where to write the results (default: %(default)s).")
+        parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+        parser.add_argument('--topics', help=argparse.SUPPRESS)
+        parser.add_argument('--worker-output', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker_output']:
+            result = asyncio.run(self.run_worker(options))
+            with open(options['worker_output'], 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+            return
+
+        results = {}
+        with benchmarks.SyntheticTopics() as topics:
+            self.stdout.write(f"Generating a synthetic tree with {options['pages']} pages...")
+            benchmarks.generate_topics_tree(topics.path, 'bench', options['pages'])
+            for mode in MODES:
+                self.stdout.write(f"Running the {mode.upper()} handler...")
+                # URL routing to the sync or async views is fixed at startup.
+                results[mode] = benchmarks.run_worker_process(
+                    'benchmark_asgi',
+                    {'mode': mode, 'topics': topics.path, 'requests': options['requests'],
+                     'concurrency': options['concurrency'], 'threads': options['threads'],
+                     'client-delay': options['client_delay']},
+                    {'TUTORIALS_ASYNC_VIEWS': '1' if mode == 'asgi' else '0'},
+                )
+                for concurrency, cases in results[mode].items():
+                    for name, summary in cases.items():
+                        self.stdout.write(
+                            f"  {concurrency} clients, {name}: {summary['throughput_rps']} req/s, "
+                            f"p50 {summary['p50_ms']}ms, p99 {summary['p99_ms']}ms, {summary['errors']} errors"
+                        )
+
+        benchmarks.write_results(options['output'], 'asgi', results)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    async def run_worker(self, options):
+        topics_dir = options['topics']
+        root_dir = os.path.join(topics_dir, 'bench')
+        pages = sorted(
+            os.path.relpath(os.path.join(root, name), topics_dir).replace(os.sep, '/')
+            for root, dirs, files in os.walk(root_dir) for name in files
+        )
+        roots = [{'name': 'bench', 'path': root_dir, 'warmup': False}]
+        with override_settings(TUTORIALS_CONTENT_ROOTS=roots, TUTORIALS_DEFAULT_CONTENT_ROOT='bench'), \
+                mock.patch.object(views, 'HTML_TOPICS_PAGES_DIR', topics_dir), \
+                mock.patch.object(views, 'CONTENT_ROOT_DIRS', [root_dir]):
+            content_roots.reset_registry()
+            content_index.invalidate()
+            page_urls = [reverse('tutorials', kwargs={'file_path': page}) for page in pages]
+            cases = {
+                'book_view': lambda i: '/tutorials/bench/',
+                'display_page': lambda i: page_urls[i % len(page_urls)],
+            }
+            if options['mode'] == 'asgi':
+                server = ASGIServer(options['client_delay'] / 1000)
+            else:
+                server = WSGIServer(options['threads'], options['client_delay'] / 1000)
+            try:
+                results = {}
+                for concurrency in [int(c) for c in options['concurrency'].split(',') if c.strip()]:
+                    results[str(concurrency)] = {
+                        name: await run_clients(server, make_url, options['requests'], concurrency)
+                        for name, make_url in cases.items()
+                    }
+                return results
+            finally:
+                server.close()
+                content_roots.reset_registry()
+                content_index.invalidate()
+
+
+async def run_clients(server, make_url, total_requests, concurrency):
+    """Issue total_requests requests from `concurrency` clients that each wait for their last answer."""
+    # Warm the caches, so both servers are measured in the steady state.
+    await server.request(make_url(0))
+    latencies = []
+    errors = 0
+    counter = iter(range(total_requests))
+
+    async def client():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            status = await server.request(make_url(i))
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return benchmarks.summarize(latencies, time.perf_counter() - started, errors)
+
+
+class WSGIServer:
+    """A threaded WSGI worker: each response holds its thread until the slow client has read it."""
+
+    def __init__(self, threads, client_delay):
+        self.handler = WSGIHandler()
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+        self.client_delay = client_delay
+        self.factory = RequestFactory()
+
+    async def request(self, url):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, self.serve, url)
+
+    def serve(self, url):
+        status = []
+        body = self.handler(self.factory.get(url).environ, lambda s, headers, exc_info=None: status.append(s))
+        try:
+            for chunk in body:
+                # The socket write blocks until the client has taken the chunk.
+                if chunk:
+                    time.sleep(self.client_delay)
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        return int(status[0].split()[0])
+
+    def close(self):
+        self.pool.shutdown()
+
+
+class ASGIServer:
+    """One event loop: a slow client only parks its own coroutine."""
+
+    def __init__(self, client_delay):
+        self.handler = ASGIHandler()
+        self.client_delay = client_delay
+
+    async def request(self, url):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': unquote(url), 'raw_path': url.encode(),
+            'query_string': b'', 'root_path': '', 'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+        status = []
+        finished = asyncio.Event()
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif message['type'] == 'http.response.body':
+                if message.get('body'):
+                    await asyncio.sleep(self.client_delay)
+                if not message.get('more_body'):
+                    finished.set()
+
+        await self.handler(scope, receive, send)
+        finished.set()
+        return status[0]
+
+    def close(self):
+        pass
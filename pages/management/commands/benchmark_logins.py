@@ -0,0 +1,88 @@
+import os
+import json
+import argparse
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+
+from pages import benchmarks
+
+
+DEFAULT_OUTPUT = os.path.join(settings.BASE_DIR, 'benchmarks', 'baselines', 'logins.json')
+
+# SQLITE_TUNING value of each profile; see DataEngineering/database.py.
+PROFILES = {'default': '0', 'tuned': '1'}
+
+USERNAME = 'bench-user'
+PASSWORD = 'bench-password-123'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent logins per second against a scratch SQLite database, once with "
+        "Django's default database settings and once with the WAL/persistent-connection profile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500,
+                            help="Logins per profile (default: %(default)s).")
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help="Concurrent client threads (default: %(default)s).")
+        parser.add_argument('--profiles', default=','.join(PROFILES),
+                            help="Comma-separated profiles to run (default: %(default)s).")
+        parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                            help="Where to write the results (default: %(default)s).")
+        # Internal: run one profile in this process and write its summary here.
+        parser.add_argument('--worker-output', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker_output']:
+            result = self.run_worker(options['requests'], options['concurrency'])
+            with open(options['worker_output'], 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+            return
+
+        results = {}
+        for profile in [name.strip() for name in options['profiles'].split(',') if name.strip()]:
+            if profile not in PROFILES:
+                raise CommandError(f"Unknown profile {profile!r}; choose from {', '.join(PROFILES)}")
+            self.stdout.write(f"Running the {profile} profile...")
+            results[profile] = self.run_profile(profile, options['requests'], options['concurrency'])
+            summary = results[profile]['login']
+            self.stdout.write(
+                f"  {summary['throughput_rps']} logins/s, p95 {summary['p95_ms']}ms, {summary['errors']} errors"
+            )
+
+        benchmarks.write_results(options['output'], 'logins', results)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def run_profile(self, profile, total_requests, concurrency):
+        return benchmarks.run_worker_process(
+            'benchmark_logins',
+            {'requests': total_requests, 'concurrency': concurrency},
+            {'SQLITE_TUNING': PROFILES[profile]},
+        )
+
+    def run_worker(self, total_requests, concurrency):
+        call_command('migrate', verbosity=0, interactive=False)
+        # A cheap hasher, so the run measures the session and database work
+        # of a login rather than PBKDF2.
+        with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            get_user_model().objects.create_user(USERNAME, password=PASSWORD)
+            connections.close_all()
+
+            def login(client, i):
+                client.cookies.clear()
+                return client.post('/login/', {'username': USERNAME, 'password': PASSWORD})
+
+            return {
+                'database': {
+                    key: str(value) for key, value in connections['default'].settings_dict.items()
+                    if key in ('ENGINE', 'CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'OPTIONS')
+                },
+                'login': benchmarks.run_load(login, total_requests, concurrency),
+            }
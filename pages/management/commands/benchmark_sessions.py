@@ -0,0 +1,105 @@
+import os
+import json
+import argparse
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+from pages import benchmarks
+
+
+DEFAULT_OUTPUT = os.path.join(settings.BASE_DIR, 'benchmarks', 'baselines', 'sessions.json')
+
+ENGINES = ['db', 'cached_db', 'signed_cookies']
+
+PASSWORD = 'bench-password-123'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure authenticated page views under concurrent logins for each session engine, "
+        "with the database queries each request costs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000,
+                            help="Requests per engine (default: %(default)s).")
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help="Concurrent client threads (default: %(default)s).")
+        parser.add_argument('--login-every', type=int, default=10,
+                            help="Every Nth request is a fresh login (default: %(default)s).")
+        parser.add_argument('--engines', default=','.join(ENGINES),
+                            help="Comma-separated SESSION_BACKEND values (default: %(default)s).")
+        parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                            help="Where to write the results (default: %(default)s).")
+        parser.add_argument('--worker-output', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker_output']:
+            result = self.run_worker(options['requests'], options['concurrency'], options['login_every'])
+            with open(options['worker_output'], 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+            return
+
+        results = {}
+        for engine in [name.strip() for name in options['engines'].split(',') if name.strip()]:
+            if engine not in settings.SESSION_ENGINES:
+                raise CommandError(f"Unknown session backend {engine!r}; choose from {', '.join(settings.SESSION_ENGINES)}")
+            self.stdout.write(f"Running with SESSION_BACKEND={engine}...")
+            results[engine] = benchmarks.run_worker_process(
+                'benchmark_sessions',
+                {'requests': options['requests'], 'concurrency': options['concurrency'],
+                 'login-every': options['login_every']},
+                {'SESSION_BACKEND': engine},
+            )
+            summary = results[engine]['mixed']
+            self.stdout.write(
+                f"  {summary['throughput_rps']} req/s, p95 {summary['p95_ms']}ms, "
+                f"{results[engine]['queries_per_request']} queries/request, {summary['errors']} errors"
+            )
+
+        benchmarks.write_results(options['output'], 'sessions', results)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def run_worker(self, total_requests, concurrency, login_every):
+        call_command('migrate', verbosity=0, interactive=False)
+        queries = [0]
+        lock = threading.Lock()
+
+        def count_query(execute, sql, params, many, context):
+            with lock:
+                queries[0] += 1
+            return execute(sql, params, many, context)
+
+        # A cheap hasher, so logins measure session and database work, not PBKDF2.
+        with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            User = get_user_model()
+            for i in range(concurrency):
+                User.objects.create_user(f'bench-user-{i}', password=PASSWORD)
+            connections.close_all()
+            local = threading.local()
+
+            def request(client, i):
+                with connection.execute_wrapper(count_query):
+                    if not getattr(local, 'username', None) or i % login_every == 0:
+                        if not getattr(local, 'username', None):
+                            with lock:
+                                local.username = f'bench-user-{len(logged_in)}'
+                                logged_in.append(local.username)
+                        client.cookies.clear()
+                        return client.post('/login/', {'username': local.username, 'password': PASSWORD})
+                    return client.get('/tutorials/data_engineering/')
+
+            logged_in = []
+            summary = benchmarks.run_load(request, total_requests, concurrency)
+
+        return {
+            'session_engine': settings.SESSION_ENGINE,
+            'mixed': summary,
+            'queries_per_request': round(queries[0] / max(summary['requests'], 1), 2),
+        }
@@ -0,0 +1,93 @@
+import os
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from pages import benchmarks
+from pages import content_index
+from pages import content_roots
+from pages import views
+
+
+DEFAULT_OUTPUT = os.path.join(settings.BASE_DIR, 'benchmarks', 'baselines', 'tutorials.json')
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the home page, book_view and display_page against synthetic Topics trees "
+        "and record throughput and p50/p95/p99 latency as a JSON baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,10000,100000',
+                            help="Comma-separated page counts of the synthetic trees (default: %(default)s).")
+        parser.add_argument('--requests', type=int, default=500,
+                            help="Requests per case (default: %(default)s).")
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help="Concurrent client threads (default: %(default)s).")
+        parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                            help="Where to write the results (default: %(default)s).")
+        parser.add_argument('--compare', metavar='BASELINE',
+                            help="Fail if results regress against this baseline file.")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Allowed regression as a fraction when comparing (default: %(default)s).")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        results = {}
+        for size in sizes:
+            self.stdout.write(f"Generating a synthetic tree with {size} pages...")
+            results[str(size)] = self.run_size(size, options['requests'], options['concurrency'])
+
+        benchmarks.write_results(options['output'], 'tutorials', results)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+        if options['compare']:
+            regressions = benchmarks.compare(options['compare'], results, options['tolerance'])
+            if regressions:
+                raise CommandError("Performance regressions:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against " + options['compare']))
+
+    def run_size(self, size, total_requests, concurrency):
+        with benchmarks.SyntheticTopics() as topics:
+            pages = benchmarks.generate_topics_tree(topics.path, 'bench', size)
+            roots = [{'name': 'bench', 'path': os.path.join(topics.path, 'bench'), 'warmup': False}]
+            with override_settings(TUTORIALS_CONTENT_ROOTS=roots, TUTORIALS_DEFAULT_CONTENT_ROOT='bench'), \
+                    mock.patch.object(views, 'HTML_TOPICS_PAGES_DIR', topics.path), \
+                    mock.patch.object(views, 'CONTENT_ROOT_DIRS', [roots[0]['path']]):
+                content_roots.reset_registry()
+                content_index.invalidate()
+                cache.clear()
+                try:
+                    return self.run_cases(pages, total_requests, concurrency)
+                finally:
+                    content_roots.reset_registry()
+                    content_index.invalidate()
+                    cache.clear()
+
+    def run_cases(self, pages, total_requests, concurrency):
+        book_url = '/tutorials/bench/'
+        page_urls = [reverse('tutorials', kwargs={'file_path': page}) for page in pages]
+
+        # The first request pays for the directory scan and the first render.
+        started = time.perf_counter()
+        benchmarks.drain(Client().get(book_url))
+        cold_ms = round((time.perf_counter() - started) * 1000, 3)
+
+        cases = {
+            'home': lambda client, i: client.get('/'),
+            'book_view': lambda client, i: client.get(book_url),
+            'display_page': lambda client, i: client.get(page_urls[i % len(page_urls)]),
+        }
+        results = {'book_view_cold_ms': cold_ms}
+        for name, make_request in cases.items():
+            results[name] = benchmarks.run_load(make_request, total_requests, concurrency)
+            self.stdout.write(f"  {name}: {results[name]}")
+        self.stdout.write(f"  book_view cold: {cold_ms}ms")
+        return results
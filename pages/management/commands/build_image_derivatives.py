@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pages import images
+
+
+class Command(BaseCommand):
+    help = (
+        "Write resized, content-hashed WebP/AVIF derivatives of static/images for the "
+        "{% responsive_image %} tag. Only changed originals are processed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Worker processes (default: one per core).")
+        parser.add_argument('--force', action='store_true',
+                            help="Rebuild every derivative.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            built, unchanged = images.build(workers=options['workers'], force=options['force'])
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f"Built derivatives of {built} images ({unchanged} unchanged, formats: "
+            f"{', '.join(images.formats())}) in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pages import search
+from pages import views
+
+
+class Command(BaseCommand):
+    help = "Build or incrementally update the full-text search index over the tutorial HTML files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help="Ignore the existing index and re-index every file.",
+        )
+        parser.add_argument(
+            '--output', default=search.INDEX_PATH,
+            help="Where to write the index (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index, (added, removed, unchanged) = search.build_index(
+            views.CONTENT_ROOT_DIRS, options['output'], rebuild=options['rebuild'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {added} changed files, removed {removed}, kept {unchanged} unchanged; "
+            f"{len(index.postings)} terms written to {options['output']} "
+            f"in {time.perf_counter() - started:.2f}s"
+        ))
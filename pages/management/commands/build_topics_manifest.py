@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pages import content_index
+from pages import manifest
+from pages import shared_index
+from pages import views
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-scan every tutorial content root and write the topics manifest used by the views, "
+        "plus the memory-mapped snapshot that gunicorn workers share."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=manifest.MANIFEST_PATH,
+            help="Where to write the manifest (default: %(default)s).",
+        )
+        parser.add_argument(
+            '--snapshot', default=shared_index.SNAPSHOT_PATH,
+            help="Where to publish the shared snapshot (default: %(default)s).",
+        )
+        parser.add_argument(
+            '--no-snapshot', action='store_true',
+            help="Only write the JSON manifest.",
+        )
+        parser.add_argument(
+            '--no-bodies', action='store_true',
+            help="Leave the page bodies out of the snapshot.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        data = manifest.build_manifest(views.CONTENT_ROOT_DIRS, content_index.scan_directory_structure,
+                                       content_index.directory_signature)
+        manifest.write_manifest(data, options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {options['output']}: {len(data['roots'])} roots, {len(data['files'])} files, "
+            f"version {data['version']} in {time.perf_counter() - started:.2f}s"
+        ))
+        if not options['no_snapshot']:
+            shared_index.publish(data, options['snapshot'], bodies=not options['no_bodies'])
+            self.stdout.write(self.style.SUCCESS(f"Published {options['snapshot']}"))
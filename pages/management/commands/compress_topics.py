@@ -0,0 +1,26 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from pages import compression
+from pages import views
+
+
+class Command(BaseCommand):
+    help = "Write precompressed .br and .gz siblings next to every tutorial HTML page."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if compression.brotli is None:
+            self.stdout.write(self.style.WARNING("Brotli is not installed; writing gzip siblings only."))
+        scanned = written = 0
+        for root, dirs, files in os.walk(views.HTML_TOPICS_PAGES_DIR):
+            for name in files:
+                if name.endswith('.html'):
+                    scanned += 1
+                    if compression.compress_file(os.path.join(root, name)):
+                        written += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Compressed {written} of {scanned} HTML pages in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,33 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from pages import static_export
+from pages import views
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-render every tutorials and book route into a directory of precompressed "
+        "<url>/index.html files, linking to content-hashed copies of the static assets, "
+        "that any static file server can serve. Only pages whose source changed since "
+        "the last export are rebuilt."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=os.path.join(settings.BASE_DIR, 'site'),
+                            help="Directory to export into (default: %(default)s).")
+        parser.add_argument('--force', action='store_true',
+                            help="Rebuild every page, ignoring the previous export manifest.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = static_export.export_site(options['output'], views.HTML_TOPICS_PAGES_DIR, force=options['force'])
+        summary = ", ".join(f"{count} {name}" for name, count in stats.items())
+        if stats['failed']:
+            raise CommandError(f"Export to {options['output']} incomplete: {summary}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {options['output']}: {summary} in {time.perf_counter() - started:.2f}s"
+        ))
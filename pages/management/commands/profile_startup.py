@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from pages import benchmarks
+
+
+# What a cold start runs for each target, in a fresh interpreter.
+TARGETS = {
+    'wsgi': ['-c', 'import DataEngineering.wsgi'],
+    'check': [os.path.join(settings.BASE_DIR, 'manage.py'), 'check'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time a cold start (WSGI import or `manage.py check`) in fresh interpreters, report "
+        "the slowest imports, and fail when the median exceeds --budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=sorted(TARGETS), default='wsgi',
+                            help="What to start (default: %(default)s).")
+        parser.add_argument('--repeat', type=int, default=5,
+                            help="Cold starts to time (default: %(default)s).")
+        parser.add_argument('--top', type=int, default=15,
+                            help="Modules to list (default: %(default)s).")
+        parser.add_argument('--budget', type=float, metavar='MS',
+                            help="Fail if the median cold start takes longer than this many milliseconds.")
+        parser.add_argument('--output', help="Also write the measurements as JSON to this file.")
+
+    def handle(self, *args, **options):
+        command = [sys.executable, '-X', 'importtime'] + TARGETS[options['target']]
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'DataEngineering.settings'))
+        timings = []
+        for _ in range(max(options['repeat'], 1)):
+            started = time.perf_counter()
+            result = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+            timings.append((time.perf_counter() - started) * 1000)
+            if result.returncode != 0:
+                raise CommandError(f"Cold start failed:\n{result.stderr[-2000:]}")
+        modules = benchmarks.parse_importtime(result.stderr)
+        median = statistics.median(timings)
+
+        self.stdout.write(f"Cold start ({options['target']}): median {median:.0f}ms, "
+                          f"min {min(timings):.0f}ms over {len(timings)} runs")
+        packages = {}
+        for name, self_us, cumulative_us, depth in modules:
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0) + self_us
+        self.stdout.write("\nImport time by top-level package:")
+        for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options['top']]:
+            self.stdout.write(f"  {self_us / 1000:8.1f}ms  {package}")
+        self.stdout.write("\nSlowest modules (self):")
+        for name, self_us, cumulative_us, depth in sorted(modules, key=lambda m: m[1], reverse=True)[:options['top']]:
+            self.stdout.write(f"  {self_us / 1000:8.1f}ms  {name}")
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump({
+                    'target': options['target'],
+                    'environment': benchmarks.environment(),
+                    'timings_ms': [round(t, 1) for t in timings],
+                    'modules': [
+                        {'module': name, 'self_us': self_us, 'cumulative_us': cumulative_us}
+                        for name, self_us, cumulative_us, depth in modules
+                    ],
+                }, f, indent=1)
+
+        if options['budget'] is not None:
+            if median > options['budget']:
+                raise CommandError(
+                    f"Cold start took {median:.0f}ms, over the {options['budget']:.0f}ms budget"
+                )
+            self.stdout.write(self.style.SUCCESS(f"\nWithin the {options['budget']:.0f}ms budget"))
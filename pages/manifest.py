@@ -0,0 +1,205 @@
+import os
+import re
+import json
+import html
+import hashlib
+import logging
+import threading
+
+from django.conf import settings
+
+from . import shared_index
+
+
+logger = logging.getLogger(__name__)
+
+# Where `manage.py build_topics_manifest` writes the manifest and where the
+# views look for it. When the file is missing the views fall back to
+# scanning the content roots on disk.
+MANIFEST_PATH = getattr(
+    settings, 'TOPICS_MANIFEST_PATH', os.path.join(settings.BASE_DIR, 'Topics', 'manifest.json')
+)
+
+TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>|<h1[^>]*>(.*?)</h1>', re.IGNORECASE | re.DOTALL)
+TAG_RE = re.compile(r'<[^>]+>')
+
+_lock = threading.Lock()
+_manifest = None
+_loaded = False
+
+
+def relative_path(path):
+    """Return path relative to BASE_DIR with forward slashes, as stored in the manifest."""
+    return os.path.relpath(path, settings.BASE_DIR).replace(os.sep, '/')
+
+
+def extract_title(raw):
+    """Return the <title> (or first <h1>) text of an HTML document, or ''."""
+    match = TITLE_RE.search(raw)
+    if not match:
+        return ''
+    text = TAG_RE.sub('', match.group(1) or match.group(2) or '')
+    return ' '.join(html.unescape(text).split())
+
+
+def file_record(file_path):
+    """Return [path, size, mtime, sha1, title] for one HTML file."""
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    stat = os.stat(file_path)
+    title = extract_title(raw[:64 * 1024].decode('utf-8', errors='replace'))
+    return [relative_path(file_path), stat.st_size, stat.st_mtime_ns, hashlib.sha1(raw).hexdigest(), title]
+
+
+def build_manifest(pages_dirs, scan, signature=None):
+    """Scan every content root in pages_dirs and return the manifest dict.
+
+    scan(pages_dir) must return the table-of-contents structure for a root,
+    exactly as the views would build it. signature(pages_dir), when given,
+    returns the root's directory signature (see
+    content_index.directory_signature); it is stored with the root so the
+    views can tell when the tree on disk no longer matches the manifest.
+    """
+    roots = {}
+    files = {}
+    for pages_dir in sorted(set(pages_dirs)):
+        if not os.path.isdir(pages_dir):
+            logger.warning("Content root %s does not exist, skipping", pages_dir)
+            continue
+        # Taken before the scan: a change during the scan then shows up as a mismatch.
+        root_signature = signature(pages_dir) if signature is not None else None
+        root_files = []
+        for root, dirs, names in os.walk(pages_dir):
+            for name in names:
+                if name.endswith('.html'):
+                    record = file_record(os.path.join(root, name))
+                    files[record[0]] = record
+                    root_files.append(record)
+        root_files.sort()
+        root_hash = hashlib.sha1(json.dumps(root_files).encode('utf-8')).hexdigest()[:16]
+        last_modified = max((r[2] for r in root_files), default=0) / 1e9
+        roots[relative_path(pages_dir)] = {
+            'version': root_hash,
+            'last_modified': last_modified,
+            'structure': scan(pages_dir),
+        }
+        if root_signature is not None:
+            # Relative to the root, as the tree may be checked out elsewhere.
+            roots[relative_path(pages_dir)]['signature'] = [
+                [os.path.relpath(path, pages_dir).replace(os.sep, '/'), mtime_ns]
+                for path, mtime_ns in root_signature
+            ]
+
+    file_list = [files[path] for path in sorted(files)]
+    version = hashlib.sha1(
+        json.dumps([roots[r]['version'] for r in sorted(roots)]).encode('utf-8')
+    ).hexdigest()[:16]
+    return {
+        'version': version,
+        'fields': ['path', 'size', 'mtime_ns', 'sha1', 'title'],
+        'roots': roots,
+        'files': file_list,
+    }
+
+
+def write_manifest(manifest, path=MANIFEST_PATH):
+    """Atomically write manifest as compact JSON to path."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, separators=(',', ':'), ensure_ascii=False)
+    os.replace(tmp_path, path)
+    reset()
+
+
+def load():
+    """Return the manifest, loading it from disk on first use; None if there is none."""
+    global _manifest, _loaded
+    if _loaded:
+        return _manifest
+    with _lock:
+        if not _loaded:
+            _manifest = _read(MANIFEST_PATH)
+            _loaded = True
+    return _manifest
+
+
+def reset():
+    """Forget the loaded manifest so the next lookup reads it again."""
+    global _manifest, _loaded
+    with _lock:
+        _manifest = None
+        _loaded = False
+    shared_index.reset()
+
+
+def root_entry(pages_dir):
+    """Return the manifest entry (version, last_modified, structure, signature) for pages_dir, or None.
+
+    A published shared snapshot takes precedence over the JSON manifest.
+    """
+    snapshot = shared_index.current()
+    if snapshot is not None:
+        return snapshot.root_entry(relative_path(pages_dir))
+    manifest = load()
+    if manifest is None:
+        return None
+    return manifest['roots'].get(relative_path(pages_dir))
+
+
+def file_entry(file_path):
+    """Return the manifest record for file_path as a dict, or None."""
+    snapshot = shared_index.current()
+    if snapshot is not None:
+        record = snapshot.file_record(relative_path(file_path))
+        return dict(zip(snapshot.fields, record)) if record is not None else None
+    manifest = load()
+    if manifest is None:
+        return None
+    record = manifest['by_path'].get(relative_path(file_path))
+    if record is None:
+        return None
+    return dict(zip(manifest['fields'], record))
+
+
+def file_body(file_path):
+    """Return the body of file_path from the shared snapshot as a memoryview, or None.
+
+    None is returned when the page is not in the snapshot or has changed on
+    disk since it was published. A page whose mtime differs but whose size
+    and sha1 still match is served from the snapshot: copying the tree
+    (e.g. unzipping a CI artifact on the host) resets every mtime.
+    """
+    snapshot = shared_index.current()
+    if snapshot is None:
+        return None
+    record = snapshot.file_record(relative_path(file_path))
+    if record is None:
+        return None
+    fields = dict(zip(snapshot.fields, record))
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    if fields['size'] != stat.st_size:
+        return None
+    if fields['mtime_ns'] != stat.st_mtime_ns:
+        # Imported here: page_cache looks pages up in the manifest itself.
+        from . import page_cache
+        digest = page_cache.file_digest(file_path)
+        if digest is None or digest[0] != fields['sha1']:
+            return None
+    return snapshot.body(record)
+
+
+def _read(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        logger.error("Could not read topics manifest %s: %s", path, exc)
+        return None
+    manifest['by_path'] = {record[0]: record for record in manifest['files']}
+    logger.info("Loaded topics manifest %s (version %s)", path, manifest['version'])
+    return manifest
@@ -0,0 +1,209 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager, nullcontext
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+
+
+# Off unless METRICS_ENABLED is set; when off, phase() hands back a shared
+# no-op context manager and the middleware removes itself at startup.
+ENABLED = getattr(settings, 'METRICS_ENABLED', False)
+
+# Upper bounds (seconds) of the latency histogram buckets.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP = nullcontext()
+
+
+class Histogram:
+    """A Prometheus-style histogram with one set of buckets per thread.
+
+    Each thread only ever writes to its own counters, so observe() takes no
+    lock; collect() sums the per-thread counters when /metrics is scraped.
+    The counters of threads that have exited are folded into one retired
+    shard, so a server that keeps starting threads (sync_to_async, thread
+    pools) holds one shard per live thread only.
+    """
+
+    def __init__(self, name, help_text, label):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._local = threading.local()
+        # (thread, series) per thread that has observed something.
+        self._shards = []
+        self._retired = {}
+        self._shards_lock = threading.Lock()
+
+    def observe(self, label_value, seconds):
+        series = getattr(self._local, 'series', None)
+        if series is None:
+            series = self._local.series = {}
+            with self._shards_lock:
+                self._prune()
+                self._shards.append((threading.current_thread(), series))
+        counts = series.get(label_value)
+        if counts is None:
+            counts = series[label_value] = _empty_counts()
+        counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        counts[-1] += seconds
+
+    def _prune(self):
+        """Fold the shards of exited threads into the retired one. Call with _shards_lock held."""
+        live = []
+        for thread, series in self._shards:
+            if thread.is_alive():
+                live.append((thread, series))
+            else:
+                # The thread is gone, so nothing writes to its series any more.
+                _add_series(self._retired, series)
+        self._shards = live
+
+    def collect(self):
+        """Return {label_value: (cumulative bucket counts, count, sum)} across all threads."""
+        totals = {}
+        with self._shards_lock:
+            self._prune()
+            _add_series(totals, self._retired)
+            shards = [series for thread, series in self._shards]
+        for series in shards:
+            _add_series(totals, series)
+        collected = {}
+        for label_value, total in totals.items():
+            cumulative = []
+            running = 0
+            for count in total[:-1]:
+                running += count
+                cumulative.append(running)
+            collected[label_value] = (cumulative, running, total[-1])
+        return collected
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_value, (cumulative, count, total) in sorted(self.collect().items()):
+            label = f'{self.label}="{_escape(label_value)}"'
+            for bound, value in zip(BUCKETS + ('+Inf',), cumulative):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {value}')
+            lines.append(f'{self.name}_count{{{label}}} {count}')
+            lines.append(f'{self.name}_sum{{{label}}} {total:.6f}')
+        return lines
+
+
+def _empty_counts():
+    # Bucket counts, then the +Inf count, then the running sum.
+    return [0] * (len(BUCKETS) + 1) + [0.0]
+
+
+def _add_series(totals, series):
+    for label_value, counts in list(series.items()):
+        total = totals.setdefault(label_value, _empty_counts())
+        for i, value in enumerate(counts):
+            total[i] += value
+
+
+REQUEST_DURATION = Histogram(
+    'tutorials_request_duration_seconds', 'Time spent serving a request, by view.', 'view')
+PHASE_DURATION = Histogram(
+    'tutorials_phase_duration_seconds',
+    'Time spent in a request phase (fs_scan, file_read, template_render, db).', 'phase')
+
+
+@contextmanager
+def _timed(phase_name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_DURATION.observe(phase_name, time.perf_counter() - started)
+
+
+def phase(name):
+    """Time a block as one request phase: `with metrics.phase('file_read'): ...`."""
+    if not ENABLED:
+        return _NOOP
+    return _timed(name)
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        PHASE_DURATION.observe('db', time.perf_counter() - started)
+
+
+def _install_db_wrapper(sender, connection, **kwargs):
+    # Connections are per thread, and under ASGI the queries run in
+    # sync_to_async threads, not in the one running the middleware, so the
+    # wrapper goes on each connection as it is opened, wherever that is.
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+class MetricsMiddleware:
+    """Record per-view request latency and database time for every request.
+
+    Works under WSGI and ASGI alike, so the async views are not pushed
+    through a sync adapter just to be timed. Database time is recorded by a
+    wrapper on every connection this process opens.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not ENABLED:
+            raise MiddlewareNotUsed("METRICS_ENABLED is off")
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        connection_created.connect(_install_db_wrapper, dispatch_uid='metrics-db-wrapper')
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, started)
+        return response
+
+    def observe(self, request, started):
+        # Label by view function: several routes share a URL name.
+        match = request.resolver_match
+        view = f"{match.func.__module__}.{match.func.__name__}" if match else 'unmatched'
+        REQUEST_DURATION.observe(view, time.perf_counter() - started)
+
+
+def render_metrics():
+    """Return every metric in the Prometheus text exposition format."""
+    # Imported here because content_index itself imports this module.
+    from . import content_index
+
+    stats = content_index.cache_stats()
+    lines = REQUEST_DURATION.render() + PHASE_DURATION.render()
+    lines += [
+        '# HELP tutorials_content_index_lookups_total Content index lookups, by result.',
+        '# TYPE tutorials_content_index_lookups_total counter',
+        f'tutorials_content_index_lookups_total{{result="hit"}} {stats["hits"]}',
+        f'tutorials_content_index_lookups_total{{result="miss"}} {stats["misses"]}',
+        f'tutorials_content_index_lookups_total{{result="invalidation"}} {stats["invalidations"]}',
+        '# HELP tutorials_process_id Process that served this scrape.',
+        '# TYPE tutorials_process_id gauge',
+        f'tutorials_process_id {os.getpid()}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
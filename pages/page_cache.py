@@ -0,0 +1,178 @@
+import os
+import asyncio
+import hashlib
+from stat import S_ISREG
+import logging
+import threading
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from . import compression
+from . import manifest
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds a rendered page stays in the response cache. Entries are keyed by
+# the content version, so a change on disk never serves a stale page.
+PAGE_CACHE_TIMEOUT = getattr(settings, 'TUTORIALS_PAGE_CACHE_TIMEOUT', 60 * 60)
+
+_digest_lock = threading.Lock()
+_digests = {}
+
+
+def file_digest(file_path):
+    """Return (sha1 hexdigest, mtime, size) for file_path, or None if it is not a file.
+
+    Digests are remembered per (mtime, size) so a file is only re-read after
+    it changes on disk. Files recorded in the topics manifest are never read.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    if not S_ISREG(stat.st_mode):
+        return None
+    known = _digests.get(file_path)
+    if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+        return known[2], stat.st_mtime, stat.st_size
+
+    record = manifest.file_entry(file_path)
+    if record is not None and (record['mtime_ns'], record['size']) == (stat.st_mtime_ns, stat.st_size):
+        digest = record['sha1']
+    else:
+        sha1 = hashlib.sha1()
+        with metrics.phase('file_read'), open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                sha1.update(chunk)
+        digest = sha1.hexdigest()
+    with _digest_lock:
+        _digests[file_path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest, stat.st_mtime, stat.st_size
+
+
+@lru_cache(maxsize=None)
+def deploy_version():
+    """Return the version of the code that renders the pages.
+
+    Templates and static assets change on a deploy while no content file
+    does, so this is part of every ETag and cache key. TUTORIALS_DEPLOY_VERSION
+    (e.g. the commit SHA) is used when set; otherwise the template and static
+    files are hashed once per process, by content so that every host of a
+    deploy agrees.
+    """
+    version = getattr(settings, 'TUTORIALS_DEPLOY_VERSION', '')
+    if version:
+        return version
+    dirs = [str(d) for template in settings.TEMPLATES for d in template.get('DIRS', [])]
+    dirs += [os.path.join(app.path, 'templates') for app in apps.get_app_configs()]
+    dirs += [str(d) for d in getattr(settings, 'STATICFILES_DIRS', [])]
+    sha1 = hashlib.sha1()
+    for top in sorted(set(dirs)):
+        for root, subdirs, files in os.walk(top):
+            subdirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                sha1.update(os.path.relpath(path, top).encode('utf-8'))
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(64 * 1024), b''):
+                        sha1.update(chunk)
+    return sha1.hexdigest()[:12]
+
+
+def make_etag(*parts):
+    """Build a strong ETag from the given version parts and the deploy version."""
+    parts = (deploy_version(),) + parts
+    return '"%s"' % hashlib.sha1('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+
+
+def cached_fragment(key_parts, render_fragment):
+    """Return a rendered template fragment, calling render_fragment() once per key_parts."""
+    key = 'tutorials:fragment:' + make_etag(*key_parts).strip('"')
+    fragment = cache.get(key)
+    if fragment is None:
+        fragment = render_fragment()
+        cache.set(key, fragment, PAGE_CACHE_TIMEOUT)
+    return fragment
+
+
+def cached_page(request, key_parts, etag, last_modified, render_page):
+    """Serve a page through the full-response cache, answering 304 when the client is current.
+
+    The cached body is looked up (or render_page() is called and its result
+    cached with its compressed variants) before the conditional check,
+    because the ETag depends on which body is served: a compressed variant
+    gets its own ETag, the identity body the plain one. Only anonymous
+    GET/HEAD requests are cached, because logged-in pages carry a per-user
+    CSRF token.
+    """
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return render_page()
+
+    key = 'tutorials:page:' + make_etag(*key_parts).strip('"')
+    cached = cache.get(key)
+    if cached is None:
+        response = render_page()
+        cached = _cache_entry(response)
+        if cached is None:
+            return response
+        cache.set(key, cached, PAGE_CACHE_TIMEOUT)
+    else:
+        logger.debug("Page cache hit for %s", request.path)
+    return _cached_response(request, cached, etag, last_modified)
+
+
+async def acached_page(request, key_parts, etag, last_modified, render_page):
+    """Async cached_page: render_page is a coroutine function and the cache is read with aget."""
+    if request.method not in ('GET', 'HEAD') or (await request.auser()).is_authenticated:
+        return await render_page()
+
+    key = 'tutorials:page:' + make_etag(*key_parts).strip('"')
+    cached = await cache.aget(key)
+    if cached is None:
+        response = await render_page()
+        # Compressing the page is CPU work; keep it off the event loop.
+        cached = await asyncio.to_thread(_cache_entry, response)
+        if cached is None:
+            return response
+        await cache.aset(key, cached, PAGE_CACHE_TIMEOUT)
+    else:
+        logger.debug("Page cache hit for %s", request.path)
+    return _cached_response(request, cached, etag, last_modified)
+
+
+def _cache_entry(response):
+    if response.status_code != 200 or response.streaming:
+        return None
+    # Compressed on a cache miss, inside the request: use the fast levels.
+    variants = compression.compress_bytes(response.content, compression.RESPONSE_BROTLI_QUALITY,
+                                          compression.RESPONSE_GZIP_LEVEL)
+    return response.content, response['Content-Type'], variants
+
+
+def _cached_response(request, cached, etag, last_modified):
+    """Return the cached page in the best coding the client accepts, or 304 if it is current."""
+    content, content_type, variants = cached
+    encoding = compression.choose_encoding(request, variants)
+    if encoding:
+        # Each content coding is a separate representation with its own ETag.
+        etag = '%s-%s"' % (etag[:-1], encoding)
+
+    if encoding:
+        response = HttpResponse(variants[encoding], content_type=content_type)
+        response['Content-Encoding'] = encoding
+    else:
+        response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    # A 304 keeps the ETag, Last-Modified and Vary headers of the full response.
+    return get_conditional_response(request, etag=etag, last_modified=last_modified, response=response)
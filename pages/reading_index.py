@@ -0,0 +1,109 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import content_index
+from . import compression
+from . import page_cache
+
+
+logger = logging.getLogger(__name__)
+
+# Warm the next page of the reading order after serving a page.
+WARM_NEXT = getattr(settings, 'TUTORIALS_WARM_NEXT_PAGE', True)
+
+_lock = threading.Lock()
+_orders = {}
+_warmed = {}
+# One thread is plenty: warming is a stat and a sequential read per page.
+_warmer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='reading-warmup')
+
+
+class ReadingOrder:
+    """The pages of one content root in reading order (1.1, 1.2, ..., 2.1, ...).
+
+    Built once per version of the root's table of contents, so finding the
+    previous and next page of a request is a dict lookup.
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.positions = {path: i for i, path in enumerate(pages)}
+
+    def neighbours(self, file_path):
+        """Return (previous, next) absolute paths around file_path; either may be None."""
+        i = self.positions.get(file_path)
+        if i is None:
+            return None, None
+        return (self.pages[i - 1] if i > 0 else None,
+                self.pages[i + 1] if i + 1 < len(self.pages) else None)
+
+
+def build_order(pages_dir, structure):
+    """Flatten a content_index structure into the list of its page paths, in order."""
+    pages_dir = os.path.realpath(pages_dir)
+    pages = []
+    for topic, items in structure.items():
+        topic_dir = content_index.topic_dir(pages_dir, topic)
+        for folder, files in items.items():
+            folder_dir = topic_dir if folder == '_files' else os.path.join(topic_dir, folder)
+            pages.extend(os.path.join(folder_dir, name) for name in files)
+    return pages
+
+
+def get_order(pages_dir):
+    """Return the ReadingOrder of pages_dir for the current version of its index."""
+    version, last_modified = content_index.get_version(pages_dir)
+    order = _orders.get(pages_dir)
+    if order is None or order[0] != version:
+        order = (version, ReadingOrder(build_order(pages_dir, content_index.get_index(pages_dir))))
+        with _lock:
+            _orders[pages_dir] = order
+    return order[1]
+
+
+def neighbours(pages_dir, file_path):
+    """Return the (previous, next) pages of file_path in the reading order of pages_dir."""
+    return get_order(pages_dir).neighbours(os.path.realpath(file_path))
+
+
+def warm(file_path):
+    """Prepare file_path in the background so the click that opens it is served hot.
+
+    Computes its digest (and so its ETag) and reads it and its precompressed
+    siblings, so the OS has them in the page cache. Each version of a file
+    is warmed once.
+    """
+    if not WARM_NEXT:
+        return
+    try:
+        identity = os.stat(file_path).st_mtime_ns
+    except OSError:
+        return
+    with _lock:
+        if _warmed.get(file_path) == identity:
+            return
+        _warmed[file_path] = identity
+    _warmer.submit(_warm, file_path)
+
+
+def _warm(file_path):
+    try:
+        page_cache.file_digest(file_path)
+        for path in [file_path] + [file_path + suffix for encoding, suffix in compression.ENCODINGS]:
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    while f.read(64 * 1024):
+                        pass
+    except OSError as exc:
+        logger.warning("Could not warm %s: %s", file_path, exc)
+
+
+def reset():
+    """Forget the reading orders and which pages were warmed."""
+    with _lock:
+        _orders.clear()
+        _warmed.clear()
@@ -0,0 +1,358 @@
+import os
+import re
+import gzip
+import html
+import json
+import math
+import time
+import bisect
+import hashlib
+import logging
+import tempfile
+import threading
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# On-disk location of the search index written by `manage.py build_search_index`.
+INDEX_PATH = getattr(
+    settings, 'TOPICS_SEARCH_INDEX_PATH', os.path.join(settings.BASE_DIR, 'Topics', 'search_index.json.gz')
+)
+
+# BM25 parameters.
+K1 = 1.2
+B = 0.75
+
+# Prefix queries expand to at most this many index terms.
+MAX_PREFIX_TERMS = 50
+
+SKIP_BLOCKS_RE = re.compile(r'<(script|style)\b.*?</\1>', re.IGNORECASE | re.DOTALL)
+TAG_RE = re.compile(r'<[^>]+>')
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def html_to_text(raw):
+    """Strip scripts, styles and tags from an HTML document."""
+    return html.unescape(TAG_RE.sub(' ', SKIP_BLOCKS_RE.sub(' ', raw)))
+
+
+class SearchIndex:
+    """Inverted index with positional postings over the tutorial HTML files.
+
+    postings maps term -> {doc_id: [positions]}; docs holds, per doc_id,
+    the file metadata used for incremental updates, or None for a freed id.
+    """
+
+    def __init__(self):
+        self.docs = []
+        self.postings = {}
+        self._free = []
+        self._terms = None
+        self._by_path = None
+        self._doc_stats = None
+
+    # -- building ---------------------------------------------------------
+
+    def update(self, pages_dirs, base_dir=settings.BASE_DIR):
+        """Re-index the HTML files under pages_dirs whose size or mtime changed.
+
+        Returns (added, removed, unchanged) document counts.
+        """
+        by_path = self.by_path()
+        seen = set()
+        added = removed = 0
+        for pages_dir in sorted(set(pages_dirs)):
+            for root, dirs, files in os.walk(pages_dir):
+                dirs.sort()
+                for name in sorted(files):
+                    if not name.endswith('.html'):
+                        continue
+                    file_path = os.path.join(root, name)
+                    rel_path = os.path.relpath(file_path, base_dir).replace(os.sep, '/')
+                    if rel_path in seen:
+                        continue
+                    seen.add(rel_path)
+                    stat = os.stat(file_path)
+                    doc_id = by_path.get(rel_path)
+                    if doc_id is not None:
+                        doc = self.docs[doc_id]
+                        if (doc['mtime_ns'], doc['size']) == (stat.st_mtime_ns, stat.st_size):
+                            continue
+                        with open(file_path, 'rb') as f:
+                            raw = f.read()
+                        if hashlib.sha1(raw).hexdigest() == doc['sha1']:
+                            doc['mtime_ns'] = stat.st_mtime_ns
+                            continue
+                        self._remove(doc_id)
+                        removed += 1
+                    else:
+                        with open(file_path, 'rb') as f:
+                            raw = f.read()
+                    self._add(rel_path, raw, stat)
+                    added += 1
+
+        for rel_path, doc_id in list(by_path.items()):
+            if rel_path not in seen:
+                self._remove(doc_id)
+                removed += 1
+
+        self._terms = None
+        self._by_path = None
+        self._doc_stats = None
+        unchanged = len(seen) - added
+        return added, removed, unchanged
+
+    def _add(self, rel_path, raw, stat):
+        text = raw.decode('utf-8', errors='replace')
+        title_match = TITLE_RE.search(text)
+        title = ' '.join(html.unescape(title_match.group(1)).split()) if title_match else ''
+        tokens = tokenize(html_to_text(text))
+        doc = {
+            'path': rel_path,
+            'title': title or os.path.splitext(os.path.basename(rel_path))[0],
+            'length': len(tokens),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha1': hashlib.sha1(raw).hexdigest(),
+        }
+        if self._free:
+            doc_id = self._free.pop()
+            self.docs[doc_id] = doc
+        else:
+            doc_id = len(self.docs)
+            self.docs.append(doc)
+        for position, token in enumerate(tokens):
+            self.postings.setdefault(token, {}).setdefault(doc_id, []).append(position)
+
+    def _remove(self, doc_id):
+        self.docs[doc_id] = None
+        self._free.append(doc_id)
+        for term in [t for t, docs in self.postings.items() if doc_id in docs]:
+            del self.postings[term][doc_id]
+            if not self.postings[term]:
+                del self.postings[term]
+
+    # -- persistence ------------------------------------------------------
+
+    def save(self, path=INDEX_PATH):
+        """Write the index as gzip-compressed JSON with delta-encoded postings."""
+        postings = {}
+        for term, docs in self.postings.items():
+            encoded = []
+            for doc_id in sorted(docs):
+                positions = docs[doc_id]
+                encoded.append([doc_id] + [p - q for p, q in zip(positions, [0] + positions[:-1])])
+            postings[term] = encoded
+        payload = json.dumps({'docs': self.docs, 'postings': postings}, separators=(',', ':'), sort_keys=True)
+        # Unique, as a server's background build may race the management command.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+        os.close(fd)
+        os.chmod(tmp_path, 0o644)
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """Read an index written by save()."""
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls()
+        index.docs = data['docs']
+        index._free = [i for i, doc in enumerate(index.docs) if doc is None]
+        for term, encoded in data['postings'].items():
+            docs = {}
+            for entry in encoded:
+                positions = []
+                total = 0
+                for delta in entry[1:]:
+                    total += delta
+                    positions.append(total)
+                docs[entry[0]] = positions
+            index.postings[term] = docs
+        return index
+
+    # -- querying ---------------------------------------------------------
+
+    def by_path(self):
+        if self._by_path is None:
+            self._by_path = {doc['path']: i for i, doc in enumerate(self.docs) if doc is not None}
+        return self._by_path
+
+    def doc_stats(self):
+        """Return (document count, average document length) for BM25."""
+        if self._doc_stats is None:
+            lengths = [doc['length'] for doc in self.docs if doc is not None]
+            doc_count = len(lengths) or 1
+            self._doc_stats = (doc_count, sum(lengths) / doc_count or 1.0)
+        return self._doc_stats
+
+    def terms(self):
+        """Return the sorted vocabulary, used for prefix expansion."""
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        return self._terms
+
+    def expand_prefix(self, prefix):
+        terms = self.terms()
+        start = bisect.bisect_left(terms, prefix)
+        matches = []
+        for term in terms[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def search(self, query, limit=20):
+        """Return up to `limit` (score, doc) pairs matching every clause of query.
+
+        Clauses are plain words, prefixes ending in `*` and "quoted phrases".
+        """
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+
+        doc_count, avg_length = self.doc_stats()
+
+        matched = None
+        scores = {}
+        for kind, value in clauses:
+            if kind == 'phrase':
+                clause_docs = self._phrase_docs(value)
+                terms = value
+            elif kind == 'prefix':
+                terms = self.expand_prefix(value)
+                clause_docs = set()
+                for term in terms:
+                    clause_docs.update(self.postings[term])
+            else:
+                terms = [value]
+                clause_docs = set(self.postings.get(value, ()))
+            matched = clause_docs if matched is None else matched & clause_docs
+            if not matched:
+                return []
+            for term in set(terms):
+                docs = self.postings.get(term, {})
+                idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id in clause_docs & docs.keys():
+                    tf = len(docs[doc_id])
+                    norm = K1 * (1 - B + B * self.docs[doc_id]['length'] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+
+        ranked = sorted(matched, key=lambda doc_id: (-scores.get(doc_id, 0.0), self.docs[doc_id]['path']))
+        return [(scores.get(doc_id, 0.0), self.docs[doc_id]) for doc_id in ranked[:limit]]
+
+    def _phrase_docs(self, terms):
+        if not terms:
+            return set()
+        postings = [self.postings.get(term) for term in terms]
+        if not all(postings):
+            return set()
+        candidates = set(postings[0]).intersection(*postings[1:])
+        found = set()
+        for doc_id in candidates:
+            following = [set(p[doc_id]) for p in postings[1:]]
+            for start in postings[0][doc_id]:
+                if all(start + offset + 1 in positions for offset, positions in enumerate(following)):
+                    found.add(doc_id)
+                    break
+        return found
+
+
+def parse_query(query):
+    """Parse a query into ('term' | 'prefix' | 'phrase', value) clauses."""
+    clauses = []
+    for phrase, word in QUERY_RE.findall(query or ''):
+        if phrase:
+            terms = tokenize(phrase)
+            if len(terms) == 1:
+                clauses.append(('term', terms[0]))
+            elif terms:
+                clauses.append(('phrase', terms))
+        elif word.endswith('*') and tokenize(word):
+            clauses.append(('prefix', tokenize(word)[0]))
+        else:
+            clauses.extend(('term', term) for term in tokenize(word))
+    return clauses
+
+
+def build_index(pages_dirs, path=INDEX_PATH, rebuild=False):
+    """Incrementally update (or rebuild) the on-disk index and return it with its stats."""
+    index = SearchIndex()
+    if not rebuild and os.path.exists(path):
+        try:
+            index = SearchIndex.load(path)
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning("Discarding unreadable search index %s: %s", path, exc)
+    stats = index.update(pages_dirs)
+    index.save(path)
+    return index, stats
+
+
+_lock = threading.Lock()
+_loaded = {'index': None, 'mtime_ns': None}
+_build_started = False
+
+
+def get_index(pages_dirs):
+    """Return the in-memory index, reloading it when the file on disk changes.
+
+    Requests never build the index; `manage.py build_search_index` does.
+    When none has been built yet, one is built once in a background thread
+    and None is returned until it is saved. A file that cannot be read keeps
+    the previously loaded index (or None) until the file changes again.
+    """
+    try:
+        mtime_ns = os.stat(INDEX_PATH).st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    if mtime_ns is not None and _loaded['mtime_ns'] == mtime_ns:
+        return _loaded['index']
+    if mtime_ns is None:
+        _build_in_background(pages_dirs)
+        return _loaded['index']
+
+    with _lock:
+        if _loaded['mtime_ns'] == mtime_ns:
+            return _loaded['index']
+        # Remember the file either way so a broken one is not re-read per request.
+        _loaded['mtime_ns'] = mtime_ns
+        started = time.perf_counter()
+        try:
+            index = SearchIndex.load(INDEX_PATH)
+        except (OSError, EOFError, ValueError, KeyError):
+            logger.exception("Could not load the search index from %s", INDEX_PATH)
+            return _loaded['index']
+        logger.info("Loaded search index in %.1fms", (time.perf_counter() - started) * 1000)
+        _loaded['index'] = index
+        return index
+
+
+def _build_in_background(pages_dirs):
+    global _build_started
+    with _lock:
+        if _build_started:
+            return
+        _build_started = True
+    logger.warning("No search index at %s, building it in the background; "
+                   "run `manage.py build_search_index` to build it ahead of time", INDEX_PATH)
+    threading.Thread(target=_build, args=(pages_dirs,), name='search-index', daemon=True).start()
+
+
+def _build(pages_dirs):
+    started = time.perf_counter()
+    try:
+        index, (added, removed, unchanged) = build_index(pages_dirs)
+    except Exception:
+        logger.exception("Building the search index failed")
+        return
+    logger.info("Built search index of %d files in %.1fms", added, (time.perf_counter() - started) * 1000)
@@ -0,0 +1,171 @@
+import os
+import json
+import mmap
+import time
+import struct
+import logging
+import threading
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Where `manage.py build_topics_manifest` publishes the binary snapshot of the
+# topics manifest (and optionally the page bodies). Every worker maps the same
+# file read-only, so the kernel keeps one copy of it in the page cache.
+SNAPSHOT_PATH = getattr(
+    settings, 'TOPICS_SNAPSHOT_PATH', os.path.join(settings.BASE_DIR, 'Topics', 'content_snapshot.bin')
+)
+
+# How often (in seconds) a worker checks whether a new snapshot was published.
+CHECK_INTERVAL = getattr(settings, 'TOPICS_INDEX_CHECK_INTERVAL', 2.0)
+
+# Pages larger than this are left out of the snapshot and read from disk.
+MAX_BODY_BYTES = getattr(settings, 'TOPICS_SNAPSHOT_MAX_BODY_BYTES', 1024 * 1024)
+
+MAGIC = b'TOPSNAP1'
+# Trailer at the very end of the file: header offset, header length, MAGIC.
+_TRAILER = struct.Struct('<QQ8s')
+
+_lock = threading.Lock()
+_snapshot = None
+_identity = None
+_checked_at = 0.0
+_generation = 0
+
+
+class Snapshot:
+    """A read-only memory map of a published snapshot file.
+
+    Layout: MAGIC, the page bodies, one JSON section per content root, the
+    JSON file table, the JSON header, and a trailer pointing at the header.
+    Only the header is decoded up front; a root's structure and the file
+    table are decoded on first use, and page bodies are handed out as
+    zero-copy memoryviews of the map.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_offset, header_length, magic = _TRAILER.unpack_from(self.map, len(self.map) - _TRAILER.size)
+        if magic != MAGIC or self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a topics snapshot")
+        self.header = self._section(header_offset, header_length)
+        self.version = self.header['version']
+        self.fields = self.header['fields']
+        self._roots = {}
+        self._files = None
+
+    def _section(self, offset, length):
+        return json.loads(self.map[offset:offset + length])
+
+    def root_entry(self, rel_path):
+        """Return {version, last_modified, structure} for a content root, or None."""
+        entry = self._roots.get(rel_path)
+        if entry is None:
+            location = self.header['roots'].get(rel_path)
+            if location is None:
+                return None
+            entry = self._roots[rel_path] = self._section(*location)
+        return entry
+
+    def file_record(self, rel_path):
+        """Return the manifest record of a page plus its body offset and length, or None."""
+        if self._files is None:
+            self._files = self._section(*self.header['files'])
+        return self._files.get(rel_path)
+
+    def body(self, record):
+        """Return the page body of a file record as a memoryview, or None if it was not stored."""
+        offset, length = record[-2:]
+        if offset is None:
+            return None
+        return memoryview(self.map)[offset:offset + length]
+
+
+def publish(manifest, path=SNAPSHOT_PATH, base_dir=settings.BASE_DIR, bodies=True):
+    """Atomically write a snapshot of `manifest` (see pages.manifest) to path.
+
+    With bodies=True the pages themselves are stored too, up to
+    MAX_BODY_BYTES each. Running workers switch to the new file within
+    CHECK_INTERVAL; requests still holding the old map keep reading it.
+    """
+    size_field = manifest['fields'].index('size')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        def write(data):
+            offset = f.tell()
+            f.write(data)
+            return [offset, len(data)]
+
+        def write_json(value):
+            return write(json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+        f.write(MAGIC)
+        files = {}
+        for record in manifest['files']:
+            location = [None, None]
+            if bodies and record[size_field] <= MAX_BODY_BYTES:
+                with open(os.path.join(base_dir, record[0]), 'rb') as page:
+                    location = write(page.read())
+            files[record[0]] = list(record) + location
+        roots = {rel_path: write_json(entry) for rel_path, entry in sorted(manifest['roots'].items())}
+        header = {
+            'version': manifest['version'],
+            'fields': manifest['fields'],
+            'roots': roots,
+            'files': write_json(files),
+        }
+        header_offset, header_length = write_json(header)
+        f.write(_TRAILER.pack(header_offset, header_length, MAGIC))
+    os.replace(tmp_path, path)
+    return path
+
+
+def current():
+    """Return the newest published Snapshot, or None when there is none.
+
+    The snapshot file is re-checked at most every CHECK_INTERVAL seconds and
+    remapped when it was replaced.
+    """
+    global _snapshot, _identity, _checked_at, _generation
+    now = time.monotonic()
+    if now - _checked_at < CHECK_INTERVAL:
+        return _snapshot
+    with _lock:
+        if now - _checked_at < CHECK_INTERVAL:
+            return _snapshot
+        _checked_at = now
+        try:
+            stat = os.stat(SNAPSHOT_PATH)
+            identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            identity = None
+        if identity == _identity:
+            return _snapshot
+        snapshot = None
+        if identity is not None:
+            try:
+                snapshot = Snapshot(SNAPSHOT_PATH)
+                logger.info("Mapped topics snapshot %s (version %s)", SNAPSHOT_PATH, snapshot.version)
+            except (OSError, ValueError, struct.error) as exc:
+                logger.error("Could not map topics snapshot %s: %s", SNAPSHOT_PATH, exc)
+        # The old map is closed once the last request using it lets go.
+        _snapshot, _identity = snapshot, identity
+        _generation += 1
+        return _snapshot
+
+
+def generation():
+    """Return a counter that changes whenever a different snapshot is mapped."""
+    current()
+    return _generation
+
+
+def reset():
+    """Forget the mapped snapshot so the next lookup re-checks the file."""
+    global _snapshot, _identity, _checked_at, _generation
+    with _lock:
+        _snapshot, _identity, _checked_at = None, None, 0.0
+        _generation += 1
@@ -0,0 +1,245 @@
+import os
+import re
+import json
+import hashlib
+import logging
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.template import engines
+from django.test import Client
+from django.urls import reverse
+
+from . import compression
+from . import content_index
+from . import content_roots
+from . import page_cache
+from .views import nav_url
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'export-manifest.json'
+BOOK_COURSE_DIR = os.path.join(settings.BASE_DIR, 'Topics', 'course')
+# Same ignore list as collectstatic.
+ASSET_IGNORE_PATTERNS = ['CVS', '.*', '*~']
+STATIC_REF_RE = re.compile(re.escape(settings.STATIC_URL.encode()) + rb'([^"\'\s)?#]+)')
+
+
+class Route:
+    """One URL of the exported site.
+
+    `source` identifies everything the page is built from; the page is only
+    rebuilt when it changes. `copy_from` is set for pages that are served
+    byte for byte from a file, which are copied instead of rendered.
+    """
+
+    def __init__(self, url, source, copy_from=None):
+        self.url = url
+        self.source = source
+        self.copy_from = copy_from
+
+    def output_path(self, output_dir):
+        """Return where a plain file server looks for this URL.
+
+        That is <url>/index.html, except for URLs of a file such as the
+        nav .json files, which are written under their own name.
+        """
+        parts = [part for part in unquote(self.url).split('/') if part]
+        if any(part in ('.', '..') for part in parts):
+            raise ValueError(f"Unsafe route {self.url!r}")
+        if not self.url.endswith('/'):
+            return os.path.join(output_dir, *parts)
+        return os.path.join(output_dir, *parts, 'index.html')
+
+
+def template_signature():
+    """Hash the (path, mtime_ns) of every template, so a template edit re-renders every page."""
+    digest = hashlib.sha1()
+    for template_dir in engines['django'].template_dirs:
+        for root, dirs, files in os.walk(template_dir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(f"{path}\0{os.stat(path).st_mtime_ns}\0".encode())
+    return digest.hexdigest()[:16]
+
+
+def _tree_signature(path):
+    return hashlib.sha1(repr(content_index.directory_signature(path)).encode()).hexdigest()[:16]
+
+
+def collect_routes(pages_dir):
+    """Return every route pages/urls.py and book/urls.py can produce for the tree on disk."""
+    templates = template_signature()
+    routes = [Route(reverse('tutorials_dashboard'), templates)]
+
+    for root in content_roots.get_registry():
+        tree = _tree_signature(root.path)
+        routes.append(Route(f"/tutorials/{root.name}/", f"{templates}:{tree}"))
+        # The sidebar loads each topic and subfolder from its nav JSON.
+        for topic, items in content_index.get_index(root.path).items():
+            routes.append(Route(nav_url(root.name, topic), tree))
+            for folder in items:
+                if folder != '_files':
+                    routes.append(Route(nav_url(root.name, topic, folder), tree))
+        # /tutorials/<topic>/<subtopic>/ reads <pages_dir>/<topic>/<subtopic>, so it
+        # only reaches pages directly inside a root that lives in pages_dir.
+        topic = os.path.basename(root.path)
+        if os.path.dirname(root.path) == os.path.abspath(pages_dir) and os.path.isdir(root.path):
+            for name in sorted(os.listdir(root.path)):
+                file_path = os.path.join(root.path, name)
+                if name.endswith('.html') and os.path.isfile(file_path):
+                    sha1 = page_cache.file_digest(file_path)[0]
+                    routes.append(Route(f"/tutorials/{topic}/{name}/", f"{templates}:{tree}:{sha1}"))
+
+    for root, dirs, files in os.walk(pages_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith('.html'):
+                file_path = os.path.join(root, name)
+                rel = os.path.relpath(file_path, pages_dir).replace(os.sep, '/')
+                sha1 = page_cache.file_digest(file_path)[0]
+                routes.append(Route(reverse('tutorials', kwargs={'file_path': rel}), sha1, copy_from=file_path))
+
+    # book/urls.py is mounted at 'book_view' without a slash, hence /book_view<topic>/.
+    if os.path.isdir(BOOK_COURSE_DIR):
+        for topic in sorted(os.listdir(BOOK_COURSE_DIR)):
+            topic_dir = os.path.join(BOOK_COURSE_DIR, topic)
+            if os.path.isdir(topic_dir) and '/' not in topic:
+                routes.append(Route(f"/book_view{topic}/", f"{templates}:{_tree_signature(topic_dir)}"))
+    return routes
+
+
+def hashed_name(path, data):
+    """Return path with the content hash before its extension: css/site.css -> css/site.<hash>.css."""
+    base, ext = os.path.splitext(path)
+    return f"{base}.{hashlib.md5(data).hexdigest()[:12]}{ext}"
+
+
+def export_assets(output_dir, previous=None):
+    """Copy every static file under output_dir/<STATIC_URL>, also under a content-hashed name.
+
+    The page URLs must stay stable, so the pages are not renamed; the
+    assets they reference are, and can then be served with a far-future
+    Cache-Control. The unhashed copy keeps relative references (e.g.
+    url() in a stylesheet) working. Returns {path: hashed path}; hashed
+    files of a previous export that are no longer current are removed.
+    """
+    static_dir = os.path.join(output_dir, *[part for part in settings.STATIC_URL.split('/') if part])
+    assets = {}
+    for finder in finders.get_finders():
+        for path, storage in finder.list(ASSET_IGNORE_PATTERNS):
+            if path in assets:
+                # The first finder wins, as in collectstatic.
+                continue
+            with storage.open(path) as f:
+                data = f.read()
+            assets[path] = hashed_name(path, data)
+            for name in (path, assets[path]):
+                target = os.path.join(static_dir, *name.split('/'))
+                if not _has_content(target, data):
+                    _write(target, data)
+                    compression.compress_file(target)
+    for path, name in (previous or {}).items():
+        stale = [] if assets.get(path) == name else [name]
+        if path not in assets:
+            stale.append(path)
+        for target in [os.path.join(static_dir, *name.split('/')) for name in stale]:
+            for file_path in [target] + [target + suffix for encoding, suffix in compression.ENCODINGS]:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+    return assets
+
+
+def link_assets(body, assets):
+    """Point the STATIC_URL references in a page at the hashed copies of the assets."""
+    def replace(match):
+        name = assets.get(unquote(match.group(1).decode('utf-8', 'replace')))
+        return settings.STATIC_URL.encode() + name.encode('utf-8') if name else match.group(0)
+    return STATIC_REF_RE.sub(replace, body)
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'routes': {}, 'assets': {}}
+
+
+def export_site(output_dir, pages_dir, force=False):
+    """Write every route under output_dir as <url>/index.html plus .br/.gz siblings.
+
+    The static assets are exported first under content-hashed names (see
+    export_assets) and the pages link to those. Routes whose source and
+    assets are unchanged since the last export are skipped, and routes that
+    disappeared are removed. Returns a dict of counters.
+    """
+    output_dir = os.path.abspath(output_dir)
+    manifest = {'routes': {}, 'assets': {}} if force else load_manifest(output_dir)
+    previous = manifest['routes']
+    current = {}
+    stats = {'rendered': 0, 'copied': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+    client = Client()
+
+    assets = export_assets(output_dir, manifest.get('assets'))
+    # A page is rebuilt when any asset it may link to changes name.
+    assets_signature = hashlib.sha1(json.dumps(assets, sort_keys=True).encode()).hexdigest()[:16]
+
+    for route in collect_routes(pages_dir):
+        target = route.output_path(output_dir)
+        source = f"{route.source}:{assets_signature}"
+        old = previous.get(route.url)
+        if old and old['source'] == source and os.path.exists(target):
+            current[route.url] = old
+            stats['unchanged'] += 1
+            continue
+
+        if route.copy_from:
+            with open(route.copy_from, 'rb') as f:
+                body = f.read()
+        else:
+            response = client.get(route.url)
+            if response.status_code != 200:
+                logger.warning("Skipping %s: status %s", route.url, response.status_code)
+                stats['failed'] += 1
+                continue
+            body = response.content
+        body = link_assets(body, assets)
+
+        sha1 = hashlib.sha1(body).hexdigest()
+        if not (old and old['sha1'] == sha1 and os.path.exists(target)):
+            _write(target, body)
+            compression.compress_file(target)
+        current[route.url] = {'source': source, 'sha1': sha1, 'file': os.path.relpath(target, output_dir)}
+        stats['copied' if route.copy_from else 'rendered'] += 1
+
+    for url, entry in previous.items():
+        if url not in current:
+            target = os.path.join(output_dir, entry['file'])
+            for path in [target] + [target + suffix for encoding, suffix in compression.ENCODINGS]:
+                if os.path.exists(path):
+                    os.remove(path)
+            stats['removed'] += 1
+
+    _write(os.path.join(output_dir, MANIFEST_NAME),
+           json.dumps({'routes': current, 'assets': assets}, indent=1, sort_keys=True).encode('utf-8'))
+    return stats
+
+
+def _has_content(path, data):
+    try:
+        with open(path, 'rb') as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,36 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from pages import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(path, alt='', sizes='100vw', **attrs):
+    """Render a static image as a <picture> of its AVIF/WebP derivatives.
+
+    Usage: {% responsive_image 'images/python.png' alt='Python Logo' sizes='60px' %}
+    Other keyword arguments become <img> attributes; images load lazily
+    unless loading='eager' is given.
+    Images without derivatives (see `manage.py build_image_derivatives`)
+    fall back to a plain <img> of the original.
+    """
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+    img = format_html('<img src="{}" alt="{}"{}>', static(path), alt, extra)
+    record = images.lookup(path)
+    if not record:
+        return img
+
+    sources = []
+    for image_format in images.MIME_TYPES:
+        candidates = [v for v in record['variants'] if v['format'] == image_format]
+        if candidates:
+            srcset = ', '.join(f"{static(images.OUTPUT_PREFIX + v['name'])} {v['width']}w" for v in candidates)
+            sources.append(format_html(
+                '<source type="{}" srcset="{}" sizes="{}">', images.MIME_TYPES[image_format], srcset, sizes,
+            ))
+    return format_html('<picture>{}{}</picture>', format_html_join('', '{}', ((s,) for s in sources)), img)
@@ -1,3 +1,831 @@
-from django.test import TestCase
+import os
+import sys
+import asyncio
+import gzip
+import time
+import shutil
+import tempfile
+import threading
+import statistics
+import subprocess
+import unittest
+import importlib.util
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from DataEngineering import auth
+
+from . import benchmarks
+from . import compression
+from . import content_index
+from . import content_roots
+from . import file_serving
+from . import manifest
+from . import page_cache
+from . import reading_index
+from . import search
+from . import shared_index
+from . import views
+
+
+def write_page(directory, name, title, body):
+    with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+        f.write(f"<html><head><title>{title}</title></head><body>{body}</body></html>")
+
+
+def load_pdf_stream():
+    """Import Topics/data_engineering/pdf_stream.py, which is a script directory, not a package."""
+    try:
+        import PyPDF2  # noqa: F401
+    except ImportError:  # PyPDF2 is only needed to build the PDF book.
+        return None
+    path = os.path.join(settings.BASE_DIR, 'Topics', 'data_engineering', 'pdf_stream.py')
+    spec = importlib.util.spec_from_file_location('pdf_stream', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+pdf_stream = load_pdf_stream()
+
+
+class SearchIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        self.pages_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pages_dir)
+        write_page(self.pages_dir, 'spark.html', 'Spark',
+                   "Spark runs data pipelines. Spark streaming, spark joins and spark shuffles.")
+        write_page(self.pages_dir, 'kafka.html', 'Kafka',
+                   "Kafka feeds data pipelines into Spark. <script>var pipelines;</script>")
+        write_page(self.pages_dir, 'python.html', 'Python',
+                   "Python generators stream rows. Pipelines of data in Python.")
+        self.index = search.SearchIndex()
+        self.index.update([self.pages_dir], base_dir=self.pages_dir)
+
+    def paths(self, query):
+        return [doc['path'] for score, doc in self.index.search(query)]
+
+    def test_more_frequent_term_ranks_first(self):
+        self.assertEqual(self.paths('spark'), ['spark.html', 'kafka.html'])
+
+    def test_every_clause_must_match(self):
+        self.assertEqual(self.paths('spark python'), [])
+        self.assertEqual(self.paths('kafka spark'), ['kafka.html'])
+
+    def test_phrase_needs_adjacent_terms(self):
+        self.assertEqual(sorted(self.paths('"data pipelines"')), ['kafka.html', 'spark.html'])
+        self.assertEqual(self.paths('"pipelines data"'), [])
+        self.assertEqual(self.paths('"pipelines of data"'), ['python.html'])
+
+    def test_prefix_expands_to_matching_terms(self):
+        self.assertEqual(self.index.expand_prefix('stream'), ['stream', 'streaming'])
+        self.assertEqual(sorted(self.paths('stream*')), ['python.html', 'spark.html'])
+
+    def test_scripts_and_tags_are_not_indexed(self):
+        self.assertNotIn('var', self.index.postings)
+        self.assertNotIn('body', self.index.postings)
+        self.assertEqual(self.index.postings['pipelines'].keys(), {0, 1, 2})
+
+    def test_saved_index_answers_the_same(self):
+        path = os.path.join(self.pages_dir, 'index.json.gz')
+        self.index.save(path)
+        loaded = search.SearchIndex.load(path)
+        for query in ('spark', '"data pipelines"', 'stream*'):
+            self.assertEqual(loaded.search(query), self.index.search(query))
+
+    def test_unchanged_files_are_not_reindexed(self):
+        self.assertEqual(self.index.update([self.pages_dir], base_dir=self.pages_dir), (0, 0, 3))
+        os.remove(os.path.join(self.pages_dir, 'kafka.html'))
+        self.assertEqual(self.index.update([self.pages_dir], base_dir=self.pages_dir), (0, 1, 2))
+        self.assertEqual(self.paths('kafka'), [])
+
+    def test_query_parsing(self):
+        self.assertEqual(search.parse_query('Spark "Data  Pipelines" str*'), [
+            ('term', 'spark'), ('phrase', ['data', 'pipelines']), ('prefix', 'str'),
+        ])
+
+
+class SearchViewTests(SimpleTestCase):
+
+    def test_answers_503_while_the_index_is_missing(self):
+        with mock.patch.object(search, 'get_index', return_value=None):
+            response = self.client.get(reverse('tutorials_search'), {'q': 'spark'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(response.json()['results'], [])
+
+    def test_missing_index_is_built_in_the_background_once(self):
+        with mock.patch.object(search, 'INDEX_PATH', os.path.join(tempfile.gettempdir(), 'missing.json.gz')), \
+                mock.patch.object(search, '_build_started', False), \
+                mock.patch.object(search, '_loaded', {'index': None, 'mtime_ns': None}), \
+                mock.patch('threading.Thread') as thread:
+            self.assertIsNone(search.get_index([]))
+            self.assertIsNone(search.get_index([]))
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once_with()
+
+    def test_unreadable_index_keeps_the_loaded_one(self):
+        fd, path = tempfile.mkstemp(suffix='.json.gz')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        previous = search.SearchIndex()
+        with mock.patch.object(search, 'INDEX_PATH', path), \
+                mock.patch.object(search, '_loaded', {'index': None, 'mtime_ns': None}):
+            for n, data in enumerate([b'not gzip', gzip.compress(b'{"docs": ['), gzip.compress(b'{"docs": []}')], 2):
+                with open(path, 'wb') as f:
+                    f.write(data)
+                os.utime(path, ns=(n, n))
+                with self.assertLogs(search.logger, 'ERROR'):
+                    self.assertIsNone(search.get_index([]))
+            search._loaded['index'] = previous
+            with mock.patch.object(search.SearchIndex, 'load') as load:
+                self.assertIs(search.get_index([]), previous)
+            # The broken file is not read again until it changes.
+            load.assert_not_called()
+            os.utime(path, ns=(1, 1))
+            with self.assertLogs(search.logger, 'ERROR'):
+                self.assertIs(search.get_index([]), previous)
+
+
+class RangeTests(SimpleTestCase):
+
+    def setUp(self):
+        fd, self.file_path = tempfile.mkstemp(suffix='.html')
+        self.addCleanup(os.remove, self.file_path)
+        self.data = bytes(range(256)) * 1024
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.data)
+        self.etag = '"v1"'
+
+    def serve(self, **headers):
+        request = RequestFactory().get('/page/', **headers)
+        return file_serving.serve_file(request, self.file_path, self.etag, None, 'text/html')
+
+    def test_parse_range(self):
+        parse = file_serving.parse_range
+        self.assertEqual(parse('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse('bytes=-5000', 1000), (0, 999))
+        self.assertEqual(parse('bytes=990-2000', 1000), (990, 999))
+        self.assertFalse(parse('bytes=1000-', 1000))
+        self.assertFalse(parse('bytes=500-400', 1000))
+        self.assertFalse(parse('bytes=-0', 1000))
+        for ignored in (None, '', 'bytes=-', 'bytes=0-1,5-6', 'lines=0-1', 'bytes=a-b'):
+            self.assertIsNone(parse(ignored, 1000), ignored)
+
+    def test_full_response_advertises_ranges(self):
+        response = self.serve()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        response.close()
+
+    def test_partial_content(self):
+        response = self.serve(HTTP_RANGE='bytes=100000-100099')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100000-100099/{len(self.data)}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(b''.join(response.streaming_content), self.data[100000:100100])
+
+    def test_range_longer_than_a_chunk(self):
+        response = self.serve(HTTP_RANGE='bytes=10-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.data[10:])
+
+    def test_unsatisfiable_range(self):
+        response = self.serve(HTTP_RANGE=f'bytes={len(self.data)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.data)}')
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        response = self.serve(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"v0"')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        response = self.serve(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=self.etag)
+        self.assertEqual(response.status_code, 206)
+
+    def test_not_modified(self):
+        response = self.serve(HTTP_IF_NONE_MATCH=self.etag, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 304)
+
+
+@mock.patch.object(compression, 'ENCODINGS', [('br', '.br'), ('gzip', '.gz')])
+class AcceptEncodingTests(SimpleTestCase):
+
+    def request(self, accept_encoding):
+        return RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    def test_accepted_encodings(self):
+        accepted = compression.accepted_encodings(self.request('gzip;q=0.5, BR , identity;q=0, deflate;q=x'))
+        self.assertEqual(accepted, {'gzip', 'br'})
+        self.assertEqual(compression.accepted_encodings(RequestFactory().get('/')), set())
+
+    def test_best_accepted_encoding_wins(self):
+        choose = compression.choose_encoding
+        self.assertEqual(choose(self.request('gzip, br'), ['br', 'gzip']), 'br')
+        self.assertEqual(choose(self.request('gzip, br;q=0'), ['br', 'gzip']), 'gzip')
+        self.assertEqual(choose(self.request('br'), ['gzip']), None)
+        self.assertEqual(choose(self.request('*'), ['gzip']), 'gzip')
+        self.assertEqual(choose(self.request('identity'), ['br', 'gzip']), None)
+
+    def test_precompressed_variant_must_be_fresh(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        page = os.path.join(directory, 'page.html')
+        for path in (page, page + '.gz'):
+            with open(path, 'wb') as f:
+                f.write(b'<p>page</p>')
+        os.utime(page, ns=(1_000_000_000, 1_000_000_000))
+        self.assertEqual(compression.precompressed_variant(self.request('br, gzip'), page), ('gzip', page + '.gz'))
+        self.assertEqual(compression.precompressed_variant(self.request('br'), page), (None, page))
+        # A source newer than its sibling is served uncompressed until recompressed.
+        os.utime(page)
+        os.utime(page + '.gz', ns=(1_000_000_000, 1_000_000_000))
+        self.assertEqual(compression.precompressed_variant(self.request('gzip'), page), (None, page))
+
+    def test_only_worthwhile_variants_are_kept(self):
+        self.assertIn('gzip', compression.compress_bytes(b'tutorial ' * 200))
+        self.assertEqual(compression.compress_bytes(os.urandom(2048)), {})
+
+    def test_cached_page_is_served_per_encoding(self):
+        self.addCleanup(cache.clear)
+        body = b'<p>tutorial</p>' * 100
+        render = mock.Mock(return_value=HttpResponse(body))
+
+        def get(accept_encoding, **headers):
+            request = RequestFactory().get('/page/', HTTP_ACCEPT_ENCODING=accept_encoding, **headers)
+            request.user = AnonymousUser()
+            return page_cache.cached_page(request, ('page', 1), '"abc"', None, render)
+
+        response = get('gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], '"abc-gzip"')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response.content), body)
+        response = get('')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['ETag'], '"abc"')
+        self.assertEqual(response.content, body)
+        render.assert_called_once_with()
+        # The ETag of one coding does not validate the other.
+        self.assertEqual(get('gzip', HTTP_IF_NONE_MATCH='"abc-gzip"').status_code, 304)
+        self.assertEqual(get('', HTTP_IF_NONE_MATCH='"abc-gzip"').status_code, 200)
+
+
+@unittest.skipIf(pdf_stream is None, "PyPDF2 is not installed")
+class StreamingPdfWriterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def chapter(self, name, widths):
+        """Write a PDF with one blank page per width, so pages can be told apart."""
+        from PyPDF2 import PageObject, PdfWriter
+
+        writer = PdfWriter()
+        for width in widths:
+            writer.add_page(PageObject.create_blank_page(None, width, 792))
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            writer.write(f)
+        return path
+
+    def test_pages_and_outline(self):
+        from PyPDF2 import PdfReader
+
+        output = os.path.join(self.directory, 'book.pdf')
+        with open(output, 'wb') as f:
+            writer = pdf_stream.StreamingPdfWriter(f)
+            first = writer.add_pdf(self.chapter('one.pdf', [600, 601]))
+            part = writer.add_outline('Part one', first)
+            writer.add_outline('Chapter one', first, parent=part)
+            second = writer.add_pdf(self.chapter('two.pdf', [602, 603, 604]))
+            writer.add_outline('Chapter two', second, parent=part)
+            writer.add_outline('Appendix', second + 2)
+            writer.close()
+        self.assertEqual((first, second), (0, 2))
+
+        reader = PdfReader(output, strict=True)
+        self.assertEqual([float(page.mediabox.width) for page in reader.pages], [600, 601, 602, 603, 604])
+        outline = reader.outline
+        self.assertEqual([item.title for item in outline if not isinstance(item, list)], ['Part one', 'Appendix'])
+        children = outline[1]
+        self.assertEqual([item.title for item in children], ['Chapter one', 'Chapter two'])
+        self.assertEqual([reader.get_destination_page_number(item) for item in children], [0, 2])
+        self.assertEqual(reader.get_destination_page_number(outline[2]), 4)
+
+    def test_without_outline(self):
+        from PyPDF2 import PdfReader
+
+        output = os.path.join(self.directory, 'book.pdf')
+        with open(output, 'wb') as f:
+            writer = pdf_stream.StreamingPdfWriter(f)
+            writer.add_pdf(self.chapter('one.pdf', [600]))
+            writer.close()
+        reader = PdfReader(output, strict=True)
+        self.assertEqual(len(reader.pages), 1)
+        self.assertEqual(reader.outline, [])
+
+
+class ColdStartTests(SimpleTestCase):
+    """What `profile_startup --budget` checks in CI, as a test."""
+
+    def test_wsgi_import_stays_within_budget(self):
+        command = [sys.executable, '-X', 'importtime', '-c', 'import DataEngineering.wsgi']
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='DataEngineering.settings')
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            result = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+            timings.append((time.perf_counter() - started) * 1000)
+            self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+
+        imported = {name.split('.')[0] for name, *timing in benchmarks.parse_importtime(result.stderr)}
+        for module in benchmarks.DEFERRED_IMPORTS:
+            self.assertNotIn(module, imported, f"{module} is imported at startup")
+        self.assertLess(statistics.median(timings), benchmarks.COLD_START_BUDGET_MS,
+                        f"Cold start timings (ms): {[round(t) for t in timings]}")
+
+
+class ContentRootTestCase(SimpleTestCase):
+    """A temporary content root, with the manifest, snapshot and index caches isolated."""
+
+    def setUp(self):
+        self.scratch = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.scratch)
+        self.root = os.path.join(self.scratch, 'root')
+        os.makedirs(os.path.join(self.root, '1. Basics'))
+        self.page('1. Basics/1.1 Intro.html')
+        self.page('1. Basics/1.2 Types.html')
+        for target, name, value in [
+            (manifest, 'MANIFEST_PATH', os.path.join(self.scratch, 'manifest.json')),
+            (shared_index, 'SNAPSHOT_PATH', os.path.join(self.scratch, 'snapshot.bin')),
+            (content_index, 'CHECK_INTERVAL', 0),
+            (content_index, '_indexes', {}),
+            (content_index, '_stats', {'hits': 0, 'misses': 0, 'invalidations': 0}),
+        ]:
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        manifest.reset()
+        self.addCleanup(manifest.reset)
+
+    def page(self, rel_path, body='<p>page</p>'):
+        path = os.path.join(self.root, *rel_path.split('/'))
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"<html><head><title>{os.path.basename(path)}</title></head><body>{body}</body></html>")
+        return path
+
+    def touch_dir(self, rel_path=''):
+        """Give a directory a new mtime, as adding or removing an entry does."""
+        path = os.path.join(self.root, rel_path)
+        mtime_ns = os.stat(path).st_mtime_ns + 10 ** 9
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+class ManifestIndexTests(ContentRootTestCase):
+
+    def write_manifest(self):
+        data = manifest.build_manifest([self.root], content_index.scan_directory_structure,
+                                       content_index.directory_signature)
+        manifest.write_manifest(data, manifest.MANIFEST_PATH)
+
+    def test_manifest_entry_is_served_while_the_disk_matches(self):
+        self.write_manifest()
+        with mock.patch.object(content_index, 'scan_directory_structure') as scan:
+            structure = content_index.get_index(self.root, build=scan)
+            version, last_modified = content_index.get_version(self.root, build=scan)
+            self.assertEqual(content_index.get_index(self.root, build=scan), structure)
+        scan.assert_not_called()
+        self.assertTrue(version.startswith('m'))
+        self.assertEqual(structure['1. Basics']['_files'], ['1.1 Intro.html', '1.2 Types.html'])
+
+    def test_page_added_after_the_manifest_is_picked_up(self):
+        self.write_manifest()
+        version = content_index.get_version(self.root)[0]
+        self.page('1. Basics/1.3 Loops.html')
+        self.touch_dir('1. Basics')
+        self.assertEqual(content_index.get_index(self.root)['1. Basics']['_files'],
+                         ['1.1 Intro.html', '1.2 Types.html', '1.3 Loops.html'])
+        self.assertNotEqual(content_index.get_version(self.root)[0], version)
+        self.assertEqual(content_index.cache_stats()['invalidations'], 1)
+
+    def test_manifest_without_a_signature_is_rebuilt_on_first_check(self):
+        data = manifest.build_manifest([self.root], content_index.scan_directory_structure)
+        manifest.write_manifest(data, manifest.MANIFEST_PATH)
+        self.assertTrue(content_index.get_version(self.root)[0].startswith('m'))
+        self.assertFalse(content_index.get_version(self.root)[0].startswith('m'))
+
+
+class ContentIndexTests(ContentRootTestCase):
+
+    def test_signature_covers_every_directory(self):
+        os.makedirs(os.path.join(self.root, '2. Data', 'extra'))
+        paths = [path for path, mtime_ns in content_index.directory_signature(self.root)]
+        self.assertEqual(paths, [self.root] + [os.path.join(self.root, *parts) for parts in [
+            ('1. Basics',), ('2. Data',), ('2. Data', 'extra')]])
+
+    def test_cached_index_survives_while_nothing_changes(self):
+        build = mock.Mock(side_effect=content_index.scan_directory_structure)
+        structure = content_index.get_index(self.root, build=build)
+        version = content_index.get_version(self.root, build=build)
+        for _ in range(3):
+            self.assertIs(content_index.get_index(self.root, build=build), structure)
+        # Editing a page in place does not change the table of contents.
+        self.page('1. Basics/1.1 Intro.html', body='<p>edited</p>')
+        self.assertIs(content_index.get_index(self.root, build=build), structure)
+        self.assertEqual(content_index.get_version(self.root, build=build), version)
+        build.assert_called_once_with(self.root)
+        stats = content_index.cache_stats()
+        self.assertEqual((stats['misses'], stats['hits'], stats['invalidations']), (1, 4, 0))
+        self.assertEqual(stats['roots'], [self.root])
+
+    def test_new_file_invalidates_the_index(self):
+        version = content_index.get_version(self.root)[0]
+        self.page('1. Basics/1.3 Loops.html')
+        self.touch_dir('1. Basics')
+        self.assertIn('1.3 Loops.html', content_index.get_index(self.root)['1. Basics']['_files'])
+        self.assertNotEqual(content_index.get_version(self.root)[0], version)
+        stats = content_index.cache_stats()
+        self.assertEqual((stats['misses'], stats['hits'], stats['invalidations']), (2, 0, 1))
+
+    def test_touched_directory_invalidates_the_index(self):
+        structure = content_index.get_index(self.root)
+        self.touch_dir()
+        self.assertIsNot(content_index.get_index(self.root), structure)
+        self.assertEqual(content_index.cache_stats()['invalidations'], 1)
+
+    def test_no_disk_check_within_the_interval(self):
+        with mock.patch.object(content_index, 'CHECK_INTERVAL', 3600):
+            structure = content_index.get_index(self.root)
+            self.page('1. Basics/1.3 Loops.html')
+            self.touch_dir('1. Basics')
+            with mock.patch.object(content_index, 'directory_signature') as signature:
+                self.assertIs(content_index.get_index(self.root), structure)
+            signature.assert_not_called()
+
+    def test_invalidate_drops_the_root(self):
+        content_index.get_index(self.root)
+        content_index.invalidate(self.root)
+        self.assertEqual(content_index.cache_stats()['roots'], [])
+
+    def test_slow_build_of_one_root_does_not_block_another(self):
+        other = os.path.join(self.scratch, 'other')
+        os.makedirs(other)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_build(pages_dir):
+            started.set()
+            release.wait(5)
+            return {}
+
+        thread = threading.Thread(target=content_index.get_index, args=(self.root, slow_build))
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+        self.assertTrue(started.wait(5))
+        self.assertEqual(content_index.get_index(other, build=lambda pages_dir: {'t': {}}), {'t': {}})
+
+
+class PageCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        self.render = mock.Mock(side_effect=lambda: HttpResponse(b'<p>tutorial</p>' * 100))
+        self.last_modified = 1_700_000_000
+
+    def get(self, user=None, method='get', **headers):
+        request = getattr(RequestFactory(), method)('/page/', **headers)
+        request.user = user or AnonymousUser()
+        return page_cache.cached_page(request, ('page', 1), '"abc"', self.last_modified, self.render)
+
+    def test_etag_round_trip(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"abc"')
+        self.assertEqual(response['Last-Modified'], 'Tue, 14 Nov 2023 22:13:20 GMT')
+        response = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], '"abc"')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"old"').status_code, 200)
+        self.render.assert_called_once_with()
+
+    def test_last_modified_round_trip(self):
+        response = self.get()
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE='Mon, 13 Nov 2023 00:00:00 GMT').status_code, 200)
+
+    def test_identity_fallback_keeps_the_plain_etag(self):
+        self.render.side_effect = lambda: HttpResponse(os.urandom(4096))
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['ETag'], '"abc"')
+        # The same bytes validate whatever the client accepts.
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"abc"').status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"abc"', HTTP_ACCEPT_ENCODING='gzip').status_code, 304)
+
+    def test_authenticated_requests_are_not_cached(self):
+        user = mock.Mock(is_authenticated=True)
+        self.get(user=user)
+        response = self.get(user=user, HTTP_IF_NONE_MATCH='"abc"')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(self.render.call_count, 2)
+        # Nor is what they rendered served to anonymous readers.
+        self.get()
+        self.assertEqual(self.render.call_count, 3)
+
+    def test_only_get_and_head_are_cached(self):
+        self.get(method='post')
+        self.get(method='post')
+        self.assertEqual(self.render.call_count, 2)
+        self.assertEqual(self.get(method='head').status_code, 200)
+        self.get()
+        self.assertEqual(self.render.call_count, 3)
+
+    def test_errors_are_not_cached(self):
+        self.render.side_effect = lambda: HttpResponse(b'missing', status=404)
+        self.assertEqual(self.get().status_code, 404)
+        self.assertEqual(self.get().status_code, 404)
+        self.assertEqual(self.render.call_count, 2)
+
+
+class SnapshotTests(ContentRootTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for target, name, value in [(shared_index, 'CHECK_INTERVAL', 0), (page_cache, '_digests', {})]:
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.intro = os.path.join(self.root, '1. Basics', '1.1 Intro.html')
+        data = manifest.build_manifest([self.root], content_index.scan_directory_structure,
+                                       content_index.directory_signature)
+        shared_index.publish(data, shared_index.SNAPSHOT_PATH)
+        self.addCleanup(shared_index.reset)
+
+    def body(self):
+        body = manifest.file_body(self.intro)
+        return None if body is None else bytes(body)
+
+    def test_index_and_bodies_come_from_the_snapshot(self):
+        with open(self.intro, 'rb') as f:
+            expected = f.read()
+        self.assertEqual(shared_index.current().version, manifest.build_manifest(
+            [self.root], content_index.scan_directory_structure)['version'])
+        with mock.patch.object(content_index, 'scan_directory_structure') as scan:
+            structure = content_index.get_index(self.root, build=scan)
+        scan.assert_not_called()
+        self.assertEqual(structure, content_index.scan_directory_structure(self.root))
+        with mock.patch('builtins.open') as open_:
+            self.assertEqual(self.body(), expected)
+        open_.assert_not_called()
+
+    def test_copied_page_with_a_new_mtime_is_still_served(self):
+        os.utime(self.intro, ns=(10 ** 9, 10 ** 9))
+        self.assertIsNotNone(self.body())
+
+    def test_changed_page_falls_back_to_the_disk(self):
+        with open(self.intro, 'rb') as f:
+            data = f.read()
+        self.page('1. Basics/1.1 Intro.html', '<p>edit</p>')
+        self.assertIsNone(self.body())
+        # Same size, different bytes.
+        with open(self.intro, 'wb') as f:
+            f.write(data.replace(b'page', b'PAGE'))
+        self.assertIsNone(self.body())
+        os.remove(self.intro)
+        self.assertIsNone(self.body())
+
+    def test_pages_missing_from_the_snapshot_are_read_from_disk(self):
+        self.assertIsNone(manifest.file_body(self.page('1. Basics/1.3 New.html')))
+
+    def test_unreadable_snapshot_is_ignored(self):
+        with open(shared_index.SNAPSHOT_PATH, 'wb') as f:
+            f.write(b'not a snapshot' * 10)
+        with self.assertLogs(shared_index.logger, 'ERROR'):
+            self.assertIsNone(shared_index.current())
+        self.assertIsNone(self.body())
+
+
+class NavTests(ContentRootTestCase):
+    """A root named 'root' with pages directly inside it, in a topic and in a subfolder."""
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.root, '1. Basics', 'Extras'))
+        self.page('1. Basics/Extras/1.3 Extra.html')
+        self.page('0. Welcome.html')
+        self.page('0.1 Setup.html')
+        registry = content_roots.ContentRootRegistry([content_roots.ContentRoot('root', self.root)])
+        for target, name, value in [
+            (views, 'HTML_TOPICS_PAGES_DIR', self.scratch),
+            (content_roots, '_registry', registry),
+            (reading_index, 'WARM_NEXT', False),
+        ]:
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(reading_index.reset)
+        self.addCleanup(cache.clear)
+
+    def nav(self, node, **headers):
+        return self.client.get(reverse('tutorials_nav', kwargs={'root': 'root', 'node': node}), **headers)
+
+    def file(self, rel_path):
+        return {'title': rel_path.split('/')[-1], 'url': reverse('tutorials', kwargs={'file_path': 'root/' + rel_path})}
+
+    def link(self, rel_path):
+        return dict(self.file(rel_path), title=os.path.splitext(rel_path.split('/')[-1])[0])
+
+    def test_topic_lists_its_pages_and_subfolders(self):
+        self.assertEqual(self.nav('1. Basics').json(), {
+            'path': '1. Basics',
+            'dirs': [{'title': 'Extras', 'url': reverse('tutorials_nav', kwargs={'root': 'root', 'node': '1. Basics/Extras'})}],
+            'files': [self.file('1. Basics/1.1 Intro.html'), self.file('1. Basics/1.2 Types.html')],
+        })
+        self.assertEqual(self.nav('1. Basics/Extras').json(), {
+            'path': '1. Basics/Extras', 'dirs': [], 'files': [self.file('1. Basics/Extras/1.3 Extra.html')],
+        })
+
+    def test_pages_inside_the_root_form_the_root_topic(self):
+        self.assertEqual(content_index.get_index(self.root)['root'], {'_files': ['0. Welcome.html', '0.1 Setup.html']})
+        self.assertEqual(self.nav('root').json(), {
+            'path': 'root', 'dirs': [], 'files': [self.file('0. Welcome.html'), self.file('0.1 Setup.html')],
+        })
+        self.assertEqual(self.client.get(self.file('0. Welcome.html')['url']).status_code, 200)
+
+    def test_etag_round_trip(self):
+        response = self.nav('1. Basics')
+        self.assertEqual(self.nav('1. Basics', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertNotEqual(self.nav('root')['ETag'], response['ETag'])
+        self.page('1. Basics/1.4 More.html')
+        self.touch_dir('1. Basics')
+        changed = self.nav('1. Basics', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+        self.assertEqual(len(changed.json()['files']), 3)
+
+    def test_unknown_nodes_are_not_found(self):
+        for node in ('Nope', '1. Basics/Nope', '1. Basics/Extras/x', 'root/..'):
+            self.assertEqual(self.nav(node).status_code, 404, node)
+        self.assertEqual(self.client.get(
+            reverse('tutorials_nav', kwargs={'root': 'nope', 'node': 'root'})).status_code, 404)
+
+    def test_reading_order_follows_the_table_of_contents(self):
+        paths = ['1. Basics/1.1 Intro.html', '1. Basics/1.2 Types.html', '1. Basics/Extras/1.3 Extra.html',
+                 '0. Welcome.html', '0.1 Setup.html']
+        self.assertEqual(reading_index.get_order(self.root).pages,
+                         [os.path.realpath(os.path.join(self.root, *path.split('/'))) for path in paths])
+        links = views.reading_links(self.root, os.path.join(self.root, '1. Basics', '1.2 Types.html'))
+        self.assertEqual(links['prev'], self.link('1. Basics/1.1 Intro.html'))
+        self.assertEqual(links['next'], self.link('1. Basics/Extras/1.3 Extra.html'))
+        links = views.reading_links(self.root, None)
+        self.assertEqual((links['prev'], links['next']), (None, self.link('1. Basics/1.1 Intro.html')))
+
+    def test_link_header_prefetches_the_next_page_first(self):
+        # /tutorials/<topic>/<subtopic>/ serves pages directly inside a root.
+        response = self.client.get('/tutorials/root/0.%20Welcome.html/')
+        self.assertEqual(response.status_code, 200)
+        setup, extra = self.file('0.1 Setup.html')['url'], self.file('1. Basics/Extras/1.3 Extra.html')['url']
+        self.assertEqual(response['Link'], f"<{setup}>; rel=prefetch, <{setup}>; rel=next, <{extra}>; rel=prev")
+        self.assertContains(response, f'<link rel="prefetch" href="{setup}">', html=False)
+        # The cached copy and the 304 announce the same neighbours.
+        cached = self.client.get('/tutorials/root/0.%20Welcome.html/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['Link'], response['Link'])
+
+
+class ContentRootRegistryTests(ContentRootTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.registry = content_roots.ContentRootRegistry([
+            content_roots.ContentRoot('data_engineering', self.root),
+            content_roots.ContentRoot('courses', os.path.join(self.scratch, 'courses'), prefix='course'),
+            content_roots.ContentRoot('basics', os.path.join(self.root, '1. Basics'), warmup=False),
+        ], default='data_engineering')
+
+    def test_topic_lookup(self):
+        by_topic = lambda topic: self.registry.for_topic(topic).name
+        self.assertEqual(by_topic('courses'), 'courses')
+        self.assertEqual(by_topic('course'), 'courses')
+        self.assertEqual(by_topic('course_python_basics'), 'courses')
+        self.assertEqual(by_topic('basics'), 'basics')
+        # Without a prefix only the exact name matches.
+        self.assertEqual(by_topic('basics_two'), 'data_engineering')
+        self.assertEqual(by_topic('unknown'), 'data_engineering')
+        self.assertEqual(by_topic(''), 'data_engineering')
+
+    def test_path_lookup_picks_the_innermost_root(self):
+        self.assertEqual(self.registry.for_path(os.path.join(self.root, 'index.html')).name, 'data_engineering')
+        self.assertEqual(self.registry.for_path(os.path.join(self.root, '1. Basics', '1.1 Intro.html')).name, 'basics')
+        self.assertIsNone(self.registry.for_path(os.path.join(self.scratch, 'root2', 'a.html')))
+
+    def test_warmup_skips_opted_out_roots(self):
+        with mock.patch.object(content_roots.ContentRoot, 'warmup') as warmup:
+            self.registry.warmup(budget=0)
+        self.assertEqual(warmup.call_count, 2)
+
+    def test_warmup_primes_digests_within_its_budget(self):
+        root = self.registry.by_name['data_engineering']
+        with mock.patch.object(page_cache, 'file_digest') as digest:
+            self.assertEqual(root.warmup(), 2)
+            self.assertEqual(digest.call_count, 2)
+            digest.reset_mock()
+            with self.assertLogs(content_roots.logger, 'WARNING'):
+                self.assertEqual(root.warmup(deadline=time.perf_counter() - 1), 0)
+            digest.assert_not_called()
+        # The index is built even when the digests are out of time.
+        self.assertIn(self.root, content_index._indexes)
+
+
+class StartupWarmupTests(SimpleTestCase):
+
+    def ready(self, argv):
+        with mock.patch.object(sys, 'argv', argv), \
+                mock.patch.object(content_roots, 'get_registry') as get_registry:
+            apps.get_app_config('pages').ready()
+        return get_registry.return_value.warmup.called
+
+    @override_settings(TUTORIALS_WARMUP_ON_STARTUP=True)
+    def test_servers_warm_up(self):
+        self.assertTrue(self.ready(['manage.py', 'runserver']))
+        self.assertTrue(self.ready(['/venv/bin/gunicorn', 'DataEngineering.wsgi']))
+
+    @override_settings(TUTORIALS_WARMUP_ON_STARTUP=True)
+    def test_management_commands_skip_warmup(self):
+        self.assertFalse(self.ready(['manage.py', 'migrate']))
+        self.assertFalse(self.ready(['./manage.py', 'build_search_index']))
+
+    @override_settings(TUTORIALS_WARMUP_ON_STARTUP=False)
+    def test_warmup_can_be_turned_off(self):
+        self.assertFalse(self.ready(['manage.py', 'runserver']))
+
+
+class CachedUserTests(SimpleTestCase):
+
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        self.user = User(pk=7, username='reader')
+
+    def request(self):
+        request = RequestFactory().get('/')
+        request.session = {
+            SESSION_KEY: '7',
+            BACKEND_SESSION_KEY: 'DataEngineering.auth.CachedModelBackend',
+            HASH_SESSION_KEY: self.user.get_session_auth_hash(),
+        }
+        AuthenticationMiddleware(lambda request: None).process_request(request)
+        return request
+
+    def test_user_is_loaded_once_per_request_then_from_the_cache(self):
+        with mock.patch.object(ModelBackend, 'get_user', return_value=self.user) as load:
+            request = self.request()
+            load.assert_not_called()
+            # request.user is the per-request loader: loaded on first use, then memoized.
+            self.assertEqual(request.user.username, 'reader')
+            self.assertTrue(request.user.is_authenticated)
+            load.assert_called_once_with(7)
+            self.assertEqual(self.request().user.username, 'reader')
+            load.assert_called_once()
+            # Saving or deleting the user evicts it.
+            auth._user_changed(User, self.user)
+            self.assertEqual(self.request().user.username, 'reader')
+            self.assertEqual(load.call_count, 2)
+
+
+class AsyncUserDashboardTests(SimpleTestCase):
+
+    def get(self, user):
+        request = AsyncRequestFactory().get('/dashboard/')
+        request.user = user
+
+        async def auser():
+            return user
+        request.auser = auser
+        return asyncio.run(views.auser_dashboard(request))
+
+    def test_anonymous_readers_are_sent_to_login(self):
+        response = self.get(AnonymousUser())
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(settings.LOGIN_URL))
+
+    def test_renders_the_dashboard_for_a_user(self):
+        response = self.get(User(pk=7, username='reader'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'User Dashboard')
@@ -1,11 +1,24 @@
+from django.conf import settings
 from .views import book_view, tutorials_dashboard
 from django.urls import path
 from .views import python_book
 from .views import display_page
+from .views import search_view
+from .views import nav_view
+
+if settings.TUTORIALS_ASYNC_VIEWS:
+    # Under ASGI the content views read files in worker threads instead of blocking the event loop.
+    from .views import abook_view as book_view
+    from .views import adisplay_page as display_page
+    from .views import atutorials_dashboard as tutorials_dashboard
+    # views.auser_dashboard is the async user_dashboard; neither is routed yet
+    # (their 'dashboard/' route only exists in the sample urlpatterns in views.py).
 
 # URL patterns
 urlpatterns = [
     path('', tutorials_dashboard, name='tutorials_dashboard'),
+    path('search/', search_view, name='tutorials_search'),
+    path('nav/<str:root>/<path:node>.json', nav_view, name='tutorials_nav'),
     #path('tutorials/topic <str:topic>/<path:subtopic>/', book_view, name='book_detail'),
     path('<str:topic>/', book_view, name='tutorials'),
     # include path to just display page from directory Topics/course/<str:topic>/
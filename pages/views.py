@@ -1,94 +1,46 @@
 import os
+import asyncio
+from asgiref.sync import sync_to_async
 from django.urls import path
 from django.shortcuts import render, redirect
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
 from django.contrib.auth.decorators import login_required
 import logging
-import re
+import time
 
+from . import compression
+from . import content_index
+from . import content_roots
+from . import file_serving
+from . import manifest
+from . import metrics
+from . import page_cache
+from . import reading_index
+from . import search
 
-# Define the path to the HTML pages directory
-HTML_PAGES_DIR = os.path.join(settings.BASE_DIR, 'Topics', 'data_engineering')
-HTML_PYTHON_PAGES_DIR = os.path.join(settings.BASE_DIR, 'Topics', 'data_engineering')
-HTML_TOPICS_PAGES_DIR = os.path.join(settings.BASE_DIR, 'Topics') # Ensure it's an absolute path
-HTML_PAGES_AGENTICAI_DIR = os.path.join(settings.BASE_DIR, 'Topics', 'agenticai')
-HTML_PAGES_SYSTEM_PROGRAMMING_DIR = os.path.join(settings.BASE_DIR, 'Topics', 'system_programming')
-# add pathf for rust_programming
-HTML_PAGES_RUST_PROGRAMMING_DIR = os.path.join(settings.BASE_DIR, 'Topics', 'rust_programming')
-HTML_PAGES_THOUGHT_FOR_THE_DAY_DIR = os.path.join(settings.BASE_DIR, 'Topics', 'thought_for_the_day')
-HTML_PAGE_COURSE_DIR = os.path.join(settings.BASE_DIR, 'Topics', 'courses')
 
+logger = logging.getLogger(__name__)
 
-from collections import defaultdict
 
-def build_structure(file_list):
-    structure = defaultdict(lambda: defaultdict(list))
+# Define the path to the HTML pages directory
+HTML_PYTHON_PAGES_DIR = os.path.join(settings.BASE_DIR, 'Topics', 'data_engineering')
+HTML_TOPICS_PAGES_DIR = os.path.join(settings.BASE_DIR, 'Topics') # Ensure it's an absolute path
 
-    for filepath in file_list:
-        parts = filepath.split('/')
-        if len(parts) == 2:
-            topic, file = parts
-            structure[topic]['_files'].append(file)
-        elif len(parts) == 3:
-            topic, subfolder, file = parts
-            structure[topic][subfolder].append(file)
+# Every content root book_view can serve (settings.TUTORIALS_CONTENT_ROOTS);
+# scanned by `manage.py build_topics_manifest` and `build_search_index`.
+CONTENT_ROOT_DIRS = content_roots.get_registry().paths()
 
-    return dict(structure)
 
 def get_directory_structure(pages_dir):
-    """Scan the html_pages directory and return a dictionary of topics and subtopics in numeric order."""
-    structure = {}
-    # Check if pages_dir exists
-    logging.info(f"Checking directory: {pages_dir}")
-    if not os.path.exists(pages_dir):
-        logging.error(f"Directory {pages_dir} does not exist.")
-        return structure
-
-    def numeric_key(name):
-        """Extract numeric prefix for sorting (e.g., '1.10 Sets.html' -> (1, 10), '1.2 Variables.html' -> (1, 2))."""
-        match = re.match(r'^(\d+)\.(\d*)\.?', name)
-        if match:
-            major = int(match.group(1))  # First part (e.g., '1' in '1.10')
-            minor = int(match.group(2) or 0)  # Second part (e.g., '10' in '1.10', or 0 if no minor part)
-            return (major, minor)
-        return (float('inf'), 0)  # Non-numeric names go to the end
-
-    # Walk through all subdirectories and collect HTML files
-    for root, dirs, files in os.walk(pages_dir):
-        # Get the relative path from pages_dir to current root
-        rel_path = os.path.relpath(root, pages_dir)
-        if rel_path == ".":
-            topic = os.path.basename(pages_dir)
-        else:
-            topic = rel_path.split(os.sep)[0]
-        if topic not in structure:
-            structure[topic] = []
-        # Only add HTML files that are directly under this root
-        html_files = [f for f in files if f.endswith('.html')]
-        html_files.sort(key=numeric_key)
-        # Store files with their relative path from the topic folder
-        for f in html_files:
-            # Get the path relative to the topic folder
-            file_rel_path = os.path.relpath(os.path.join(root, f), os.path.join(pages_dir, topic))
-            structure[topic].append(file_rel_path)
-    # Sort topics
-    structure = dict(sorted(structure.items(), key=lambda x: numeric_key(x[0])))
-    # Sort subtopics for each topic
-    for topic in structure:
-        structure[topic].sort(key=numeric_key)
-
-    logging.info(f"Directory structure: {structure}")
-
-    final_list = []
-    for topic, subtopics in structure.items():
-        # Create a list of tuples (topic, subtopic)
-        for subtopic in subtopics:
-            final_list.append(os.path.join(topic, subtopic))
-
-    final_list = build_structure(final_list)
-    
-    return final_list
+    """Return the topics and subtopics of pages_dir, served from the in-process TOC index.
+
+    The tree is only rescanned when a directory under pages_dir changes.
+    """
+    return content_index.get_index(pages_dir)
 
 def python_book(request):
     """Render the Python book page with sidebar and content."""
@@ -102,7 +54,7 @@ def python_book(request):
     content = ""
     if topic and subtopic:
         file_path = os.path.join(HTML_PYTHON_PAGES_DIR, topic, subtopic)
-        print(f"File path: {file_path}")
+        logger.debug("File path: %s", file_path)
         if os.path.exists(file_path):
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
@@ -117,82 +69,260 @@ def python_book(request):
     }
     return render(request, 'book/book.html', context)
 
-def display_page(request, topic):
-    """Display a specific HTML page based on the topic."""
-    file_path = os.path.join(HTML_TOPICS_PAGES_DIR, topic)
-    print(f"File path: {file_path}")
-    if os.path.exists(file_path):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return HttpResponse(content)
-    else:
+def display_page(request, file_path, topic=None):
+    """Stream a specific HTML page from the Topics directory."""
+    page = locate_page(request, file_path)
+    if page is None:
         return HttpResponse("<p>File not found.</p>", status=404)
+    served_path, etag, mtime, size, encoding, links = page
+    response = file_serving.serve_file(request, served_path, etag, mtime, 'text/html; charset=utf-8', size=size)
+    return _finish_page_response(response, encoding, links)
+
+async def adisplay_page(request, file_path, topic=None):
+    """Async display_page: the lookups run in a worker thread and the body is read chunk by chunk."""
+    page = await asyncio.to_thread(locate_page, request, file_path)
+    if page is None:
+        return HttpResponse("<p>File not found.</p>", status=404)
+    served_path, etag, mtime, size, encoding, links = page
+    response = file_serving.serve_file(
+        request, served_path, etag, mtime, 'text/html; charset=utf-8', size=size, asynchronous=True,
+    )
+    return _finish_page_response(response, encoding, links)
+
+def locate_page(request, file_path):
+    """Return (served_path, etag, mtime, size, encoding, links) of a Topics page, or None if it is missing."""
+    file_path = file_serving.safe_path(HTML_TOPICS_PAGES_DIR, file_path)
+    logger.debug("File path: %s", file_path)
+    digest = page_cache.file_digest(file_path) if os.path.isfile(file_path) else None
+    if digest is None:
+        return None
+
+    sha1, mtime, size = digest
+    # Serve the .br/.gz sibling written by `manage.py compress_topics` when the client accepts it.
+    encoding, served_path = compression.precompressed_variant(request, file_path)
+    if encoding:
+        size = os.path.getsize(served_path)
+    root = content_roots.get_registry().for_path(file_path)
+    links = reading_links(root.path, file_path) if root else {'prev': None, 'next': None}
+    return served_path, page_cache.make_etag(sha1, mtime, encoding), mtime, size, encoding, links
+
+def _finish_page_response(response, encoding, links):
+    if encoding and response.status_code != 304:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ['Accept-Encoding'])
+    add_link_header(response, links)
+    return response
+
+def reading_links(pages_dir, file_path):
+    """Return {'prev': page, 'next': page} around file_path in the reading order of pages_dir.
+
+    Without a file_path the next page is the first page of the root. The
+    next page is warmed in the background, since it is the likely next click.
+    """
+    order = reading_index.get_order(pages_dir)
+    if file_path:
+        previous_page, next_page = order.neighbours(os.path.realpath(file_path))
+    else:
+        previous_page, next_page = None, order.pages[0] if order.pages else None
+    if next_page:
+        reading_index.warm(next_page)
+    return {'prev': _page_link(previous_page), 'next': _page_link(next_page)}
+
+def _page_link(file_path):
+    if file_path is None:
+        return None
+    rel = os.path.relpath(file_path, os.path.realpath(HTML_TOPICS_PAGES_DIR))
+    if rel.startswith(os.pardir):
+        # display_page only serves files below the Topics directory.
+        return None
+    return {
+        'title': os.path.splitext(os.path.basename(file_path))[0],
+        'url': reverse('tutorials', kwargs={'file_path': rel.replace(os.sep, '/')}),
+    }
+
+def add_link_header(response, links):
+    """Announce the neighbouring pages; browsers prefetch the next one while the reader reads."""
+    values = []
+    if links['next']:
+        values += [f"<{links['next']['url']}>; rel=prefetch", f"<{links['next']['url']}>; rel=next"]
+    if links['prev']:
+        values.append(f"<{links['prev']['url']}>; rel=prev")
+    if values:
+        response['Link'] = ', '.join(values)
+    return response
 
 def book_view(request, topic=None, subtopic=None):
-    print(f"****** Requested topic: {topic} and subtopic: {subtopic}")
     """Render the book page with sidebar and content."""
-    if topic == "agenticai":
-        structure = get_directory_structure(HTML_PAGES_AGENTICAI_DIR)
-    elif topic == "data_engineering":
-        structure = get_directory_structure(HTML_PYTHON_PAGES_DIR)
-    elif topic == "system_programming":
-        structure = get_directory_structure(HTML_PAGES_SYSTEM_PROGRAMMING_DIR)
-    elif topic == "thought_for_the_day":
-        # For "thought_for_the_day", we can return a static page or handle it differently
-        structure = get_directory_structure(HTML_PAGES_THOUGHT_FOR_THE_DAY_DIR)
-    elif topic == "rust_programming":
-        structure = get_directory_structure(HTML_PAGES_RUST_PROGRAMMING_DIR)
-    elif topic.startswith("course"):
-        # For "course", we can return a static page or handle it differently
-        structure = get_directory_structure(HTML_PAGE_COURSE_DIR)
-    else:
-        structure = get_directory_structure(HTML_PAGES_DIR)
-    
-    # # If no topic is selected, use the first topic and its first subtopic
-    # if not subtopic and structure:
-    #     topic = structure.keys())[0]
-    #     subtopic = structure[topic][0] if structure[topic] else None
+    root, version, file_path, key_parts, last_modified, links = book_page_state(request, topic, subtopic)
+    response = page_cache.cached_page(
+        request, key_parts, page_cache.make_etag(*key_parts), last_modified,
+        lambda: render_book_page(request, root, version, topic, file_path, links),
+    )
+    return add_link_header(response, links)
 
-    
+async def abook_view(request, topic=None, subtopic=None):
+    """Async book_view: directory checks and rendering run in worker threads, the cache is read with aget."""
+    root, version, file_path, key_parts, last_modified, links = await asyncio.to_thread(
+        book_page_state, request, topic, subtopic)
+    response = await page_cache.acached_page(
+        request, key_parts, page_cache.make_etag(*key_parts), last_modified,
+        lambda: sync_to_async(render_book_page)(request, root, version, topic, file_path, links),
+    )
+    return add_link_header(response, links)
+
+def book_page_state(request, topic, subtopic):
+    """Return (root, version, file_path, cache key parts, last_modified, links) of a book page."""
+    logger.debug("Requested topic: %s and subtopic: %s", topic, subtopic)
+    root = content_roots.get_registry().for_topic(topic)
+    pages_dir = root.path
+    file_path = file_serving.safe_path(HTML_TOPICS_PAGES_DIR, os.path.join(topic, subtopic)) if topic and subtopic else None
+
+    # The page only changes when the content root or the selected file does.
+    version, last_modified = content_index.get_version(pages_dir)
+    digest = page_cache.file_digest(file_path) if file_path else None
+    if digest:
+        last_modified = max(last_modified, digest[1])
+    key_parts = (pages_dir, topic, subtopic, version, request.path, digest and digest[0])
+    # Derived from the same version, so they are cached along with the page.
+    links = reading_links(pages_dir, file_path if digest else None)
+    return root, version, file_path, key_parts, last_modified, links
+
+def render_book_page(request, root, version, topic, file_path, links):
+    """Render book/book.html for the given content root and selected file."""
     # Read the content of the selected HTML file
     content = ""
-    if topic and subtopic:
-        file_path = os.path.join(HTML_TOPICS_PAGES_DIR, topic, subtopic)
-        print(f"File path: {file_path}")
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
+    if file_path:
+        logger.debug("File path: %s", file_path)
+        body = manifest.file_body(file_path)
+        if body is not None:
+            # Decoded straight from the snapshot shared by every worker.
+            content = str(body, 'utf-8')
+        elif os.path.isfile(file_path):
+            with metrics.phase('file_read'), open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
         else:
             content = "<p>File not found.</p>"
 
-    # Example structure transformation in your Django view
-    clean_structure = {}
-
-    for topic, items in structure.items():
-        clean_items = {}
-        for key, value in items.items():
-            if key == "_files":
-                clean_items["root_files"] = value  # Rename _files -> root_files
-            else:
-                clean_items[key] = value
-        clean_structure[topic] = clean_items
+    # The sidebar only lists the topics; their pages are fetched from
+    # nav_view when a reader expands one. It is rendered once per root version.
+    sidebar = page_cache.cached_fragment(
+        ('sidebar', root.path, version),
+        lambda: render_to_string('book/sidebar.html', {
+            'topics': [(topic, nav_url(root.name, topic)) for topic in get_directory_structure(root.path)],
+        }),
+    )
 
     context = {
-        'structure': clean_structure,
+        'sidebar': sidebar,
         'selected_topic': topic,
         'content': content,
+        'previous_page': links['prev'],
+        'next_page': links['next'],
     }
-    return render(request, 'book/book.html', context)
+    with metrics.phase('template_render'):
+        return render(request, 'book/book.html', context)
+
+def search_view(request):
+    """Answer /tutorials/search/?q= from the in-memory full-text index."""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+
+    started = time.perf_counter()
+    results = []
+    if query:
+        index = search.get_index(CONTENT_ROOT_DIRS)
+        if index is None:
+            response = JsonResponse(
+                {'query': query, 'results': [], 'error': "The search index is being built."}, status=503)
+            response['Retry-After'] = '30'
+            return response
+        for score, doc in index.search(query, limit=limit):
+            file_path = os.path.relpath(os.path.join(settings.BASE_DIR, doc['path']), HTML_TOPICS_PAGES_DIR)
+            results.append({
+                'title': doc['title'],
+                'path': doc['path'],
+                'url': reverse('tutorials', kwargs={'file_path': file_path.replace(os.sep, '/')}),
+                'score': round(score, 4),
+            })
+
+    return JsonResponse({
+        'query': query,
+        'results': results,
+        'took_ms': round((time.perf_counter() - started) * 1000, 2),
+    })
+
+
+def nav_url(root_name, *parts):
+    """URL of the nav_view JSON for one node (a topic, or a topic's subfolder) of a root."""
+    return reverse('tutorials_nav', kwargs={'root': root_name, 'node': '/'.join(parts)})
+
+
+def nav_view(request, root, node):
+    """Return one level of a content root's table of contents as JSON.
+
+    `nav/<root>/<topic>.json` lists the topic's pages and subfolders, and
+    `nav/<root>/<topic>/<subfolder>.json` lists the pages of that subfolder.
+    The URLs carry no query string, so the static export can write each
+    node as a plain file.
+    """
+    root = content_roots.get_registry().by_name.get(root)
+    parts = [part for part in node.split('/') if part]
+    if root is None or not 1 <= len(parts) <= 2:
+        raise Http404("Expected nav/<root>/<topic>.json or nav/<root>/<topic>/<subfolder>.json")
+
+    version, last_modified = content_index.get_version(root.path)
+    etag = page_cache.make_etag('nav', root.path, version, *parts)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    items = get_directory_structure(root.path).get(parts[0])
+    if items is None or (len(parts) == 2 and parts[1] not in items):
+        raise Http404("Unknown topic")
+    topic_dir = content_index.topic_dir(root.path, parts[0])
+    if len(parts) == 1:
+        dirs = [name for name in items if name != '_files']
+        files, file_dir = items.get('_files', []), topic_dir
+    else:
+        dirs = []
+        files, file_dir = items[parts[1]], os.path.join(topic_dir, parts[1])
+
+    nav_files = []
+    for name in files:
+        rel = os.path.relpath(os.path.join(file_dir, name), HTML_TOPICS_PAGES_DIR).replace(os.sep, '/')
+        nav_files.append({'title': name, 'url': reverse('tutorials', kwargs={'file_path': rel})})
+    nav_dirs = [{'title': name, 'url': nav_url(root.name, parts[0], name)} for name in dirs]
+    response = JsonResponse({'path': '/'.join(parts), 'dirs': nav_dirs, 'files': nav_files})
+    response['ETag'] = etag
+    return response
+
+
+def metrics_view(request):
+    """Expose request and phase timings in the Prometheus text format."""
+    if not metrics.ENABLED:
+        return HttpResponse("Metrics are disabled.", status=404, content_type='text/plain')
+    return HttpResponse(metrics.render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 # Return Tutorials page /template/dashboards/tutorials_dashboard.html
 def tutorials_dashboard(request):
     return render(request, 'dashboards/tutorials_dashboard.html')
 
+async def atutorials_dashboard(request):
+    return await sync_to_async(render)(request, 'dashboards/tutorials_dashboard.html')
+
 @login_required
 def user_dashboard(request):
     return render(request, 'dashboards/user_dashboard.html')
 
+@login_required
+async def auser_dashboard(request):
+    # login_required awaits request.auser(), so the session and user load off the event loop.
+    return await sync_to_async(render)(request, 'dashboards/user_dashboard.html')
+
 # settings.py configuration (add to your settings.py)
 """
 INSTALLED_APPS = [
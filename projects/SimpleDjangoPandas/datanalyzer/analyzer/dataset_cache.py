@@ -0,0 +1,176 @@
+"""An on-disk cache of uploaded CSVs, converted to Arrow and keyed by content.
+
+The same datasets (titanic, tips, flights, ...) are uploaded over and over.
+The first upload of some content is converted once to an Arrow IPC file
+named by its SHA-256; every later upload of the same bytes memory-maps that
+file and reads only the columns the analysis needs, without parsing CSV.
+The cache is an LRU bounded in bytes: a hit refreshes the file's mtime and
+the oldest files are removed once the total goes over the limit. Files a
+queued plot job still has to read are pinned and never removed.
+"""
+import os
+import time
+import logging
+import tempfile
+
+from django.conf import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv
+    import pyarrow.ipc
+except ImportError:  # pyarrow is optional; without it every upload is parsed as CSV.
+    pa = None
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = getattr(settings, 'ANALYZER_DATASET_CACHE_DIR', os.path.join(settings.BASE_DIR, 'dataset_cache'))
+MAX_BYTES = getattr(settings, 'ANALYZER_DATASET_CACHE_BYTES', 1024 ** 3)
+SUFFIX = '.arrow'
+PIN_SUFFIX = '.pin'
+# A pin older than this belongs to a plot job that died.
+PIN_TIMEOUT = 600
+
+
+def enabled():
+    return pa is not None and MAX_BYTES > 0
+
+
+def path_for(digest):
+    return os.path.join(CACHE_DIR, digest + SUFFIX)
+
+
+def get(digest):
+    """Return the cached Arrow file for digest, or None."""
+    path = path_for(digest)
+    try:
+        # The mtime is the LRU clock.
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def add(digest, csv_file):
+    """Convert csv_file to Arrow under digest and return its path, or None if it cannot be.
+
+    The CSV is converted one block at a time, so memory does not depend on
+    its size.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = path_for(digest)
+    # Unique per call: threads of one process may convert the same upload at once.
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, prefix=digest, suffix='.tmp')
+    os.close(fd)
+    source = csv_file.temporary_file_path() if hasattr(csv_file, 'temporary_file_path') else csv_file.file
+    try:
+        reader = pa.csv.open_csv(source)
+        with pa.ipc.new_file(tmp_path, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+        os.replace(tmp_path, path)
+    except (pa.ArrowInvalid, OSError) as exc:
+        # e.g. a column whose type changes after the first block.
+        logger.warning("Could not convert %s to Arrow: %s", csv_file.name, exc)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    finally:
+        csv_file.seek(0)
+    evict(keep=path)
+    return path
+
+
+def get_or_add(digest, csv_file):
+    path = get(digest)
+    if path:
+        logger.info("Dataset cache hit for %s (%s)", csv_file.name, digest[:12])
+        return path
+    logger.info("Dataset cache miss for %s (%s)", csv_file.name, digest[:12])
+    return add(digest, csv_file)
+
+
+def pin(path):
+    """Keep path from being evicted until unpin(); return the pin, or None if path is gone.
+
+    A pin is a file next to the dataset, so it holds across processes.
+    """
+    fd, pin_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.',
+                                    suffix=PIN_SUFFIX)
+    os.close(fd)
+    if not os.path.exists(path):
+        unpin(pin_path)
+        return None
+    return pin_path
+
+
+def unpin(pin_path):
+    try:
+        os.remove(pin_path)
+    except FileNotFoundError:
+        pass
+
+
+def evict(keep=None):
+    """Remove the least recently used unpinned files until the cache fits in MAX_BYTES."""
+    entries = []
+    pinned = set()
+    now = time.time()
+    for entry in os.scandir(CACHE_DIR):
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        if entry.name.endswith(SUFFIX):
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        elif entry.name.endswith(PIN_SUFFIX):
+            if now - stat.st_mtime > PIN_TIMEOUT:
+                unpin(entry.path)
+            else:
+                # <digest>.arrow.<random>.pin pins <digest>.arrow.
+                pinned.add(entry.path[:entry.path.index(SUFFIX + '.')] + SUFFIX)
+    total = sum(size for mtime, size, path in entries)
+    for mtime, size, path in sorted(entries):
+        if total <= MAX_BYTES:
+            break
+        if path == keep or path in pinned:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def _columns(schema, wanted):
+    """The numeric columns (for describe()) plus the wanted ones that exist, in file order.
+
+    With wanted=None, or no numeric column at all, every column is read.
+    """
+    numeric = [field.name for field in schema
+               if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)]
+    if wanted is None or not numeric:
+        return schema.names
+    return [name for name in schema.names if name in numeric or name in wanted]
+
+
+def read_frame(path, wanted=None):
+    """Load the needed columns of a cached dataset as a DataFrame."""
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+        return table.select(_columns(table.schema, wanted)).to_pandas()
+
+
+def iter_frames(path, wanted=None):
+    """Yield the needed columns of a cached dataset one record batch at a time."""
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        columns = _columns(reader.schema, wanted)
+        offset = 0
+        for i in range(reader.num_record_batches):
+            frame = reader.get_batch(i).select(columns).to_pandas()
+            # Number the rows through the file, as read_csv(chunksize=...) does.
+            frame.index += offset
+            offset += len(frame)
+            yield frame
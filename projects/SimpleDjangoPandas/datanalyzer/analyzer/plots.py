@@ -0,0 +1,264 @@
+"""Render the analyzer's plots in a pool of worker processes.
+
+A plot is named by the hash of what it is drawn from: the SHA-256 of the
+uploaded data, the category and the plot options. analyze_category only
+submits the plot and returns; the page then polls plot_status until the
+PNG exists under static/analysis/. A plot that was already rendered is
+served as is, and identical requests share one render: within a process
+through the table of running futures, across processes through a lock file
+next to the artifact. Workers read the data from the upload's Arrow file in
+the dataset cache rather than receiving the DataFrame.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+PLOT_DIR = getattr(settings, 'ANALYZER_PLOT_DIR', os.path.join(settings.BASE_DIR, 'static', 'analysis'))
+PLOT_URL = getattr(settings, 'ANALYZER_PLOT_URL', settings.STATIC_URL + 'analysis/')
+WORKERS = getattr(settings, 'ANALYZER_PLOT_WORKERS', 2)
+# Renders queued or running in this process before new ones are turned away.
+MAX_PENDING = getattr(settings, 'ANALYZER_PLOT_MAX_PENDING', 32)
+# A lock file older than this belongs to a render that died.
+LOCK_TIMEOUT = 300
+
+# Bump when draw() changes, so earlier artifacts are not served any more.
+PLOT_VERSION = 1
+FIGSIZE = (8, 5)
+STYLES = {"Tips": "Solarize_Light2"}
+
+DONE, PENDING, BUSY, FAILED = 'done', 'pending', 'busy', 'failed'
+
+_lock = threading.Lock()
+_futures = {}
+_pool = None
+
+
+def plot_key(dataset_digest, category, options):
+    payload = json.dumps([PLOT_VERSION, dataset_digest, category, options], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def artifact_path(key):
+    return os.path.join(PLOT_DIR, key + '.png')
+
+
+def artifact_url(key):
+    return PLOT_URL + key + '.png'
+
+
+def _get_pool(broken=False):
+    global _pool
+    if _pool is None or broken:
+        # spawn, not fork: the workers must not inherit the server's threads.
+        _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def _take_lock(key):
+    """Claim the render of key across processes; False if another process has it."""
+    lock_path = artifact_path(key) + '.lock'
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        try:
+            if time.time() - os.stat(lock_path).st_mtime < LOCK_TIMEOUT:
+                return False
+            os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+        return _take_lock(key)
+
+
+def _release_lock(key):
+    try:
+        os.remove(artifact_path(key) + '.lock')
+    except FileNotFoundError:
+        pass
+
+
+def submit(key, category, dataset_path=None, columns=None, sample_rows=None, df=None):
+    """Start rendering the plot of category under key, unless it exists or is under way.
+
+    The worker loads the data itself from dataset_path, the upload's Arrow
+    file in the dataset cache, so only the path crosses to the worker
+    process. The file is pinned in the cache until the render finishes.
+    Without one (no pyarrow, or a CSV Arrow could not convert), or when the
+    file was evicted before it could be pinned, the DataFrame df is sent
+    instead.
+
+    Returns DONE, PENDING, or BUSY when too many renders are queued already.
+    """
+    if os.path.exists(artifact_path(key)):
+        return DONE
+    with _lock:
+        if key in _futures:
+            return PENDING
+        if len(_futures) >= MAX_PENDING:
+            logger.warning("Plot queue full (%d pending), not rendering %s", len(_futures), key)
+            return BUSY
+        os.makedirs(PLOT_DIR, exist_ok=True)
+        if not _take_lock(key):
+            return PENDING
+        if os.path.exists(artifact_path(key)):
+            # Rendered (and unlocked) since the check above.
+            _release_lock(key)
+            return DONE
+        pin = None
+        if dataset_path is not None:
+            from . import dataset_cache
+            pin = dataset_cache.pin(dataset_path)
+            if pin is None and df is not None:
+                dataset_path = None
+            else:
+                df = None
+        args = (category, artifact_path(key), dataset_path, columns, sample_rows, df)
+        try:
+            future = _get_pool().submit(render, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a new pool.
+            logger.warning("Plot worker pool broken, restarting it")
+            future = _get_pool(broken=True).submit(render, *args)
+        _futures[key] = future
+
+    def finished(future):
+        with _lock:
+            _futures.pop(key, None)
+        _release_lock(key)
+        if pin is not None:
+            from . import dataset_cache
+            dataset_cache.unpin(pin)
+        if future.exception() is not None:
+            logger.error("Rendering plot %s failed: %s", key, future.exception())
+
+    future.add_done_callback(finished)
+    return PENDING
+
+
+def status(key, wait=0):
+    """Return the state of the plot key, waiting up to wait seconds for it to finish."""
+    if os.path.exists(artifact_path(key)):
+        return DONE
+    with _lock:
+        future = _futures.get(key)
+    if future is not None:
+        try:
+            future.exception(timeout=wait)
+        except TimeoutError:
+            return PENDING
+        return DONE if os.path.exists(artifact_path(key)) else FAILED
+    if os.path.exists(artifact_path(key) + '.lock'):
+        # Rendered by another process; the client polls again.
+        return PENDING
+    return FAILED
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')  # Use non-GUI backend for matplotlib
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def load_dataset(dataset_path, columns=None, sample_rows=None):
+    """Read the columns to plot from a cached Arrow file, sampling sample_rows rows if set."""
+    from . import dataset_cache
+    if sample_rows is None:
+        return dataset_cache.read_frame(dataset_path, columns)
+    from .streaming import RowSample
+    sample = RowSample(sample_rows)
+    for frame in dataset_cache.iter_frames(dataset_path, columns):
+        sample.update(frame)
+    return sample.frame()
+
+
+def render(category, output, dataset_path=None, columns=None, sample_rows=None, df=None):
+    """Draw the plot of category into output. Runs in a worker process."""
+    if df is None:
+        df = load_dataset(dataset_path, columns, sample_rows)
+    plt = _pyplot()
+    tmp_path = f"{output}.{os.getpid()}.tmp.png"
+    with plt.style.context(STYLES.get(category, [])):
+        plt.figure(figsize=FIGSIZE)
+        try:
+            draw(plt, df, category)
+        except KeyError as e:
+            logger.warning("KeyError: %s - Check if the selected category has the required columns.", e)
+            plt.text(0.5, 0.5, f"Error: {e}", horizontalalignment='center', verticalalignment='center', fontsize=12)
+            plt.axis('off')  # Hide axes for error message
+        plt.tight_layout()
+        plt.savefig(tmp_path)
+        plt.close('all')
+    os.replace(tmp_path, output)
+    return output
+
+
+def draw(plt, df, selected):
+    # Basic plot logic (can be improved per category)
+    # What does the user want to analyze?
+    if selected == "Sales":
+        df['Sales'].plot(kind='bar', title='Sales Data')
+    elif selected == "Students":
+        df['Scores'].plot(kind='line', title='Student Scores')
+    elif selected == "Titanic":
+        df['survived'].value_counts().plot(kind='pie', autopct='%1.1f%%', title='Titanic Survival')
+        plt.ylabel('')  # Hide the y-label for pie chart
+        plt.title('Titanic Survival Distribution')
+        plt.legend(title='Survived', loc='upper right')
+        plt.tight_layout()  # Adjust layout to prevent clipping
+        plt.axis('equal')  # Equal aspect ratio ensures that pie chart is circular
+
+    elif selected == "Flights":
+        df['passengers'].plot(kind='line', title='Flight Passengers Over Time')
+        plt.xticks(rotation=45)
+        plt.tight_layout()
+        plt.ylabel('Number of Passengers')
+        plt.xlabel('Flight Date')
+    elif selected == "Iris":
+        df.plot.scatter(x='sepal_length', y='sepal_width', title='Iris Sepal Dimensions')
+    elif selected == "Tips":
+        # Clean the table
+        df = df.dropna()
+
+        # Create data frame with analysis
+        fig, graphs = plt.subplots(2,2, figsize=(20,20)) # graphs[0,0]
+        graphs[0,0].scatter(df['total_bill'], df['tip'])
+        graphs[0,0].set_xlabel("Total Bill")
+        graphs[0,0].set_ylabel("Tip")
+        graphs[0,0].set_title("TotalBill vs Tip")
+
+        df_genderwise = df.groupby('sex')['tip'].mean().reset_index()
+        graphs[0,1].bar(df_genderwise['sex'],df_genderwise['tip'])
+        graphs[0,1].set_xlabel("Gender")
+        graphs[0,1].set_ylabel("Tip")
+        graphs[0,1].set_title("x vs Cube")
+
+        df_smoker = df.groupby('smoker')['tip'].mean().reset_index()
+        logger.debug("Tip by smoker:\n%s", df_smoker)
+        graphs[1,0].bar(df_smoker['smoker'],df_smoker['tip'])
+        graphs[1,0].set_xlabel("smoker")
+        graphs[1,0].set_ylabel("Tip")
+        graphs[1,0].set_title("Smoker vs Tip")
+
+    elif selected == "Diamonds":
+        df['price'].plot(kind='hist', bins=30, title='Diamond Price Distribution')
+    elif selected == "Planets":
+        df['mass'].plot(kind='scatter', y='orbital_period', title='Planet Mass vs Orbital Period')
+    elif selected == "Insurance":
+        df['charges'].plot(kind='box', title='Insurance Charges Distribution')
+    elif selected == "Weather":
+        df['temperature'].plot(kind='line', title='Weather Temperature Over Time')
+    else:
+        # Default case for any other category
+        df.plot(kind='line', title='Data Analysis')
@@ -0,0 +1,195 @@
+"""Describe a CSV upload one chunk at a time.
+
+pd.read_csv(upload).describe() needs the whole file in memory. describe_csv
+reads it in chunks of rows instead and keeps, per column, the running count,
+mean, sum of squared deviations, min and max (exact, merged chunk by chunk)
+and a QuantileSketch for the percentiles, so memory depends on the chunk size
+and not on the file size.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+
+PERCENTILES = (0.25, 0.5, 0.75)
+# Quantile sketch size: about 3 * SKETCH_K floats per column, rank error around 0.1%.
+SKETCH_K = 1000
+
+
+class QuantileSketch:
+    """A mergeable quantile sketch (KLL-style compactors).
+
+    Values are kept in levels; an item at level i stands for 2**i values.
+    When a level outgrows its capacity it is sorted and every other item
+    (starting at a random offset) moves up a level. The sketch holds at
+    most about 3 * k items whatever the number of values. Until the first
+    compaction the quantiles are exact.
+    """
+
+    def __init__(self, k=SKETCH_K, seed=None):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self._compress()
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # With an odd number of items, one stays behind unweighted.
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                paired = items[:len(items) - len(keep)]
+                promoted = paired[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def quantiles(self, qs):
+        if not self.count:
+            return [float('nan')] * len(qs)
+        if all(len(items) == 0 for items in self.levels[1:]):
+            return list(np.quantile(self.levels[0], qs))
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values)
+        values, weights = values[order], weights[order]
+        # Each item sits at the middle of the ranks it stands for.
+        ranks = np.cumsum(weights) - weights / 2
+        return list(np.interp(np.asarray(qs) * weights.sum(), ranks, values))
+
+
+class ColumnStats:
+    """Exact count, mean, std, min and max of a numeric column, plus a quantile sketch."""
+
+    def __init__(self, sketch_k=SKETCH_K):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = QuantileSketch(sketch_k)
+
+    def update(self, values):
+        n = len(values)
+        if not n:
+            return
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        # Chan et al.: combine the running moments with those of the chunk.
+        total = self.count + n
+        delta = mean - self.mean
+        self.m2 += m2 + delta ** 2 * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.sketch.update(values)
+
+    def describe(self, percentiles=PERCENTILES):
+        nan = float('nan')
+        if not self.count:
+            return [0.0, nan, nan, nan] + [nan] * len(percentiles) + [nan]
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else nan
+        return ([float(self.count), self.mean, std, self.min]
+                + self.sketch.quantiles(percentiles) + [self.max])
+
+
+class StreamingDescribe:
+    """DataFrame.describe() over a sequence of chunks of the same table.
+
+    Like describe(), only numeric columns are summarised; a column that is
+    not numeric in some chunk is dropped. If no column is numeric, only the
+    non-null counts are reported.
+    """
+
+    def __init__(self, percentiles=PERCENTILES, sketch_k=SKETCH_K):
+        self.percentiles = percentiles
+        self.sketch_k = sketch_k
+        self.columns = {}
+        self.counts = {}
+
+    def update(self, chunk):
+        for name in chunk.columns:
+            series = chunk[name]
+            if name not in self.columns:
+                self.columns[name] = ColumnStats(self.sketch_k)
+                self.counts[name] = 0
+            self.counts[name] += int(series.count())
+            stats = self.columns[name]
+            if stats is None:
+                continue
+            if is_bool_dtype(series) or not is_numeric_dtype(series):
+                # An all-empty chunk of a numeric column still reads as float.
+                self.columns[name] = None
+                continue
+            stats.update(series.dropna().to_numpy(dtype=float))
+
+    def describe(self):
+        numeric = {name: stats for name, stats in self.columns.items() if stats is not None}
+        if not numeric:
+            return pd.DataFrame({name: [float(count)] for name, count in self.counts.items()}, index=['count'])
+        index = ['count', 'mean', 'std', 'min'] + [f"{q * 100:g}%" for q in self.percentiles] + ['max']
+        return pd.DataFrame({name: stats.describe(self.percentiles) for name, stats in numeric.items()}, index=index)
+
+
+class RowSample:
+    """A uniform random sample of at most size rows, kept in file order (bottom-k sampling)."""
+
+    def __init__(self, size, seed=None):
+        self.size = size
+        self.rows = None
+        self.keys = np.empty(0)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk):
+        rows = chunk if self.rows is None else pd.concat([self.rows, chunk])
+        keys = np.concatenate([self.keys, self._rng.random(len(chunk))])
+        if len(rows) > self.size:
+            keep = np.argpartition(keys, self.size)[:self.size]
+            rows, keys = rows.iloc[keep], keys[keep]
+        self.rows, self.keys = rows, keys
+
+    def frame(self):
+        return self.rows.sort_index() if self.rows is not None else pd.DataFrame()
+
+
+def describe_frames(frames, sample_rows=10_000, sketch_k=SKETCH_K):
+    """Return (describe() of the concatenated frames, a sample of their rows).
+
+    The sample is what the plots are drawn from, so they stay bounded too.
+    """
+    summary = StreamingDescribe(sketch_k=sketch_k)
+    sample = RowSample(sample_rows)
+    for frame in frames:
+        summary.update(frame)
+        sample.update(frame)
+    return summary.describe(), sample.frame()
+
+
+def describe_csv(csv_file, chunk_rows=100_000, sample_rows=10_000, sketch_k=SKETCH_K):
+    """describe_frames() over csv_file, read chunk_rows rows at a time."""
+    return describe_frames(pd.read_csv(csv_file, chunksize=chunk_rows), sample_rows, sketch_k)
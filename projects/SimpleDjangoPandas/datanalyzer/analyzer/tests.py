@@ -1,3 +1,309 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import threading
+from concurrent.futures import Future
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from . import dataset_cache
+from . import plots
+from . import views
+from .streaming import QuantileSketch, RowSample, describe_csv
+
+
+class StreamingDescribeTests(SimpleTestCase):
+
+    def frame(self, rows=50_000):
+        rng = np.random.default_rng(7)
+        return pd.DataFrame({
+            'normal': rng.normal(100, 15, rows),
+            'skewed': rng.exponential(3, rows),
+            'ints': rng.integers(0, 1000, rows),
+            'gaps': np.where(rng.random(rows) < 0.3, np.nan, rng.normal(0, 1, rows)),
+            'label': rng.choice(['a', 'b', 'c'], rows),
+        })
+
+    def csv(self, df):
+        return io.StringIO(df.to_csv(index=False))
+
+    def test_matches_pandas_describe(self):
+        df = self.frame()
+        summary, sample = describe_csv(self.csv(df), chunk_rows=7_000, sample_rows=500)
+        expected = df.describe()
+        self.assertEqual(list(summary.columns), list(expected.columns))
+        self.assertEqual(list(summary.index), list(expected.index))
+        # count, mean, std, min and max are exact.
+        exact = ['count', 'mean', 'std', 'min', 'max']
+        pd.testing.assert_frame_equal(summary.loc[exact], expected.loc[exact], rtol=1e-9)
+        # The percentiles come from the sketch: within 1% of the value range.
+        spread = expected.loc['max'] - expected.loc['min']
+        for row in ('25%', '50%', '75%'):
+            error = (summary.loc[row] - expected.loc[row]).abs() / spread
+            self.assertTrue((error < 0.01).all(), f"{row}: {error.to_dict()}")
+        self.assertEqual(len(sample), 500)
+
+    def test_small_input_is_exact(self):
+        # Fewer values than the sketch holds, so the percentiles are exact too.
+        df = self.frame(rows=800)
+        summary, sample = describe_csv(self.csv(df), chunk_rows=10_000)
+        pd.testing.assert_frame_equal(summary, df.describe(), rtol=1e-9)
+        pd.testing.assert_frame_equal(sample.reset_index(drop=True), df, rtol=1e-9)
+
+    def test_only_counts_without_numeric_columns(self):
+        df = pd.DataFrame({'name': ['x', 'y', None], 'city': ['p', 'q', 'r']})
+        summary, sample = describe_csv(self.csv(df), chunk_rows=2)
+        self.assertEqual(summary.to_dict(), {'name': {'count': 2.0}, 'city': {'count': 3.0}})
+
+    def test_sketch_merge_matches_one_sketch(self):
+        values = np.random.default_rng(1).normal(size=100_000)
+        whole = QuantileSketch(k=200, seed=1)
+        whole.update(values)
+        merged = QuantileSketch(k=200, seed=1)
+        for part in np.array_split(values, 10):
+            sketch = QuantileSketch(k=200, seed=2)
+            sketch.update(part)
+            merged.merge(sketch)
+        self.assertEqual(merged.count, whole.count)
+        self.assertLess(sum(len(level) for level in merged.levels), 3 * 200 + len(merged.levels) * 2)
+        truth = np.quantile(values, [0.1, 0.5, 0.9])
+        for sketch in (whole, merged):
+            np.testing.assert_allclose(sketch.quantiles([0.1, 0.5, 0.9]), truth, atol=0.05)
+
+    def test_row_sample_keeps_file_order(self):
+        sample = RowSample(100, seed=3)
+        df = pd.DataFrame({'n': range(10_000)})
+        for start in range(0, 10_000, 1_000):
+            sample.update(df.iloc[start:start + 1_000])
+        rows = sample.frame()
+        self.assertEqual(len(rows), 100)
+        self.assertTrue(rows.index.is_monotonic_increasing)
+        self.assertTrue((rows['n'] == rows.index).all())
+
+
+@unittest.skipUnless(dataset_cache.enabled(), "pyarrow is not installed")
+class DatasetCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        patcher = mock.patch.object(dataset_cache, 'CACHE_DIR', cache_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache_dir = cache_dir
+        self.data = b"total_bill,tip,sex\n" + b"".join(
+            b"%d.5,%d,%s\n" % (i, i % 7, b"MF"[i % 2:i % 2 + 1]) for i in range(200_000))
+
+    def upload(self, data=None):
+        return SimpleUploadedFile('tips.csv', self.data if data is None else data)
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(dataset_cache.get('tips'))
+        path = dataset_cache.get_or_add('tips', self.upload())
+        self.assertEqual(path, dataset_cache.path_for('tips'))
+        with mock.patch.object(dataset_cache, 'add') as add:
+            self.assertEqual(dataset_cache.get_or_add('tips', self.upload()), path)
+        add.assert_not_called()
+        expected = pd.read_csv(io.BytesIO(self.data))
+        pd.testing.assert_frame_equal(dataset_cache.read_frame(path), expected)
+        # Only the numeric columns and the wanted ones are read.
+        self.assertEqual(list(dataset_cache.read_frame(path, ['sex']).columns), ['total_bill', 'tip', 'sex'])
+        self.assertEqual(list(dataset_cache.read_frame(path, []).columns), ['total_bill', 'tip'])
+        frames = list(dataset_cache.iter_frames(path))
+        pd.testing.assert_frame_equal(pd.concat(frames), expected)
+
+    def test_upload_is_rewound(self):
+        upload = self.upload()
+        dataset_cache.add('tips', upload)
+        self.assertEqual(upload.read(), self.data)
+
+    def test_unconvertible_upload_is_not_cached(self):
+        self.assertIsNone(dataset_cache.add('bad', self.upload(b'a,b\n1,2\n3\n')))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_concurrent_adds_of_one_upload(self):
+        errors = []
+        start = threading.Barrier(8)
+
+        def add():
+            try:
+                start.wait()
+                path = dataset_cache.add('tips', self.upload())
+                self.assertEqual(len(dataset_cache.read_frame(path)), 200_000)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=add) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        # No temporary file is left behind.
+        self.assertEqual(os.listdir(self.cache_dir), ['tips.arrow'])
+
+    def test_least_recently_used_files_are_evicted(self):
+        first = dataset_cache.add('first', self.upload())
+        second = dataset_cache.add('second', self.upload())
+        os.utime(first, ns=(1, 1))
+        os.utime(second, ns=(2, 2))
+        dataset_cache.get('first')
+        with mock.patch.object(dataset_cache, 'MAX_BYTES', os.path.getsize(first) * 2):
+            dataset_cache.add('third', self.upload())
+        self.assertEqual(sorted(os.listdir(self.cache_dir)), ['first.arrow', 'third.arrow'])
+
+    def test_pinned_files_are_not_evicted(self):
+        first = dataset_cache.add('first', self.upload())
+        second = dataset_cache.add('second', self.upload())
+        os.utime(first, ns=(1, 1))
+        os.utime(second, ns=(2, 2))
+        pin = dataset_cache.pin(first)
+        stale = dataset_cache.pin(second)
+        os.utime(stale, (0, 0))
+        with mock.patch.object(dataset_cache, 'MAX_BYTES', os.path.getsize(first) * 2):
+            dataset_cache.add('third', self.upload())
+        self.assertEqual(sorted(os.listdir(self.cache_dir)),
+                         sorted(['first.arrow', 'third.arrow', os.path.basename(pin)]))
+        dataset_cache.unpin(pin)
+        with mock.patch.object(dataset_cache, 'MAX_BYTES', os.path.getsize(first)):
+            dataset_cache.evict(keep=dataset_cache.path_for('third'))
+        self.assertEqual(os.listdir(self.cache_dir), ['third.arrow'])
+
+    def test_missing_file_cannot_be_pinned(self):
+        self.assertIsNone(dataset_cache.pin(dataset_cache.path_for('missing')))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+class PlotDeduplicationTests(SimpleTestCase):
+
+    def setUp(self):
+        plot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, plot_dir)
+        self.pool = mock.Mock()
+        self.pool.submit.side_effect = lambda *args: Future()
+        for name, value in [('PLOT_DIR', plot_dir), ('_futures', {}), ('_get_pool', lambda broken=False: self.pool)]:
+            patcher = mock.patch.object(plots, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.key = plots.plot_key('digest', 'Sales', {'figsize': plots.FIGSIZE})
+
+    def finish(self, key):
+        """Complete the render of key as a worker would."""
+        open(plots.artifact_path(key), 'wb').close()
+        plots._futures[key].set_result(plots.artifact_path(key))
+
+    def test_key_depends_on_every_input(self):
+        keys = {plots.plot_key(*args) for args in [
+            ('digest', 'Sales', {'figsize': (8, 5)}), ('other', 'Sales', {'figsize': (8, 5)}),
+            ('digest', 'Tips', {'figsize': (8, 5)}), ('digest', 'Sales', {'figsize': (4, 5)}),
+        ]}
+        self.assertEqual(len(keys), 4)
+
+    def dataset(self):
+        path = os.path.join(plots.PLOT_DIR, 'data.arrow')
+        open(path, 'wb').close()
+        return path
+
+    def pins(self):
+        return [name for name in os.listdir(plots.PLOT_DIR) if name.endswith(dataset_cache.PIN_SUFFIX)]
+
+    def test_identical_requests_share_one_render(self):
+        path = self.dataset()
+        self.assertEqual(plots.submit(self.key, 'Sales', dataset_path=path), plots.PENDING)
+        self.assertEqual(plots.submit(self.key, 'Sales', dataset_path=path), plots.PENDING)
+        self.pool.submit.assert_called_once_with(
+            plots.render, 'Sales', plots.artifact_path(self.key), path, None, None, None)
+        self.assertEqual(plots.status(self.key), plots.PENDING)
+
+        self.finish(self.key)
+        self.assertEqual(plots._futures, {})
+        self.assertFalse(os.path.exists(plots.artifact_path(self.key) + '.lock'))
+        self.assertEqual(plots.status(self.key), plots.DONE)
+        self.assertEqual(plots.submit(self.key, 'Sales', dataset_path=path), plots.DONE)
+        self.pool.submit.assert_called_once()
+
+    def test_dataset_is_pinned_until_the_render_finishes(self):
+        df = pd.DataFrame({'Sales': [1, 2]})
+        plots.submit(self.key, 'Sales', dataset_path=self.dataset(), df=df)
+        # The worker reads the file, so the DataFrame is not sent.
+        self.assertIsNone(self.pool.submit.call_args[0][-1])
+        self.assertEqual(len(self.pins()), 1)
+        self.finish(self.key)
+        self.assertEqual(self.pins(), [])
+
+    def test_evicted_dataset_falls_back_to_the_dataframe(self):
+        df = pd.DataFrame({'Sales': [1, 2]})
+        plots.submit(self.key, 'Sales', dataset_path=os.path.join(plots.PLOT_DIR, 'gone.arrow'), df=df)
+        self.pool.submit.assert_called_once_with(
+            plots.render, 'Sales', plots.artifact_path(self.key), None, None, None, df)
+        self.assertEqual(self.pins(), [])
+
+    def test_render_in_another_process_is_not_repeated(self):
+        os.close(os.open(plots.artifact_path(self.key) + '.lock', os.O_CREAT | os.O_WRONLY))
+        self.assertEqual(plots.submit(self.key, 'Sales'), plots.PENDING)
+        self.assertEqual(plots.status(self.key), plots.PENDING)
+        self.pool.submit.assert_not_called()
+
+    def test_stale_lock_is_taken_over(self):
+        lock_path = plots.artifact_path(self.key) + '.lock'
+        os.close(os.open(lock_path, os.O_CREAT | os.O_WRONLY))
+        os.utime(lock_path, (0, 0))
+        self.assertEqual(plots.submit(self.key, 'Sales'), plots.PENDING)
+        self.pool.submit.assert_called_once()
+
+    def test_artifact_finished_before_the_lock_is_not_rendered_again(self):
+        take_lock = plots._take_lock
+
+        def finished_meanwhile(key):
+            # The other process renders and unlocks between the two checks.
+            open(plots.artifact_path(key), 'wb').close()
+            return take_lock(key)
+
+        with mock.patch.object(plots, '_take_lock', finished_meanwhile):
+            self.assertEqual(plots.submit(self.key, 'Sales'), plots.DONE)
+        self.pool.submit.assert_not_called()
+        self.assertFalse(os.path.exists(plots.artifact_path(self.key) + '.lock'))
+
+    def test_full_queue_turns_renders_away(self):
+        with mock.patch.object(plots, 'MAX_PENDING', 1):
+            self.assertEqual(plots.submit(self.key, 'Sales'), plots.PENDING)
+            other = plots.plot_key('other', 'Sales', {})
+            self.assertEqual(plots.submit(other, 'Sales'), plots.BUSY)
+        self.assertFalse(os.path.exists(plots.artifact_path(other) + '.lock'))
+
+    def test_failed_render_releases_the_lock(self):
+        plots.submit(self.key, 'Sales')
+        plots._futures[self.key].set_exception(RuntimeError("worker died"))
+        self.assertFalse(os.path.exists(plots.artifact_path(self.key) + '.lock'))
+        self.assertEqual(plots.status(self.key), plots.FAILED)
+
+    @unittest.skipUnless(dataset_cache.enabled(), "pyarrow is not installed")
+    def test_worker_reads_the_cached_dataset(self):
+        with mock.patch.object(dataset_cache, 'CACHE_DIR', plots.PLOT_DIR):
+            path = dataset_cache.add('sales', SimpleUploadedFile(
+                'sales.csv', b"Month,Sales\n" + b"".join(b"%d,%d\n" % (i, i * 3) for i in range(1_000))))
+        output = plots.artifact_path(self.key)
+        self.assertEqual(plots.render('Sales', output, dataset_path=path, columns=['Sales']), output)
+        with open(output, 'rb') as f:
+            self.assertEqual(f.read(8), b'\x89PNG\r\n\x1a\n')
+        frame = plots.load_dataset(path, ['Sales'], sample_rows=100)
+        self.assertEqual(len(frame), 100)
+        self.assertTrue(frame.index.is_monotonic_increasing)
+
+
+class PlotStatusTests(SimpleTestCase):
+
+    def test_wait_is_capped(self):
+        key = '0' * 32
+        with mock.patch.object(plots, 'status', return_value=plots.PENDING) as status:
+            response = self.client.get(reverse('plot_status', args=[key]), {'wait': 25})
+        self.assertEqual(response.json(), {'status': 'pending', 'url': None})
+        status.assert_called_once_with(key, views.MAX_PLOT_WAIT)
+        self.assertLessEqual(views.MAX_PLOT_WAIT, 5)
@@ -0,0 +1,39 @@
+import hashlib
+
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """Hash every uploaded file while it streams in.
+
+    It passes the data on untouched to the next handler in
+    FILE_UPLOAD_HANDLERS, which stores the file; the SHA-256 of each file
+    ends up in request.upload_digests[field_name].
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not hasattr(self.request, 'upload_digests'):
+            self.request.upload_digests = {}
+        self.request.upload_digests[self.field_name] = self.sha256.hexdigest()
+        return None
+
+
+def upload_digest(request, field_name):
+    """Return the SHA-256 of the uploaded file, hashing it now if no handler did."""
+    digest = getattr(request, 'upload_digests', {}).get(field_name)
+    if digest is None:
+        upload = request.FILES[field_name]
+        sha256 = hashlib.sha256()
+        for chunk in upload.chunks():
+            sha256.update(chunk)
+        upload.seek(0)
+        digest = sha256.hexdigest()
+    return digest
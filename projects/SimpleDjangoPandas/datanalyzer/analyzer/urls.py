@@ -5,4 +5,5 @@ from . import views
 urlpatterns = [
     path('', views.analyze_category, name='analyze'),
     path('new/', views.send_api, name='analyze_api'),
+    path('plot/<str:key>/', views.plot_status, name='plot_status'),
 ]
\ No newline at end of file
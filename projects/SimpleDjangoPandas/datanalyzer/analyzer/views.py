@@ -1,12 +1,27 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')  # Use non-GUI backend for matplotlib
-
-import os
+import re
+import logging
 from django.shortcuts import render
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse
+
+from . import plots
+from .uploads import upload_digest
+
+
+logger = logging.getLogger(__name__)
+
+# pandas is only imported by the request that needs it, and matplotlib only
+# by the plot workers (plots.py): they take longer to import than the rest
+# of the project together.
+
+# Uploads larger than this are described chunk by chunk (see streaming.py)
+# and plotted from a sample of their rows, instead of being read whole.
+STREAM_CSV_BYTES = getattr(settings, 'ANALYZER_STREAM_CSV_BYTES', 64 * 1024 * 1024)
+STREAM_CHUNK_ROWS = getattr(settings, 'ANALYZER_STREAM_CHUNK_ROWS', 100_000)
+STREAM_SAMPLE_ROWS = getattr(settings, 'ANALYZER_STREAM_SAMPLE_ROWS', 10_000)
+# Longest a plot_status long-poll is held open, in seconds. Kept short: the
+# wait holds a server worker, and the page simply polls again.
+MAX_PLOT_WAIT = getattr(settings, 'ANALYZER_PLOT_MAX_WAIT', 2)
 
 DATA_CATEGORIES = {
     "Sales": "sales",
@@ -21,19 +36,62 @@ DATA_CATEGORIES = {
     "Weather": "weather"
 }
 
-def analyze_category(request):
-    print("****** Starting analysis for category ******")
-    print("Request method:", request.method)
-    if request.method == "GET":
-        print("Request GET data:", request.GET)
+# Columns each category plots, besides the numeric ones describe() needs.
+# Only these are loaded from the dataset cache; None loads every column.
+PLOT_COLUMNS = {
+    "Sales": ["Sales"],
+    "Students": ["Scores"],
+    "Titanic": ["survived"],
+    "Flights": ["passengers"],
+    "Iris": ["sepal_length", "sepal_width"],
+    "Tips": ["total_bill", "tip", "sex", "smoker"],
+    "Diamonds": ["price"],
+    "Planets": ["mass", "orbital_period"],
+    "Insurance": ["charges"],
+    "Weather": ["temperature"],
+}
+
+
+def load_upload(request, csv_file, selected):
+    """Return (describe() of the upload, the DataFrame to plot, its Arrow cache path or None).
+
+    Uploads whose content was seen before are read from the Arrow dataset
+    cache; large ones are described chunk by chunk and plotted from a sample.
+    """
+    import pandas as pd
+    from . import dataset_cache
+
+    large = csv_file.size > STREAM_CSV_BYTES
+    path = None
+    if dataset_cache.enabled():
+        path = dataset_cache.get_or_add(upload_digest(request, "csvfile"), csv_file)
+
+    if large:
+        from .streaming import describe_csv, describe_frames
+        if path:
+            summary, df = describe_frames(dataset_cache.iter_frames(path, PLOT_COLUMNS.get(selected)),
+                                          STREAM_SAMPLE_ROWS)
+        else:
+            summary, df = describe_csv(csv_file, STREAM_CHUNK_ROWS, STREAM_SAMPLE_ROWS)
+        logger.info("Described %s (%d bytes) in chunks; plotting %d sampled rows",
+                    csv_file.name, csv_file.size, len(df))
+        return summary, df, path
+
+    if path:
+        df = dataset_cache.read_frame(path, PLOT_COLUMNS.get(selected))
     else:
-        print("Request POST data:", request.POST)
-        print("Request FILES data:", request.FILES)
-        print("CSV file:", request.FILES.get("csvfile"))
-    print("****** Analysis function called ******")
+        df = pd.read_csv(csv_file)
+    return df.describe(), df, path
+
+
+def analyze_category(request):
+    logger.debug("analyze_category %s GET=%s POST=%s FILES=%s",
+                 request.method, request.GET, request.POST, request.FILES)
 
     selected = None
     plot_url = None
+    plot_key = None
+    plot_state = None
     head = None
 
     if request.method == "POST":
@@ -41,90 +99,45 @@ def analyze_category(request):
         csv_file = request.FILES.get("csvfile")
 
         if selected and csv_file:
-            df = pd.read_csv(csv_file)
-            head = df.describe().to_html(classes="table table-striped")
-
-            # Generate a plot
-            plot_path = os.path.join(settings.BASE_DIR, "static", "analysis", "plot.png")
-            plt.figure(figsize=(8, 5))
-            try:
-                # Basic plot logic (can be improved per category)
-                # What does the user want to analyze?
-                if selected == "Sales":
-                    df['Sales'].plot(kind='bar', title='Sales Data')
-                elif selected == "Students":
-                    df['Scores'].plot(kind='line', title='Student Scores')
-                elif selected == "Titanic":
-                    df['survived'].value_counts().plot(kind='pie', autopct='%1.1f%%', title='Titanic Survival')
-                    plt.ylabel('')  # Hide the y-label for pie chart
-                    plt.title('Titanic Survival Distribution')
-                    plt.legend(title='Survived', loc='upper right')
-                    plt.tight_layout()  # Adjust layout to prevent clipping
-                    plt.axis('equal')  # Equal aspect ratio ensures that pie chart is circular
-                    
-                elif selected == "Flights":
-                    df['passengers'].plot(kind='line', title='Flight Passengers Over Time')
-                    plt.xticks(rotation=45)
-                    plt.tight_layout()
-                    plt.ylabel('Number of Passengers')
-                    plt.xlabel('Flight Date')
-                elif selected == "Iris":
-                    df.plot.scatter(x='sepal_length', y='sepal_width', title='Iris Sepal Dimensions')
-                elif selected == "Tips":
-                    # Clean the table
-                    df = df.dropna()
-
-                    # Create data frame with analysis
-                    plt.style.use('Solarize_Light2')
-                    fig, graphs = plt.subplots(2,2, figsize=(20,20)) # graphs[0,0] 
-                    graphs[0,0].scatter(df['total_bill'], df['tip'])
-                    graphs[0,0].set_xlabel("Total Bill")
-                    graphs[0,0].set_ylabel("Tip")
-                    graphs[0,0].set_title("TotalBill vs Tip")
-
-                    df_genderwise = df.groupby('sex')['tip'].mean().reset_index()
-                    graphs[0,1].bar(df_genderwise['sex'],df_genderwise['tip'])
-                    graphs[0,1].set_xlabel("Gender")
-                    graphs[0,1].set_ylabel("Tip")
-                    graphs[0,1].set_title("x vs Cube")
-
-                    df_smoker = df.groupby('smoker')['tip'].mean().reset_index()
-                    print(df_smoker)
-                    graphs[1,0].bar(df_smoker['smoker'],df_smoker['tip'])
-                    graphs[1,0].set_xlabel("smoker")
-                    graphs[1,0].set_ylabel("Tip")
-                    graphs[1,0].set_title("Smoker vs Tip")
-                    fig.savefig("MatplotLibPractices.jpeg")
-
-
-                elif selected == "Diamonds":
-                    df['price'].plot(kind='hist', bins=30, title='Diamond Price Distribution')
-                elif selected == "Planets":
-                    df['mass'].plot(kind='scatter', y='orbital_period', title='Planet Mass vs Orbital Period')
-                elif selected == "Insurance":
-                    df['charges'].plot(kind='box', title='Insurance Charges Distribution')
-                elif selected == "Weather":
-                    df['temperature'].plot(kind='line', title='Weather Temperature Over Time')
-                else:
-                    # Default case for any other category
-                    df.plot(kind='line', title='Data Analysis')
-            except KeyError as e:
-                print(f"KeyError: {e} - Check if the selected category has the required columns.")
-                plt.text(0.5, 0.5, f"Error: {e}", horizontalalignment='center', verticalalignment='center', fontsize=12)
-                plt.axis('off')  # Hide axes for error message
-
-
-            plt.tight_layout()
-            plt.savefig(plot_path)
-            plt.close()
-
-            plot_url = "/static/analysis/plot.png"
+            summary, df, dataset_path = load_upload(request, csv_file, selected)
+            head = summary.to_html(classes="table table-striped")
+
+            # The plot is rendered in the background; the page polls for it.
+            sample_rows = STREAM_SAMPLE_ROWS if csv_file.size > STREAM_CSV_BYTES else None
+            plot_key = plots.plot_key(upload_digest(request, "csvfile"), selected, {
+                "figsize": plots.FIGSIZE,
+                "sample_rows": sample_rows,
+            })
+            # With a dataset_path the worker loads the columns it plots from the
+            # cached Arrow file; df is only sent if that file is gone by now.
+            plot_state = plots.submit(plot_key, selected, dataset_path=dataset_path,
+                                      columns=PLOT_COLUMNS.get(selected), sample_rows=sample_rows, df=df)
+            if plot_state == plots.DONE:
+                plot_url = plots.artifact_url(plot_key)
 
     return render(request, "analyze.html", {
         "categories": list(DATA_CATEGORIES.keys()),
         "selected": selected,
         "head": head,
         "plot_url": plot_url,
+        "plot_key": plot_key,
+        "plot_state": plot_state,
+    })
+
+
+def plot_status(request, key):
+    """Report whether the plot key is rendered; ?wait=N long-polls up to N seconds."""
+    if not re.fullmatch(r'[0-9a-f]{32}', key):
+        raise Http404("Unknown plot")
+    try:
+        wait = float(request.GET.get("wait", 0))
+    except ValueError:
+        wait = 0
+    wait = min(wait, MAX_PLOT_WAIT) if wait > 0 else 0
+    state = plots.status(key, wait)
+    return JsonResponse({
+        "status": state,
+        "url": plots.artifact_url(key) if state == plots.DONE else None,
     })
 
 
@@ -132,13 +145,8 @@ API_KEY = 123
 
 valid_api = []
 def send_api(request):
-    print("****** Starting API data send ******")
-    print("Request method:", request.method)
-    if request.method == "GET":
-        print("Request GET data:", request.GET)
-    else:
-        print("Request POST data:", request.POST)
-        print("Request FILES data:", request.FILES)
+    logger.debug("send_api %s GET=%s POST=%s FILES=%s",
+                 request.method, request.GET, request.POST, request.FILES)
 
     global API_KEY
     API_KEY = API_KEY+1
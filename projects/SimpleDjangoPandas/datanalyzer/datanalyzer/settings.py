@@ -118,6 +118,16 @@ USE_TZ = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Hash uploads as they stream in, for the analyzer's dataset cache
+# (analyzer/dataset_cache.py, needs pyarrow).
+FILE_UPLOAD_HANDLERS = [
+    "analyzer.uploads.HashingUploadHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+ANALYZER_DATASET_CACHE_DIR = BASE_DIR / 'dataset_cache'
+ANALYZER_DATASET_CACHE_BYTES = 1024 * 1024 * 1024
+
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [ BASE_DIR / 'static' ]
 
@@ -1,8 +1,5 @@
 #import psycopg2
 
-print("Importing s3 utils!!!")
-print("Module name is ", __name__)
-
 # --- RDS Connection Details (REPLACE WITH YOURS) ---
 DB_HOST = "replace with API" # e.g., my-python-db-instance.xxxx.ap-south-1.rds.amazonaws.com
 DB_PORT = 5432 # Default for PostgreSQL
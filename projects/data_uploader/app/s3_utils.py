@@ -1,15 +1,19 @@
-import boto3
 import os
+from functools import lru_cache
 
-print("Importing s3 utils!!!")
-print("Module name is ", __name__)
+
+# boto3 is slow to import and to build a client, so both wait for the first upload.
+@lru_cache(maxsize=None)
+def get_s3_client():
+    import boto3
+    return boto3.client('s3')  # Service name
 
 # Upload file to s3 bucket
 def upload_file(dir_name, file_name):
     print("Start: Uploading file to boto3")
     print(f"File Name: {file_name}")
 
-    s3_client = boto3.client('s3')  # Service name
+    s3_client = get_s3_client()
     LOCAL_FILE = dir_name+"/"+file_name
     REMOTE_FILE_PATH = "daniel/"+file_name
 
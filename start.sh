@@ -10,6 +10,10 @@ SERVER_PORT="8000"
 # Usage: ./start.sh
 
 python3 manage.py makemigrations
+python3 manage.py build_image_derivatives
 python manage.py collectstatic
+python3 manage.py build_topics_manifest
+python3 manage.py build_search_index
+python3 manage.py compress_topics
 python3 manage.py migrate
 python3 manage.py runserver ${SERVER_IP}:${SERVER_PORT}